@@ -3,166 +3,440 @@ AI service for content generation using Gemini
 Autonomous TLDR news fetcher and MongoDB integration
 """
 import os
+import asyncio
 import feedparser
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+import calendar
 import threading
 import time
-import google.generativeai as genai
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Any, Optional
+from starlette.concurrency import run_in_threadpool
 from config import Config
+from concurrency import GenerationLimiter
+from response_cache import ResponseCache
+from prompt_templates import PromptBuilder
+from usage_tracker import UsageTracker, estimate_tokens, usage_counts
+from model_backends import ModelBackend
+from model_router import CircuitBreaker, ModelRouter, DEFAULT_TASK
+from singleflight import SingleFlight
+from metrics import LLM_CALL_DURATION, LLM_TOKENS, LLM_IN_FLIGHT
+import database
+from database import get_tldr_collection, get_feed_state_collection
 
 class AIService:
     """Handles AI-powered content generation"""
     
     def __init__(self):
-        if Config.GEMINI_API_KEY:
-            genai.configure(api_key=Config.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
-            print(f"Using Gemini model: {Config.GEMINI_MODEL}")
-        else:
-            self.model = None
-    
-    def is_configured(self) -> bool:
+        self.limiter = GenerationLimiter(
+            Config.GEMINI_MAX_IN_FLIGHT,
+            Config.GEMINI_MAX_QUEUE,
+            Config.GEMINI_RETRY_AFTER_SECONDS
+        )
+        self.cache = ResponseCache(
+            Config.LLM_CACHE_MAX_ENTRIES,
+            Config.LLM_CACHE_TTL_SECONDS,
+            Config.LLM_CACHE_SQLITE_PATH or None
+        )
+        self.prompts = PromptBuilder(Config.PROMPT_TEMPLATE_VERSION)
+        self.usage = UsageTracker(
+            Config.LLM_DAILY_TOKEN_BUDGET,
+            Config.LLM_MEMBER_DAILY_TOKEN_BUDGET,
+            Config.get_method_token_budgets(),
+            Config.LLM_USAGE_FLUSH_SECONDS
+        )
+        self.router = ModelRouter(
+            Config.get_model_routes(),
+            Config.get_model_timeouts(),
+            Config.GEMINI_TIMEOUT_SECONDS,
+            lambda: CircuitBreaker(
+                window=Config.MODEL_BREAKER_WINDOW,
+                min_calls=Config.MODEL_BREAKER_MIN_CALLS,
+                p95_threshold=Config.MODEL_BREAKER_P95_SECONDS,
+                error_rate_threshold=Config.MODEL_BREAKER_ERROR_RATE,
+                cooldown=Config.MODEL_BREAKER_COOLDOWN_SECONDS
+            )
+        )
+        # One coalescing group per method, for identical concurrent non-streaming calls
+        self.flights: Dict[str, SingleFlight] = {}
+
+    def is_configured(self, method: str = DEFAULT_TASK) -> bool:
         """Check if AI service is properly configured"""
-        return self.model is not None
-    def generate_personalized_post(self, topic: str, content_type: str, user_profile: Dict[str, Any]) -> str:
-        """Generate personalized content based on user profile"""
+        return self.router.is_configured(method)
+
+    def test_connection(self) -> Dict[str, Any]:
+        """Send a tiny prompt to every routed model and report which respond"""
+        async def probe(backend: ModelBackend) -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    backend.generate("Reply with OK."), timeout=self.router.timeout_for(backend.name)
+                )
+                return {"ok": True, "seconds": round(time.perf_counter() - started, 3), "reply": response.text[:50]}
+            except Exception as e:
+                return {"ok": False, "error": str(e)}
+
+        async def probe_all() -> Dict[str, Any]:
+            names = sorted({name for models in self.router.routes.values() for name in models})
+            backends = [self.router.backend(name) for name in names if self.router.backend(name).is_configured()]
+            results = await asyncio.gather(*(probe(backend) for backend in backends))
+            return dict(zip((backend.name for backend in backends), results))
+
         if not self.is_configured():
+            return {"status": "error", "message": "AI service not configured. Please set GEMINI_API_KEY."}
+        # Sync route handlers run in a worker thread, which has no running event loop
+        models = asyncio.run(probe_all())
+        return {"status": "success" if any(result["ok"] for result in models.values()) else "error", "models": models}
+
+    def _generation_config(self) -> Optional[Dict[str, Any]]:
+        if Config.GEMINI_MAX_OUTPUT_TOKENS > 0:
+            return {"max_output_tokens": Config.GEMINI_MAX_OUTPUT_TOKENS}
+        return None
+
+    def _record_usage(self, method: str, member_id: Optional[str], response) -> None:
+        """Add a response's token counts to the metrics and to the usage tracker"""
+        record_token_usage(method, response)
+        self.usage.record(method, member_id, usage_counts(response))
+
+    def _record_call(self, method: str, model: str, started: float, outcome: str) -> None:
+        """Feed a finished call to the latency metric and the model's circuit breaker"""
+        elapsed = time.perf_counter() - started
+        LLM_CALL_DURATION.observe(elapsed, method=method, model=model, outcome=outcome)
+        if outcome == "cancelled":
+            # The caller went away (e.g. a closed connection), which says nothing about the model
+            self.router.cancel(model)
+        else:
+            self.router.record(model, elapsed, outcome == "success")
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        """Cache lookup; the SQLite tier is read in a worker thread, off the event loop"""
+        if self.cache.persistent:
+            return await run_in_threadpool(self.cache.get, key)
+        return self.cache.get(key)
+
+    async def _cache_set(self, key: str, value: str) -> None:
+        if self.cache.persistent:
+            await run_in_threadpool(self.cache.set, key, value)
+        else:
+            self.cache.set(key, value)
+
+    def _flight(self, method: str) -> SingleFlight:
+        flight = self.flights.get(method)
+        if flight is None:
+            flight = self.flights.setdefault(method, SingleFlight(method))
+        return flight
+
+    async def _generate(self, method: str, prompt: str, bypass_cache: bool = False, refresh_cache: bool = False,
+                        system_instruction: Optional[str] = None, member_id: Optional[str] = None) -> str:
+        """Run a model call without blocking the event loop, consulting the response cache first.
+        Identical concurrent calls for the same member share one model call, whether or not caching is enabled."""
+        use_cache = Config.LLM_CACHE_ENABLED and not bypass_cache
+        cache_key = ResponseCache.make_key(self.router.primary(method), method, prompt, system_instruction)
+        if use_cache and not refresh_cache:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                self.usage.record(method, member_id, {}, cache_hit=True)
+                return cached
+        if not self.is_configured(method):
             raise Exception("AI service not configured. Please set GEMINI_API_KEY.")
+        # Coalesced per member, so each member's budget is checked and their usage booked to them
+        text = await self._flight(method).do(
+            (member_id, cache_key), lambda: self._call_model(method, prompt, system_instruction, member_id)
+        )
+        if use_cache:
+            await self._cache_set(cache_key, text)
+        return text
 
-        name = user_profile.get("name", "a LinkedIn professional")
-        headline = user_profile.get("headline", "industry expert")
-        industry = user_profile.get("industry", "Technology")
-        position = user_profile.get("position", "Professional")
-        company = user_profile.get("company", "their organization")
-        summary = user_profile.get("summary", "Experienced professional with practical insights.")
-
-        skills = user_profile.get("skills") or []
-        if not isinstance(skills, list):
-            skills = [str(skills)]
-        skills_text = ", ".join(str(skill) for skill in skills[:5]) if skills else "Leadership, Communication"
-
-        interests = user_profile.get("interests") or []
-        if not isinstance(interests, list):
-            interests = [str(interests)]
-        interests_text = ", ".join(str(interest) for interest in interests[:3]) if interests else "Innovation, Growth"
-
-        prompt = f"""
-        Act as a LinkedIn content expert. You're writing for {name}, who is a {headline}.
-        Add a hook to grab attention.
-        User Background:
-        - Industry: {industry}
-        - Position: {position} at {company}
-        - Skills: {skills_text}
-        - Interests: {interests_text}
-        - Summary: {summary}
-
-        Generate a {content_type} LinkedIn post about '{topic}' that:
-        1. Reflects their expertise and experience
-        2. Uses their authentic voice and perspective
-        3. Includes relevant insights from their background
-        4. Encourages meaningful engagement
-        5. Includes 5-7 relevant hashtags
-        6. Use 3-4 emojis
-
-        Keep it professional, engaging, and under 300 words.
-        Do NOT use any Markdown formatting (such as ##, #, *, or other Markdown symbols) in the post. Write the post as plain text only, without headings or Markdown.
-        """
-        response = self.model.generate_content(prompt)
+    async def _call_model(self, method: str, prompt: str, system_instruction: Optional[str],
+                          member_id: Optional[str]) -> str:
+        """One model call, falling back to the next routed model when a call fails or times out"""
+        self.usage.check_budget(method, member_id, estimate_tokens(system_instruction, prompt))
+        async with self.limiter.slot():
+            error = None
+            for backend in self.router.candidates(method):
+                if error is not None:
+                    print(f"[AIService] {method}: retrying on {backend.name} after error: {error!r}")
+                started = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(
+                        backend.generate(prompt, system_instruction, self._generation_config()),
+                        timeout=self.router.timeout_for(backend.name)
+                    )
+                except asyncio.TimeoutError as e:
+                    self._record_call(method, backend.name, started, "timeout")
+                    error = e
+                    continue
+                except asyncio.CancelledError:
+                    self._record_call(method, backend.name, started, "cancelled")
+                    raise
+                except Exception as e:
+                    self._record_call(method, backend.name, started, "error")
+                    error = e
+                    continue
+                self._record_call(method, backend.name, started, "success")
+                self._record_usage(method, member_id, response)
+                break
+            else:
+                raise error
         if not response or not response.text:
             raise Exception("Empty response from AI model")
         return response.text
-    def optimize_post(self, post_content: str) -> str:
-        """Analyze and optimize a post for better engagement"""
-        if not self.is_configured():
+
+    async def _stream(self, method: str, prompt: str, bypass_cache: bool = False, refresh_cache: bool = False,
+                      system_instruction: Optional[str] = None, member_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield response text chunks as the model produces them. A failing model is replaced by
+        the next routed one only until its first chunk arrives."""
+        use_cache = Config.LLM_CACHE_ENABLED and not bypass_cache
+        cache_key = ResponseCache.make_key(self.router.primary(method), method, prompt, system_instruction)
+        if use_cache and not refresh_cache:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                self.usage.record(method, member_id, {}, cache_hit=True)
+                yield cached
+                return
+        if not self.is_configured(method):
             raise Exception("AI service not configured. Please set GEMINI_API_KEY.")
-        
-        prompt = f"""
-        Analyze this LinkedIn post and provide optimization suggestions:
-        
-        Post: "{post_content}"
-        
-        Provide:
-        1. Engagement score (1-10)
-        2. Specific improvement suggestions
-        3. Optimized version of the post
-        4. Best hashtags for this content
-        5. Optimal posting time recommendations
-        
-        Focus on maximizing likes, comments, and shares while maintaining professionalism.
-        """
-        response = self.model.generate_content(prompt)
-        if not response or not response.text:
+        self.usage.check_budget(method, member_id, estimate_tokens(system_instruction, prompt))
+        parts = []
+        async with self.limiter.slot():
+            error = None
+            for backend in self.router.candidates(method):
+                if error is not None:
+                    print(f"[AIService] {method}: retrying on {backend.name} after error: {error!r}")
+                timeout = self.router.timeout_for(backend.name)
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    chunks = backend.stream(prompt, system_instruction, self._generation_config()).__aiter__()
+                    last_chunk = None
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                        except StopAsyncIteration:
+                            break
+                        last_chunk = chunk
+                        try:
+                            text = chunk.text
+                        except ValueError:
+                            # Chunks without text parts (e.g. safety metadata) carry nothing to forward
+                            continue
+                        if text:
+                            parts.append(text)
+                            yield text
+                    outcome = "success"
+                    # Usage totals arrive with the final chunk
+                    self._record_usage(method, member_id, last_chunk)
+                    break
+                except asyncio.TimeoutError as e:
+                    outcome = "timeout"
+                    error = e
+                except (GeneratorExit, asyncio.CancelledError):
+                    # The client disconnected or the stream was closed early
+                    outcome = "cancelled"
+                    raise
+                except Exception as e:
+                    error = e
+                finally:
+                    self._record_call(method, backend.name, started, outcome)
+                if parts:
+                    # Text already reached the client, so another model cannot take over
+                    raise error
+            else:
+                raise error
+        full_text = "".join(parts)
+        if not full_text:
             raise Exception("Empty response from AI model")
-        return response.text
-    def generate_news_post(self, title: str, user_profile: dict) -> str:
+        if use_cache:
+            await self._cache_set(cache_key, full_text)
+
+    async def generate_personalized_post(self, topic: str, content_type: str, user_profile: Dict[str, Any],
+                                         bypass_cache: bool = False, refresh_cache: bool = False,
+                                         member_id: Optional[str] = None) -> str:
+        """Generate personalized content based on user profile"""
+        system, prompt = self.prompts.personalized_post(topic, content_type, user_profile)
+        return await self._generate("generate_personalized_post", prompt, bypass_cache, refresh_cache, system, member_id)
+
+    async def optimize_post(self, post_content: str, bypass_cache: bool = False, refresh_cache: bool = False,
+                            member_id: Optional[str] = None) -> str:
+        """Analyze and optimize a post for better engagement"""
+        system, prompt = self.prompts.optimize_post(post_content)
+        return await self._generate("optimize_post", prompt, bypass_cache, refresh_cache, system, member_id)
+
+    async def generate_news_post(self, title: str, user_profile: dict,
+                                 bypass_cache: bool = False, refresh_cache: bool = False) -> str:
         """Generate a LinkedIn post based on a news item"""
-        if not self.is_configured():
-            raise Exception("AI service not configured. Please set GEMINI_API_KEY.")
-        prompt = f'''
-        Act as an expert LinkedIn content writer and news researcher.
-        Add a hook to grab attention.
-        Generate an engaging LinkedIn post based on the following news item:
-        Title: "{title}"
-        This title is from tldr newsletter so you need to read the tldr newsletter containing this topic online and then make the post.
-        you can also look at other linkedin posts on the same topic for reference.
-        The tone of the text should be professional and insightful.
-        dont mention things like these explicitly : TLDR newsletter, **Call to Action:**
-        Use 3-4 emojis,Do NOT use any Markdown formatting (such as ##, #, *, or other Markdown symbols) in the post.
-        Include 3-5 relevant hashtags, a call to action, and keep it under 200 words.
-        '''
-        response = self.model.generate_content(prompt)
-        if not response or not response.text:
-            raise Exception("Empty response from AI model")
-        return response.text
+        system, prompt = self.prompts.news_post(title)
+        return await self._generate("generate_news_post", prompt, bypass_cache, refresh_cache, system)
+
+    def stream_personalized_post(self, topic: str, content_type: str, user_profile: Dict[str, Any],
+                                 bypass_cache: bool = False, refresh_cache: bool = False,
+                                 member_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream personalized content based on user profile"""
+        system, prompt = self.prompts.personalized_post(topic, content_type, user_profile)
+        return self._stream("generate_personalized_post", prompt, bypass_cache, refresh_cache, system, member_id)
+
+    def stream_news_post(self, title: str, user_profile: dict,
+                         bypass_cache: bool = False, refresh_cache: bool = False) -> AsyncIterator[str]:
+        """Stream a LinkedIn post based on a news item"""
+        system, prompt = self.prompts.news_post(title)
+        return self._stream("generate_news_post", prompt, bypass_cache, refresh_cache, system)
+
+def record_token_usage(method: str, response) -> None:
+    """Add a response's prompt and output token counts to the token metrics"""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    LLM_TOKENS.inc(getattr(usage, "prompt_token_count", 0) or 0, method=method, kind="prompt")
+    LLM_TOKENS.inc(getattr(usage, "candidates_token_count", 0) or 0, method=method, kind="output")
 
 # Global AI service instance
 ai_service = AIService()
+LLM_IN_FLIGHT.set_function(lambda: ai_service.limiter.stats()["in_flight"], state="running")
+LLM_IN_FLIGHT.set_function(lambda: ai_service.limiter.stats()["waiting"], state="waiting")
 
-# MongoDB setup with connection check
-MONGO_URI = os.getenv("MONGODB_URI") or os.getenv("MONGO_URI") or "mongodb://localhost:27017/"
-try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    # Test connection
-    client.admin.command('ping')
-    db = client["linkedin_ai_agent"]
-    tldr_collection = db["tldr_news"]
-    MONGO_AVAILABLE = True
-except PyMongoError as exc:
-    print(f"Warning: MongoDB unavailable ({exc}); TLDR news will be disabled.")
-    client = None
-    tldr_collection = None
-    MONGO_AVAILABLE = False
-
-# TLDR RSS Feed URL
-TLDR_RSS_URL = "https://tldr.tech/rss"
+# Seconds to wait before retrying a feed while MongoDB is unreachable
+FETCH_RETRY_SECONDS = 60
+# Function to read the parsed publish time of a feed entry
+def entry_published_at(entry) -> Optional[datetime]:
+    """Return an entry's publish time as an aware UTC datetime, if the feed provides one."""
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    if not parsed:
+        return None
+    return datetime.fromtimestamp(calendar.timegm(parsed), tz=timezone.utc)
 # Function to fetch TLDR news and store in MongoDB
-def fetch_and_store_tldr_news():
-    """Fetch TLDR RSS feed, extract subtopics, and store new items in MongoDB."""
-    if not MONGO_AVAILABLE:
-        return
+def fetch_and_store_tldr_news(feed_url: str) -> Dict[str, Any]:
+    """Conditionally fetch a TLDR RSS feed and bulk-upsert subtopics newer than its watermark."""
+    stats = {"feed": feed_url, "not_modified": False, "entries": 0, "inserted": 0, "skipped": 0, "duplicates": 0,
+             "duration_ms": 0.0}
+    tldr_collection = get_tldr_collection()
+    feed_state_collection = get_feed_state_collection()
+    if tldr_collection is None or feed_state_collection is None:
+        return stats
+    started = time.perf_counter()
     try:
-        feed = feedparser.parse(TLDR_RSS_URL)
+        state = feed_state_collection.find_one({"_id": feed_url}) or {}
+        feed = feedparser.parse(feed_url, etag=state.get("etag"), modified=state.get("modified"))
+        if feed.get("status") == 304:
+            stats["not_modified"] = True
+            stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return stats
+        if feed.get("bozo") and not feed.entries:
+            print(f"Warning: could not read TLDR feed {feed_url}: {feed.get('bozo_exception')}")
+            stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            return stats
+        watermark = state.get("watermark")
+        if watermark is not None and watermark.tzinfo is None:
+            watermark = watermark.replace(tzinfo=timezone.utc)
+        newest = watermark
+        # Entries published at the watermark are re-read since one issue shares a timestamp
+        entries = []
         for entry in feed.entries:
+            published_at = entry_published_at(entry)
+            if watermark is not None and published_at is not None and published_at < watermark:
+                continue
+            if published_at is not None and (newest is None or published_at > newest):
+                newest = published_at
+            entries.append((entry, published_at))
+        stats["entries"] = len(entries)
+        # Load every used subtopic once instead of querying per subtopic
+        used_topics = set()
+        if entries:
+            used_topics = {
+                doc["subtopic"]
+                for doc in tldr_collection.find({"posted": True}, {"_id": 0, "subtopic": 1})
+                if doc.get("subtopic")
+            }
+        candidates = []
+        seen = set()
+        for entry, published_at in entries:
             # Extract subtopics from the title
-            subtopics = extract_subtopics(entry.title)
-            # Filter out already used subtopics
-            new_subtopics = [topic for topic in subtopics if not is_topic_used(topic)]
-
-            for subtopic in new_subtopics:
+            for subtopic in extract_subtopics(entry.title):
                 # Use link+subtopic as unique identifier
-                if not tldr_collection.find_one({"link": entry.link, "subtopic": subtopic}):
-                    tldr_collection.insert_one({
-                        "title": entry.title,
-                        "link": entry.link,
-                        "subtopic": subtopic,
-                        "published": entry.published,
-                        "processed": False
-                    })
+                key = (entry.link, subtopic)
+                if subtopic in used_topics or key in seen:
+                    stats["skipped"] += 1
+                    continue
+                seen.add(key)
+                candidates.append((entry, published_at, subtopic))
+        duplicates = find_duplicate_topics(tldr_collection, [subtopic for _, _, subtopic in candidates])
+        stats["duplicates"] = len(duplicates)
+        operations = []
+        for entry, published_at, subtopic in candidates:
+            document = {
+                "title": entry.title,
+                "link": entry.link,
+                "subtopic": subtopic,
+                "published": entry.get("published"),
+                # Listings sort on this, so entries without a date get their arrival time
+                "published_at": published_at or datetime.now(timezone.utc),
+                "feed": feed_url,
+                "processed": False
+            }
+            if subtopic in duplicates:
+                if Config.TOPIC_DEDUP_MODE == "reject":
+                    stats["skipped"] += 1
+                    continue
+                document["duplicate_of"], document["similarity"] = duplicates[subtopic]
+            operations.append(UpdateOne(
+                {"link": entry.link, "subtopic": subtopic},
+                {"$setOnInsert": document},
+                upsert=True
+            ))
+        if operations:
+            try:
+                inserted = tldr_collection.bulk_write(operations, ordered=False).upserted_count
+            except BulkWriteError as e:
+                # Duplicate-key races with another writer only mean the row already exists
+                inserted = e.details.get("nUpserted", 0)
+            stats["inserted"] = inserted
+            stats["skipped"] += len(operations) - inserted
+            sync_topic_index(tldr_collection)
+        # Only advance the feed state once its entries are stored
+        feed_state_collection.update_one(
+            {"_id": feed_url},
+            {"$set": {
+                "etag": feed.get("etag"),
+                "modified": feed.get("modified"),
+                "watermark": newest,
+                "last_fetched_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
     except PyMongoError:
         # Could not reach MongoDB, skip this cycle
         print("Warning: MongoDB unavailable during TLDR fetch.")
+    stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return stats
+def find_duplicate_topics(tldr_collection, subtopics: list) -> Dict[str, tuple]:
+    """Near-duplicates among new subtopics as subtopic -> (cluster head, similarity); empty when disabled.
+    A failing embedder only disables the check for this fetch."""
+    if Config.TOPIC_DEDUP_MODE not in ("reject", "cluster") or not subtopics:
+        return {}
+    # Imported here so NumPy stays off the startup path
+    from topic_dedup import get_deduplicator
+    try:
+        deduplicator = get_deduplicator()
+        deduplicator.sync(tldr_collection)
+        return deduplicator.classify(subtopics)
+    except PyMongoError:
+        raise
+    except Exception as e:
+        print(f"Warning: topic deduplication skipped: {e}")
+        return {}
+
+def sync_topic_index(tldr_collection) -> None:
+    """Add newly stored subtopics to the dedup index"""
+    if Config.TOPIC_DEDUP_MODE not in ("reject", "cluster"):
+        return
+    from topic_dedup import get_deduplicator
+    try:
+        get_deduplicator().sync(tldr_collection)
+    except PyMongoError:
+        raise
+    except Exception as e:
+        print(f"Warning: could not update the topic index: {e}")
+
 # Function to extract subtopics from a title
 def extract_subtopics(title: str) -> list:
     """Extract subtopics from a title."""
@@ -171,19 +445,21 @@ def extract_subtopics(title: str) -> list:
 # Function to check if a topic has already been used
 def is_topic_used(topic: str) -> bool:
     """Check if a topic has already been used."""
-    if not MONGO_AVAILABLE or tldr_collection is None:
+    tldr_collection = get_tldr_collection()
+    if tldr_collection is None:
         return False
     # Check MongoDB for used topics by 'subtopic' and 'posted' True
     return tldr_collection.find_one({"subtopic": topic, "posted": True}) is not None
 # Function to fetch topics that have not been posted about
 def fetch_non_posted_topics():
     """Fetch topics that have not been posted about."""
-    if not MONGO_AVAILABLE:
+    tldr_collection = get_tldr_collection()
+    if tldr_collection is None:
         return []
     try:
         # Fetch topics where 'posted' is False or not set
         non_posted_topics = tldr_collection.find(
-            {"posted": {"$ne": True}},
+            {"posted": {"$ne": True}, "duplicate_of": None},
             {"_id": 0, "subtopic": 1}
         )
         # Each doc["subtopic"] is a string, not a list
@@ -194,37 +470,86 @@ def fetch_non_posted_topics():
 
 def mark_topics_as_posted(topics: list):
     """Mark topics as posted."""
-    if not MONGO_AVAILABLE:
+    tldr_collection = get_tldr_collection()
+    if tldr_collection is None:
         return
     try:
-        for topic in topics:
-            tldr_collection.update_many(
-                {"subtopic": topic},
-                {"$set": {"posted": True}}
-            )
+        tldr_collection.update_many(
+            {"subtopic": {"$in": list(topics)}},
+            {"$set": {"posted": True}}
+        )
     except Exception as e:
         print(f"Error marking topics as posted: {e}")
+
+def unmark_topics_as_posted(topics: list):
+    """Offer topics again, e.g. after the posts scheduled for them were cancelled."""
+    tldr_collection = get_tldr_collection()
+    if tldr_collection is None:
+        return
+    try:
+        tldr_collection.update_many(
+            {"subtopic": {"$in": list(topics)}},
+            {"$set": {"posted": False}}
+        )
+    except Exception as e:
+        print(f"Error unmarking posted topics: {e}")
 # Function to run the autonomous TLDR fetcher
-def autonomous_tldr_fetcher(interval=86400):
-    """Background thread to fetch TLDR news every day."""
-    while True:
-        try:
-            fetch_and_store_tldr_news()
-            print("TLDR news fetched and stored successfully.")
-        except Exception as e:
-            # Log any unexpected errors and continue
-            print(f"Error in TLDR fetcher: {e}")
-        time.sleep(interval)
+def autonomous_tldr_fetcher(feeds=None, stop_event: threading.Event = None):
+    """Background thread that polls each configured TLDR feed on its own interval."""
+    feeds = feeds or Config.get_tldr_feeds()
+    stop_event = stop_event or threading.Event()
+    next_run = {url: 0.0 for url, _ in feeds}
+    # Let the first MongoDB health check finish so the first poll is not wasted
+    while not database.has_checked() and not stop_event.wait(0.5):
+        pass
+    while not stop_event.is_set():
+        for url, interval in feeds:
+            if time.monotonic() < next_run[url]:
+                continue
+            if not database.is_available():
+                # Try again soon rather than waiting a full polling interval
+                next_run[url] = time.monotonic() + FETCH_RETRY_SECONDS
+                continue
+            try:
+                stats = fetch_and_store_tldr_news(url)
+                if stats["not_modified"]:
+                    print(f"TLDR feed {url} not modified; skipped parsing.")
+                else:
+                    print(
+                        f"TLDR news fetched and stored successfully from {url}: {stats['inserted']} inserted, "
+                        f"{stats['skipped']} skipped ({stats['duplicates']} near-duplicates) from {stats['entries']} new entries in {stats['duration_ms']} ms."
+                    )
+            except Exception as e:
+                # Log any unexpected errors and continue
+                print(f"Error in TLDR fetcher for {url}: {e}")
+            next_run[url] = time.monotonic() + interval
+        stop_event.wait(max(0.0, min(next_run.values()) - time.monotonic()))
 # Function to normalize existing titles
 def normalize_existing_titles():
     """Normalize existing rows in MongoDB by extracting subtopics from titles."""
-    if not MONGO_AVAILABLE:
+    if not database.is_available():
         print("MongoDB is not available.")
         return
 
     # Deprecated: No longer needed with 'subtopic' standardization
     pass
 
-# Start the background fetcher thread on import
-fetcher_thread = threading.Thread(target=autonomous_tldr_fetcher, daemon=True)
-fetcher_thread.start()
+_fetcher_stop = threading.Event()
+_fetcher_thread = None
+
+def start_tldr_fetcher() -> None:
+    """Start the background TLDR fetcher thread"""
+    global _fetcher_thread
+    if _fetcher_thread is not None and _fetcher_thread.is_alive():
+        return
+    _fetcher_stop.clear()
+    _fetcher_thread = threading.Thread(
+        target=autonomous_tldr_fetcher, kwargs={"stop_event": _fetcher_stop}, name="tldr-fetcher", daemon=True
+    )
+    _fetcher_thread.start()
+
+def stop_tldr_fetcher(timeout: float = 10) -> None:
+    """Signal the TLDR fetcher to stop and wait for its current fetch to finish"""
+    _fetcher_stop.set()
+    if _fetcher_thread is not None:
+        _fetcher_thread.join(timeout)
@@ -0,0 +1,237 @@
+"""
+Columnar post analytics.
+
+A member's post metrics are loaded once into NumPy arrays sorted by post
+time, with a dict from post ID to row, and kept until the member records
+a post or the entry expires (the single-user profile file's posts until
+the file changes). Engagement rates, rolling averages, percentile ranks
+and the best posting hours and weekdays are then computed with array
+operations, so a request over 100k posts takes milliseconds rather than a
+Python loop per post.
+
+Posts are dated by `posted_at` when present (an ISO datetime), otherwise
+by `date`. Only posts with a time of day count towards the best hours.
+"""
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analytics_rollups import WEEKDAYS, hour_label, parse_post_time
+from config import Config
+from data_manager import data_manager
+from tenant_store import TenantCache
+
+DAY = 86400
+# Rolling windows reported in summaries, in days
+ROLLING_WINDOWS = (7, 30, 90)
+
+def iso_time(timestamp: int) -> str:
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).isoformat()
+
+def round_or_none(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+class PostFrame:
+    """Metrics of one member's posts as parallel arrays in posting order"""
+
+    def __init__(self, posts: List[Dict[str, Any]]):
+        # One pass over the dicts; everything after it is array operations
+        times = []
+        values = []
+        for post in posts:
+            times.append(parse_post_time(post.get("posted_at") or post.get("date")))
+            values.append((
+                post.get("likes") or 0, post.get("comments") or 0, post.get("shares") or 0,
+                post.get("impressions") or 0, post.get("engagement_rate") or 0,
+            ))
+        # Undated posts sort first at timestamp 0 and are masked out of every date-based figure
+        timestamps = np.array([ts or 0 for ts, _ in times], dtype=np.int64)
+        has_date = np.array([ts is not None for ts, _ in times], dtype=bool)
+        has_time = np.array([flag for _, flag in times], dtype=bool)
+        columns = np.array(values, dtype=np.float64).reshape(len(posts), 5)
+        order = np.argsort(timestamps, kind="stable")
+        # Row in the list the frame was built from, for callers that kept it
+        self.source_rows = order
+        self.timestamps = timestamps[order]
+        self.dated = has_date[order]
+        columns = columns[order]
+        self.likes, self.comments, self.shares, self.impressions, stored_rate = columns.T
+        self.ids = np.array([str(post.get("id", "")) for post in posts], dtype=object)[order]
+        self.rows = {post_id: row for row, post_id in reversed(list(enumerate(self.ids)))}
+        interactions = self.likes + self.comments + self.shares
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Percent of impressions that interacted; the stored rate where impressions are unknown
+            self.engagement = np.where(self.impressions > 0, interactions / self.impressions * 100, stored_rate)
+        self.hours = np.where(has_time[order], (self.timestamps % DAY) // 3600, -1)
+        # 1970-01-01 was a Thursday; -1 for undated posts
+        self.weekdays = np.where(self.dated, (self.timestamps // DAY + 3) % 7, -1)
+        self.sorted_engagement = np.sort(self.engagement)
+        self.cumulative = np.concatenate(([0.0], np.cumsum(self.engagement)))
+        self._best_times = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, post_id: str) -> Optional[int]:
+        return self.rows.get(post_id)
+
+    def average(self) -> float:
+        return float(self.cumulative[-1] / len(self)) if len(self) else 0.0
+
+    def median(self) -> float:
+        middle = len(self) // 2
+        if len(self) % 2:
+            return float(self.sorted_engagement[middle])
+        return float((self.sorted_engagement[middle - 1] + self.sorted_engagement[middle]) / 2)
+
+    def window_mean(self, end_row: int, days: float) -> Optional[float]:
+        """Mean engagement of dated posts in the `days` up to and including row `end_row`; None if it is undated"""
+        if not self.dated[end_row]:
+            return None
+        start = int(np.searchsorted(self.timestamps, self.timestamps[end_row] - days * DAY, side="right"))
+        # Undated posts sit at timestamp 0, before any window of a dated post
+        return float((self.cumulative[end_row + 1] - self.cumulative[start]) / (end_row + 1 - start))
+
+    def percentile_rank(self, value: float) -> float:
+        """Percent of posts with lower engagement, counting ties as half"""
+        below = np.searchsorted(self.sorted_engagement, value, side="left")
+        at_or_below = np.searchsorted(self.sorted_engagement, value, side="right")
+        return float((below + at_or_below) / 2 / len(self) * 100)
+
+    def best_buckets(self, buckets: np.ndarray, size: int, top: int = 3) -> List[Tuple[int, int, float]]:
+        """(bucket, posts, mean engagement) of the best buckets, ignoring those with too few posts.
+        Buckets of -1 (unknown) are counted in a slot that is then dropped."""
+        counts = np.bincount(buckets + 1, minlength=size + 1)[1:]
+        totals = np.bincount(buckets + 1, weights=self.engagement, minlength=size + 1)[1:]
+        # Need a few posts per bucket once there is enough history to ask for it
+        min_posts = 3 if counts.sum() >= 3 * size else 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.where(counts >= min_posts, totals / counts, -np.inf)
+        best = np.argsort(-means, kind="stable")[:top]
+        return [(int(b), int(counts[b]), round(float(means[b]), 2)) for b in best if np.isfinite(means[b])]
+
+    def daily(self, days: int) -> List[Dict[str, Any]]:
+        """Posts and mean engagement per UTC day for the last `days` days of history, with a 7-day rolling mean"""
+        if not self.dated.any() or days <= 0:
+            return []
+        last_day = int(self.timestamps[-1] // DAY)
+        first_day = last_day - days + 1
+        # Six extra days so the first reported day has a full rolling window
+        start = int(np.searchsorted(self.timestamps, (first_day - 6) * DAY, side="left"))
+        day_index = self.timestamps[start:] // DAY - (first_day - 6)
+        counts = np.bincount(day_index, minlength=days + 6)
+        totals = np.bincount(day_index, weights=self.engagement[start:], minlength=days + 6)
+        count_sums = np.concatenate(([0], np.cumsum(counts)))
+        total_sums = np.concatenate(([0.0], np.cumsum(totals)))
+        series = []
+        for offset in range(6, days + 6):
+            window_posts = count_sums[offset + 1] - count_sums[offset - 6]
+            window_total = total_sums[offset + 1] - total_sums[offset - 6]
+            series.append({
+                "date": datetime.fromtimestamp((first_day - 6 + offset) * DAY, tz=timezone.utc).strftime("%Y-%m-%d"),
+                "posts": int(counts[offset]),
+                "avg_engagement_rate": round(float(totals[offset] / counts[offset]), 2) if counts[offset] else None,
+                "rolling_7d": round(float(window_total / window_posts), 2) if window_posts else None,
+            })
+        return series
+
+    def best_times(self) -> Dict[str, Any]:
+        """Best posting hours and weekdays; a frame never changes, so they are computed once"""
+        if self._best_times is None:
+            self._best_times = {
+                "best_posting_hours_utc": [
+                    {"hour": hour, "label": hour_label(hour), "posts": posts, "avg_engagement_rate": mean}
+                    for hour, posts, mean in self.best_buckets(self.hours, 24)
+                ],
+                "best_posting_days": [
+                    {"day": WEEKDAYS[day], "posts": posts, "avg_engagement_rate": mean}
+                    for day, posts, mean in self.best_buckets(self.weekdays, 7)
+                ],
+            }
+        return self._best_times
+
+    def summary(self, daily_days: int = 0, top: int = 5) -> Dict[str, Any]:
+        if not len(self):
+            return {"total_posts": 0}
+        last = len(self) - 1
+        dated_times = self.timestamps[self.dated]
+        # Partial selection of the top posts instead of sorting every post
+        top = min(top, len(self))
+        top_rows = np.argpartition(-self.engagement, top - 1)[:top]
+        top_rows = top_rows[np.argsort(-self.engagement[top_rows], kind="stable")]
+        return {
+            "total_posts": len(self),
+            "first_post": iso_time(dated_times[0]) if len(dated_times) else None,
+            "last_post": iso_time(dated_times[-1]) if len(dated_times) else None,
+            "total_impressions": int(self.impressions.sum()),
+            "avg_engagement_rate": round(self.average(), 2),
+            "median_engagement_rate": round(self.median(), 2),
+            "rolling_engagement_rate": {
+                f"{days}d": round_or_none(self.window_mean(last, days)) for days in ROLLING_WINDOWS
+            },
+            **self.best_times(),
+            "top_posts": [
+                {"id": self.ids[row], "engagement_rate": round(float(self.engagement[row]), 2)} for row in top_rows
+            ],
+            "daily": self.daily(daily_days),
+        }
+
+    def post_insights(self, row: int) -> Dict[str, Any]:
+        engagement = float(self.engagement[row])
+        average = self.average()
+        versus = (engagement / average - 1) * 100 if average else 0.0
+        hour = int(self.hours[row])
+        weekday = int(self.weekdays[row])
+        return {
+            "engagement_rate": round(engagement, 2),
+            "average_engagement_rate": round(average, 2),
+            "vs_average_percent": round(versus, 1),
+            "performance_vs_average": f"{versus:+.0f}% {'above' if versus >= 0 else 'below'} average engagement",
+            "percentile_rank": round(self.percentile_rank(engagement), 1),
+            "rank": int(len(self) - np.searchsorted(self.sorted_engagement, engagement, side="right") + 1),
+            "total_posts": len(self),
+            "rolling_30d_engagement_rate": round_or_none(self.window_mean(row, 30)),
+            "posted_day": WEEKDAYS[weekday] if weekday >= 0 else None,
+            "posted_hour_utc": hour_label(hour) if hour >= 0 else None,
+        }
+
+class AnalyticsEngine:
+    """Post frames per member, built on first use and dropped when their posts change"""
+
+    def __init__(self, max_members: int = 256, ttl_seconds: float = 300):
+        self.frames = TenantCache(max_members, ttl_seconds)
+        self._profile_frame: Tuple[Optional[str], Optional[PostFrame]] = (None, None)
+        self._lock = threading.Lock()
+
+    def frame(self, member_id: Optional[str] = None) -> PostFrame:
+        if not member_id:
+            snapshot = data_manager.profiles.snapshot
+            version = snapshot.section_versions.get("post_analytics", snapshot.version)
+            cached_version, frame = self._profile_frame
+            if frame is None or cached_version != version:
+                frame = PostFrame(snapshot.section("post_analytics").get("recent_posts", []))
+                self._profile_frame = (version, frame)
+            return frame
+        frame = self.frames.get(member_id)
+        if frame is None:
+            with self._lock:
+                frame = self.frames.get(member_id)
+                if frame is None:
+                    frame = PostFrame(data_manager.tenants.get_post_metrics(member_id))
+                    self.frames.set(member_id, frame)
+        return frame
+
+    def invalidate(self, member_id: str) -> None:
+        self.frames.invalidate(member_id)
+
+    def summary(self, member_id: Optional[str] = None, daily_days: int = 0) -> Dict[str, Any]:
+        return self.frame(member_id).summary(daily_days)
+
+    def post_insights(self, post_id: str, member_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        frame = self.frame(member_id)
+        row = frame.row(post_id)
+        return frame.post_insights(row) if row is not None else None
+
+analytics_engine = AnalyticsEngine(Config.ANALYTICS_CACHE_MAX_MEMBERS, Config.ANALYTICS_CACHE_TTL_SECONDS)
@@ -0,0 +1,288 @@
+"""
+Materialized daily, weekly and all-time post analytics per member.
+
+Each recorded post metric contributes counters (posts, likes, comments,
+shares, impressions and the sum of engagement rates) to its UTC day, its
+ISO week and the member's all-time bucket. The all-time bucket also keeps
+per-hour, per-weekday and per-hashtag counters, from which the best
+posting times and top hashtags are read. When a post's metrics are
+recorded again (e.g. by a metrics sync), the difference between the old
+and new version is added with `$inc`, so rollups never rescan history.
+
+Rollups live in the `analytics_rollups` collection next to
+`post_analytics`. Rebuild them from the raw posts, or check that they
+match, from the backend directory:
+    python -m analytics_rollups check [member_id]
+    python -m analytics_rollups rebuild [member_id]
+"""
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+COUNTERS = ("posts", "likes", "comments", "shares", "impressions", "engagement_sum")
+# Relative difference tolerated between stored and rebuilt float sums
+TOLERANCE = 1e-6
+
+def parse_post_time(value: Any) -> Tuple[Optional[int], bool]:
+    """UTC epoch seconds of a post's date or datetime, and whether it has a time of day"""
+    if isinstance(value, datetime):
+        moment, has_time = value, True
+    elif isinstance(value, str) and value:
+        try:
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None, False
+        has_time = len(value) > 10
+    else:
+        return None, False
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp()), has_time
+
+def hour_label(hour: int) -> str:
+    return f"{(hour % 12) or 12}:00 {'AM' if hour < 12 else 'PM'}"
+
+def engagement_rate(post: Dict[str, Any]) -> float:
+    """Percent of impressions that liked, commented or shared; the stored rate when impressions are unknown"""
+    impressions = post.get("impressions") or 0
+    if impressions > 0:
+        interactions = (post.get("likes") or 0) + (post.get("comments") or 0) + (post.get("shares") or 0)
+        return interactions / impressions * 100
+    return float(post.get("engagement_rate") or 0)
+
+def contributions(post: Dict[str, Any]) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """Counters one post adds to each (period, bucket) it belongs to"""
+    rate = engagement_rate(post)
+    counters = {
+        "posts": 1,
+        "likes": post.get("likes") or 0,
+        "comments": post.get("comments") or 0,
+        "shares": post.get("shares") or 0,
+        "impressions": post.get("impressions") or 0,
+        "engagement_sum": rate,
+    }
+    overall = dict(counters)
+    timestamp, has_time = parse_post_time(post.get("posted_at") or post.get("date"))
+    result = {("all", "all"): overall}
+    if timestamp is not None:
+        moment = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+        result[("day", moment.strftime("%Y-%m-%d"))] = dict(counters)
+        result[("week", moment.strftime("%G-W%V"))] = dict(counters)
+        overall[f"weekdays.{moment.weekday()}.posts"] = 1
+        overall[f"weekdays.{moment.weekday()}.engagement_sum"] = rate
+        if has_time:
+            overall[f"hours.{moment.hour}.posts"] = 1
+            overall[f"hours.{moment.hour}.engagement_sum"] = rate
+    for tag in set(HASHTAG_PATTERN.findall(post.get("content") or "")):
+        overall[f"hashtags.{tag}.posts"] = 1
+        overall[f"hashtags.{tag}.engagement_sum"] = rate
+    return result
+
+def add_contributions(totals: Dict[Tuple[str, str], Dict[str, float]], post: Optional[Dict[str, Any]],
+                      sign: int = 1) -> None:
+    if not post:
+        return
+    for key, counters in contributions(post).items():
+        bucket = totals.setdefault(key, {})
+        for name, value in counters.items():
+            bucket[name] = bucket.get(name, 0) + sign * value
+
+def nest(flat: Dict[str, float]) -> Dict[str, Any]:
+    """Turn "hours.13.posts"-style keys into nested documents, as MongoDB stores them"""
+    document: Dict[str, Any] = {}
+    for path, value in flat.items():
+        target = document
+        *parents, leaf = path.split(".")
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return document
+
+def ranked(groups: Dict[str, Dict[str, float]], min_posts: int, top: int) -> List[Tuple[str, int, float]]:
+    """(key, posts, mean engagement) of the groups with the best mean engagement"""
+    rows = [
+        (key, int(group.get("posts", 0)), group.get("engagement_sum", 0) / group["posts"])
+        for key, group in groups.items() if group.get("posts", 0) >= min_posts
+    ]
+    rows.sort(key=lambda row: (-row[2], -row[1]))
+    return [(key, posts, round(mean, 2)) for key, posts, mean in rows[:top]]
+
+def series_entry(doc: Dict[str, Any]) -> Dict[str, Any]:
+    posts = doc.get("posts", 0)
+    return {
+        "period": doc["bucket"],
+        "posts": posts,
+        "likes": doc.get("likes", 0),
+        "comments": doc.get("comments", 0),
+        "shares": doc.get("shares", 0),
+        "impressions": doc.get("impressions", 0),
+        "avg_engagement_rate": round(doc.get("engagement_sum", 0) / posts, 2) if posts else None,
+    }
+
+def format_rollups(overall: Optional[Dict[str, Any]], days: List[Dict[str, Any]],
+                   weeks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Overall metrics and daily/weekly series from rollup documents"""
+    overall = overall or {}
+    posts = overall.get("posts", 0)
+    # Ask for a few posts per hour or hashtag once there is enough history
+    min_posts = 3 if posts >= 30 else 1
+    hours = ranked(overall.get("hours", {}), min_posts, 3)
+    weekdays = ranked(overall.get("weekdays", {}), min_posts, 3)
+    hashtags = ranked(overall.get("hashtags", {}), min_posts, 5)
+    return {
+        "overall_metrics": {
+            "total_posts": posts,
+            "total_impressions": overall.get("impressions", 0),
+            "avg_engagement_rate": round(overall.get("engagement_sum", 0) / posts, 2) if posts else 0.0,
+            "best_posting_times": [hour_label(int(hour)) for hour, _, _ in hours],
+            "best_posting_days": [WEEKDAYS[int(day)] for day, _, _ in weekdays],
+            "top_performing_hashtags": [f"#{tag}" for tag, _, _ in hashtags],
+        },
+        "rollups": {
+            "daily": [series_entry(doc) for doc in days],
+            "weekly": [series_entry(doc) for doc in weeks],
+        },
+    }
+
+def merge_overall(stored: Dict[str, Any], computed: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored overall metrics (e.g. followers) updated with computed ones, keeping stored lists the rollups cannot fill"""
+    merged = dict(stored)
+    if computed.get("total_posts"):
+        merged.update({name: value for name, value in computed.items() if value or not isinstance(value, list)})
+    return merged
+
+def summarize_posts(posts: Iterable[Dict[str, Any]], days: int = 14, weeks: int = 12) -> Dict[str, Any]:
+    """The same output as AnalyticsRollups.read, computed from a list of posts (e.g. the profile file)"""
+    totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for post in posts:
+        add_contributions(totals, post)
+    docs = {key: dict(nest(counters), period=key[0], bucket=key[1]) for key, counters in totals.items()}
+    latest = lambda period, count: sorted(
+        (doc for (p, _), doc in docs.items() if p == period), key=lambda doc: doc["bucket"]
+    )[-count:] if count else []
+    return format_rollups(docs.get(("all", "all")), latest("day", days), latest("week", weeks))
+
+class AnalyticsRollups:
+    """Rollup documents per member in MongoDB"""
+
+    def __init__(self, db):
+        self._rollups = db["analytics_rollups"]
+        self._posts = db["post_analytics"]
+        try:
+            self._rollups.create_index(
+                [("member_id", ASCENDING), ("period", ASCENDING), ("bucket", DESCENDING)],
+                name="member_period_bucket"
+            )
+        except PyMongoError as e:
+            print(f"Warning: could not create index member_period_bucket on analytics_rollups: {e}")
+
+    @staticmethod
+    def _id(member_id: str, period: str, bucket: str) -> str:
+        return f"{member_id}|{period}|{bucket}"
+
+    def apply(self, member_id: str, old_post: Optional[Dict[str, Any]], new_post: Optional[Dict[str, Any]]) -> None:
+        """Add the change from `old_post` (None for a new post) to `new_post` to the member's rollups"""
+        totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+        add_contributions(totals, old_post, -1)
+        add_contributions(totals, new_post, 1)
+        operations = []
+        for (period, bucket), counters in totals.items():
+            increments = {name: value for name, value in counters.items() if value}
+            if not increments:
+                continue
+            operations.append(UpdateOne(
+                {"_id": self._id(member_id, period, bucket)},
+                {"$inc": increments, "$setOnInsert": {"member_id": member_id, "period": period, "bucket": bucket}},
+                upsert=True
+            ))
+        if operations:
+            self._rollups.bulk_write(operations, ordered=False)
+
+    def read(self, member_id: str, days: int = 14, weeks: int = 12) -> Dict[str, Any]:
+        """Overall metrics and the latest daily and weekly rollups, from a few documents"""
+        overall = self._rollups.find_one({"_id": self._id(member_id, "all", "all")})
+        latest = lambda period, count: list(reversed(list(
+            self._rollups.find({"member_id": member_id, "period": period}).sort("bucket", DESCENDING).limit(count)
+        ))) if count else []
+        return format_rollups(overall, latest("day", days), latest("week", weeks))
+
+    def compute(self, member_id: str) -> Dict[str, Dict[str, Any]]:
+        """Rollup documents for a member, computed from every raw post"""
+        totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for post in self._posts.find({"member_id": member_id}, {"_id": 0}):
+            add_contributions(totals, post)
+        return {
+            self._id(member_id, period, bucket): dict(
+                nest(counters), _id=self._id(member_id, period, bucket),
+                member_id=member_id, period=period, bucket=bucket
+            )
+            for (period, bucket), counters in totals.items()
+        }
+
+    def members(self, member_id: Optional[str] = None) -> List[str]:
+        if member_id:
+            return [member_id]
+        return sorted(set(self._posts.distinct("member_id")) | set(self._rollups.distinct("member_id")))
+
+    def rebuild(self, member_id: Optional[str] = None) -> int:
+        """Replace rollups with ones computed from the raw posts; returns the number of documents written"""
+        written = 0
+        for member in self.members(member_id):
+            docs = list(self.compute(member).values())
+            self._rollups.delete_many({"member_id": member})
+            if docs:
+                self._rollups.insert_many(docs)
+            written += len(docs)
+        return written
+
+    def check(self, member_id: Optional[str] = None) -> List[str]:
+        """Differences between stored rollups and ones rebuilt from the raw posts"""
+        problems = []
+        for member in self.members(member_id):
+            expected = self.compute(member)
+            stored = {doc["_id"]: doc for doc in self._rollups.find({"member_id": member})}
+            for key in sorted(set(expected) | set(stored)):
+                difference = compare(expected.get(key, {}), stored.get(key, {}))
+                if difference:
+                    problems.append(f"{key}: {difference}")
+        return problems
+
+def compare(expected: Dict[str, Any], stored: Dict[str, Any], path: str = "") -> Optional[str]:
+    """First difference between two rollup documents, ignoring counters that are zero on one side"""
+    for name in sorted(set(expected) | set(stored)):
+        if name in ("_id", "member_id", "period", "bucket"):
+            continue
+        left, right = expected.get(name, 0), stored.get(name, 0)
+        if isinstance(left, dict) or isinstance(right, dict):
+            difference = compare(left or {}, right or {}, f"{path}{name}.")
+            if difference:
+                return difference
+        elif abs(left - right) > TOLERANCE * max(1.0, abs(left), abs(right)):
+            return f"{path}{name} expected {left}, stored {right}"
+    return None
+
+def main(argv: List[str]) -> None:
+    import database
+    if not argv or argv[0] not in ("check", "rebuild"):
+        sys.exit("Usage: python -m analytics_rollups check|rebuild [member_id]")
+    if not database.check_connection():
+        sys.exit("MongoDB is not reachable.")
+    rollups = AnalyticsRollups(database.get_db())
+    member_id = argv[1] if len(argv) > 1 else None
+    if argv[0] == "rebuild":
+        print(f"Rebuilt {rollups.rebuild(member_id)} rollup documents.")
+        return
+    problems = rollups.check(member_id)
+    for problem in problems:
+        print(problem)
+    print(f"{len(problems)} rollup documents differ from the raw posts.")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
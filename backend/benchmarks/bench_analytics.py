@@ -0,0 +1,84 @@
+"""
+Analytics engine benchmark: build a columnar frame from synthetic posts,
+then time a summary, per-post insights and post lookups, next to plain
+Python loops that compute the same numbers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_analytics [posts] [lookups]
+"""
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from analytics_engine import PostFrame
+
+def synthetic_posts(count: int, seed: int = 1):
+    """Posts over the last few years with engagement that depends on hour and weekday"""
+    rng = random.Random(seed)
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    span = (datetime(2026, 1, 1, tzinfo=timezone.utc) - start).total_seconds()
+    posts = []
+    for index in range(count):
+        posted_at = start + timedelta(seconds=rng.random() * span)
+        impressions = int(rng.lognormvariate(7, 0.8)) + 1
+        boost = 1.6 if posted_at.hour in (8, 9, 13) else 1.0
+        boost *= 1.2 if posted_at.weekday() in (1, 2) else 1.0
+        likes = int(impressions * rng.uniform(0.01, 0.05) * boost)
+        posts.append({
+            "id": f"post{index}",
+            "posted_at": posted_at.isoformat(),
+            "date": posted_at.strftime("%Y-%m-%d"),
+            "likes": likes,
+            "comments": likes // 4,
+            "shares": likes // 8,
+            "impressions": impressions,
+        })
+    return posts
+
+def python_summary(posts):
+    """The same core numbers with per-post Python loops, for comparison"""
+    rates = [(p["likes"] + p["comments"] + p["shares"]) / p["impressions"] * 100 for p in posts]
+    by_hour = defaultdict(list)
+    for post, rate in zip(posts, rates):
+        by_hour[datetime.fromisoformat(post["posted_at"]).hour].append(rate)
+    best_hours = sorted(by_hour, key=lambda hour: -statistics.fmean(by_hour[hour]))[:3]
+    latest = max(datetime.fromisoformat(p["posted_at"]) for p in posts)
+    recent = [rate for post, rate in zip(posts, rates)
+              if latest - datetime.fromisoformat(post["posted_at"]) < timedelta(days=30)]
+    return statistics.fmean(rates), statistics.median(rates), best_hours, statistics.fmean(recent)
+
+def timed(function, repeat: int = 1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+def main(count: int = 100_000, lookups: int = 1000) -> None:
+    posts = synthetic_posts(count)
+    ids = [f"post{random.randrange(count)}" for _ in range(lookups)]
+
+    build_ms, frame = timed(lambda: PostFrame(posts))
+    first_ms, _ = timed(lambda: frame.summary())
+    summary_ms, summary = timed(lambda: frame.summary(), repeat=20)
+    daily_ms, _ = timed(lambda: frame.summary(daily_days=90), repeat=20)
+    insights_ms, _ = timed(lambda: [frame.post_insights(frame.row(post_id)) for post_id in ids])
+    python_ms, _ = timed(lambda: python_summary(posts))
+    scan_ms, _ = timed(lambda: [next(p for p in posts if p["id"] == post_id) for post_id in ids[:50]])
+
+    print(f"Posts:                          {count}")
+    print(f"Frame build (once per member):  {build_ms:.1f} ms")
+    print(f"First summary (best times):     {first_ms:.2f} ms")
+    print(f"Summary:                        {summary_ms:.2f} ms")
+    print(f"Summary with 90 daily points:   {daily_ms:.2f} ms")
+    print(f"Post insights:                  {insights_ms / lookups * 1000:.1f} us per post")
+    print(f"Python-loop summary:            {python_ms:.1f} ms")
+    print(f"Linear scan lookup:             {scan_ms / 50 * 1000:.1f} us per post")
+    print(f"Best hours (UTC):               {[hour['label'] for hour in summary['best_posting_hours_utc']]}")
+    print(f"Best days:                      {[day['day'] for day in summary['best_posting_days']]}")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,55 @@
+"""
+Content calendar benchmark: plan 90-day calendars for many members, each
+with its own synthetic engagement history, strategies and a shared pool of
+news topics.
+
+Run from the backend directory:
+    python -m benchmarks.bench_calendar [members] [days] [posts_per_member]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from analytics_engine import PostFrame
+from benchmarks.bench_analytics import synthetic_posts
+from calendar_engine import build_calendar, slot_scores
+from topic_dedup import HashingEmbedder
+
+FREQUENCIES = ["once a week", "twice a week", "3 times a week", "daily", "every other week"]
+WORDS = "AI cloud rust python security data startup funding chips model agents open source release".split()
+
+def main(members: int = 1000, days: int = 90, posts_per_member: int = 500) -> None:
+    rng = random.Random(7)
+    news = [(" ".join(rng.sample(WORDS, 4)).capitalize(), rng.uniform(0, 10)) for _ in range(200)]
+    embedder = HashingEmbedder(256)
+    frames = [PostFrame(synthetic_posts(posts_per_member, seed=member)) for member in range(members)]
+    strategies = [
+        {
+            content_type: {"frequency": rng.choice(FREQUENCIES), "topics": rng.sample(WORDS, 3), "tone": "Direct"}
+            for content_type in rng.sample(["thought_leadership", "educational", "engagement", "news"], 3)
+        }
+        for _ in range(members)
+    ]
+
+    started = time.perf_counter()
+    total_posts = 0
+    for frame, member_strategies in zip(frames, strategies):
+        calendar = build_calendar(
+            days, list(member_strategies), member_strategies,
+            slot_scores(frame.weekdays, frame.hours, frame.engagement),
+            news, ["#AI"], date(2026, 1, 5), embedder=embedder
+        )
+        total_posts += calendar["total_posts"]
+    elapsed = time.perf_counter() - started
+
+    print(f"Members:             {members}")
+    print(f"Horizon:             {days} days, {posts_per_member} past posts each")
+    print(f"Posts planned:       {total_posts}")
+    print(f"Total:               {elapsed * 1000:.0f} ms")
+    print(f"Per member:          {elapsed / members * 1000:.2f} ms")
+    print(f"Last calendar ends:  {date(2026, 1, 5) + timedelta(days=days - 1)}")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
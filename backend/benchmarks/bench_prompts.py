@@ -0,0 +1,91 @@
+"""
+Prompt building benchmark: time to build a personalized prompt and input
+tokens per request, for the previous single f-string prompt and for the
+template builder (system instruction + per-call prompt).
+
+Run from the backend directory:
+    python -m benchmarks.bench_prompts [requests] [--count-tokens]
+
+Token counts are estimated at 4 characters per token unless --count-tokens
+is given, which asks Gemini's count_tokens endpoint (needs GEMINI_API_KEY).
+"""
+import sys
+import time
+
+from config import Config
+from data_manager import data_manager
+from prompt_templates import PromptBuilder
+
+TOPICS = ["AI agents in production", "Platform engineering", "Rust for backend services", "Hiring juniors"]
+
+def legacy_prompt(topic: str, content_type: str, user_profile: dict) -> str:
+    """The prompt as AIService built it before templates, for comparison"""
+    name = user_profile.get("name", "a LinkedIn professional")
+    headline = user_profile.get("headline", "industry expert")
+    industry = user_profile.get("industry", "Technology")
+    position = user_profile.get("position", "Professional")
+    company = user_profile.get("company", "their organization")
+    summary = user_profile.get("summary", "Experienced professional with practical insights.")
+    skills = user_profile.get("skills") or []
+    skills_text = ", ".join(str(skill) for skill in skills[:5]) if skills else "Leadership, Communication"
+    interests = user_profile.get("interests") or []
+    interests_text = ", ".join(str(interest) for interest in interests[:3]) if interests else "Innovation, Growth"
+    return f"""
+        Act as a LinkedIn content expert. You're writing for {name}, who is a {headline}.
+        Add a hook to grab attention.
+        User Background:
+        - Industry: {industry}
+        - Position: {position} at {company}
+        - Skills: {skills_text}
+        - Interests: {interests_text}
+        - Summary: {summary}
+
+        Generate a {content_type} LinkedIn post about '{topic}' that:
+        1. Reflects their expertise and experience
+        2. Uses their authentic voice and perspective
+        3. Includes relevant insights from their background
+        4. Encourages meaningful engagement
+        5. Includes 5-7 relevant hashtags
+        6. Use 3-4 emojis
+
+        Keep it professional, engaging, and under 300 words.
+        Do NOT use any Markdown formatting (such as ##, #, *, or other Markdown symbols) in the post. Write the post as plain text only, without headings or Markdown.
+        """
+
+def token_counter(use_api: bool):
+    if not use_api:
+        return lambda text: round(len(text) / 4)
+    import google.generativeai as genai
+    genai.configure(api_key=Config.GEMINI_API_KEY)
+    model = genai.GenerativeModel(Config.GEMINI_MODEL)
+    return lambda text: model.count_tokens(text).total_tokens
+
+def main(requests: int = 100_000, count_tokens: bool = False) -> None:
+    profile = data_manager.get_user_profile()
+    builder = PromptBuilder(Config.PROMPT_TEMPLATE_VERSION)
+
+    started = time.perf_counter()
+    for index in range(requests):
+        legacy = legacy_prompt(TOPICS[index % len(TOPICS)], "thought_leadership", profile)
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for index in range(requests):
+        system, prompt = builder.personalized_post(TOPICS[index % len(TOPICS)], "thought_leadership", profile)
+    builder_seconds = time.perf_counter() - started
+
+    count = token_counter(count_tokens)
+    legacy_tokens, system_tokens, prompt_tokens = count(legacy), count(system), count(prompt)
+    source = "count_tokens" if count_tokens else "estimated"
+
+    print(f"Requests:                          {requests}")
+    print(f"Build time, single f-string:       {legacy_seconds / requests * 1e6:.2f} us/request")
+    print(f"Build time, templates:             {builder_seconds / requests * 1e6:.2f} us/request")
+    print(f"Input tokens, single f-string:     {legacy_tokens} ({source})")
+    print(f"Input tokens, templates:           {system_tokens + prompt_tokens} "
+          f"= {system_tokens} system instruction + {prompt_tokens} per call ({source})")
+    print(f"Profile block cache:               {builder.stats()}")
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    main(int(args[0]) if args else 100_000, "--count-tokens" in sys.argv)
@@ -0,0 +1,40 @@
+"""
+Time-to-first-request benchmark.
+
+Starts a fresh interpreter per run, imports the app, runs the lifespan
+startup and serves GET /. MongoDB defaults to an unroutable address so the
+numbers show what a cold start costs when the database is down.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import time
+started = time.perf_counter()
+from fastapi.testclient import TestClient
+import main
+with TestClient(main.app) as client:
+    client.get("/")
+    print("first_request_seconds", time.perf_counter() - started)
+"""
+
+def main(runs: int = 5) -> None:
+    env = dict(os.environ)
+    env.setdefault("MONGODB_URI", "mongodb://10.255.255.1:27017/")
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        line = next(line for line in output.splitlines() if line.startswith("first_request_seconds"))
+        timings.append(float(line.split()[1]))
+    print(f"Runs:                    {runs}")
+    print(f"Time to first request:   median {statistics.median(timings):.2f}s, max {max(timings):.2f}s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
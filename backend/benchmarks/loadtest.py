@@ -0,0 +1,267 @@
+"""
+Load test for the generation and TLDR endpoints at a target request rate.
+
+By default the app runs in-process (httpx's ASGI transport) with MongoDB
+replaced by mongomock and every model call routed to an offline
+FakeBackend, so no network or Gemini quota is used. Requests are sent
+open-loop: each one starts at its scheduled time whether or not earlier
+ones have finished, and latency is measured from that scheduled time, so
+queueing delay is included. The ASGI transport hands over a response only
+once it is complete, so time to first byte of streamed endpoints is only
+reported with --url. With --mongo-uri, the synthetic TLDR documents seeded
+into that database are removed again when the run ends.
+
+Run from the backend directory (needs `pip install httpx mongomock`):
+    python -m benchmarks.loadtest --rps 20 --duration 30
+    python -m benchmarks.loadtest --model "fake:lt?latency=lognormal:1.5:0.6&error_rate=0.05" --max-in-flight 8
+    python -m benchmarks.loadtest --mongo-uri mongodb://localhost:27017/   # local mongod instead of mongomock
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000              # a running server, with its own config
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_MODEL = "fake:loadtest?latency=lognormal:0.8:0.5&error_rate=0.01&output_tokens=200"
+DEFAULT_MIX = "personalized=3,personalized_stream=1,optimize=2,news=2,non_posted=2,used=1"
+
+# name -> builder of (HTTP method, path, JSON body, streamed) for request number i
+EndpointBuilder = Callable[[int], Tuple[str, str, Optional[Dict[str, Any]], bool]]
+
+def build_endpoints(topics: int, subtopics: List[str]) -> Dict[str, EndpointBuilder]:
+    return {
+        "personalized": lambda i: (
+            "POST", "/generate-personalized-content", {"topic": f"Load test topic {i % topics}"}, False
+        ),
+        "personalized_stream": lambda i: (
+            "POST", "/generate-personalized-content/stream", {"topic": f"Load test topic {i % topics}"}, True
+        ),
+        "optimize": lambda i: (
+            "POST", "/optimize-post", {"text": f"Draft post {i % topics}: shipping faster with AI agents."}, False
+        ),
+        "news": lambda i: ("POST", "/generate-news-post", {"title": subtopics[i % len(subtopics)]}, False),
+        "non_posted": lambda i: ("GET", "/non-posted-topics", None, False),
+        "used": lambda i: ("GET", "/used-topics", None, False),
+    }
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name:
+            mix[name] = int(weight or 1)
+    return mix
+
+def seed_tldr_news(collection, count: int) -> List[str]:
+    """Insert synthetic TLDR subtopics and return their titles"""
+    from datetime import datetime, timedelta, timezone
+    now = datetime.now(timezone.utc)
+    titles = [f"Synthetic TLDR headline {index}" for index in range(count)]
+    collection.insert_many([
+        {
+            "title": f"TLDR {index // 5}",
+            "subtopic": title,
+            "link": f"https://tldr.tech/synthetic/{index // 5}",
+            "published": (now - timedelta(hours=index)).isoformat(),
+            "published_at": now - timedelta(hours=index),
+            "feed": "loadtest",
+        }
+        for index, title in enumerate(titles)
+    ])
+    return titles
+
+def setup_in_process(args) -> Tuple[Any, List[str]]:
+    """Import the app against mongomock (or a local mongod) and a fake model; returns (app, subtopics)"""
+    if args.mongo_uri:
+        os.environ["MONGODB_URI"] = args.mongo_uri
+    import database
+    if args.mongo_uri:
+        if not database.check_connection():
+            sys.exit(f"MongoDB at {args.mongo_uri} is not reachable")
+        db = database.get_db()
+        db["tldr_news"].delete_many({"feed": "loadtest"})
+    else:
+        import mongomock
+        import mongomock.collection
+
+        # pymongo 4.9+ passes `sort` to bulk update builders, which mongomock does not accept yet
+        add_update = mongomock.collection.BulkOperationBuilder.add_update
+        def add_update_without_sort(self, *a, sort=None, **kw):
+            return add_update(self, *a, **kw)
+        mongomock.collection.BulkOperationBuilder.add_update = add_update_without_sort
+
+        db = mongomock.MongoClient()[database.DATABASE_NAME]
+        database.get_db = lambda: db
+        database._available = True
+        database._checked.set()
+    subtopics = seed_tldr_news(db["tldr_news"], args.topics)
+
+    from config import Config
+    from concurrency import GenerationLimiter
+    from model_backends import FakeBackend
+    from main import app
+    from ai_service import ai_service
+
+    Config.LLM_CACHE_ENABLED = not args.no_cache
+    ai_service.router.use_backend(FakeBackend.from_name(args.model))
+    ai_service.limiter = GenerationLimiter(
+        args.max_in_flight or Config.GEMINI_MAX_IN_FLIGHT,
+        Config.GEMINI_MAX_QUEUE if args.max_queue is None else args.max_queue,
+        Config.GEMINI_RETRY_AFTER_SECONDS
+    )
+    return app, subtopics
+
+def cleanup_in_process(args) -> None:
+    """Remove the synthetic TLDR documents seeded into a real MongoDB"""
+    if args.mongo_uri:
+        import database
+        removed = database.get_db()["tldr_news"].delete_many({"feed": "loadtest"}).deleted_count
+        print(f"Removed {removed} seeded TLDR documents from {args.mongo_uri}")
+
+class Results:
+    """Latency samples and outcomes per endpoint"""
+
+    def __init__(self, track_first_byte: bool = True):
+        self.track_first_byte = track_first_byte
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.first_byte: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, endpoint: str, status: str, latency: float, first_byte: Optional[float] = None) -> None:
+        self.statuses[endpoint][status] += 1
+        if status.startswith("2"):
+            self.latencies[endpoint].append(latency)
+            if first_byte is not None and self.track_first_byte:
+                self.first_byte[endpoint].append(first_byte)
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+async def send(client: httpx.AsyncClient, endpoint: str, request: Tuple, scheduled: float,
+               results: Results, timeout: float) -> None:
+    method, path, body, streamed = request
+    first_byte = None
+    try:
+        if streamed:
+            async with client.stream(method, path, json=body, timeout=timeout) as response:
+                async for _ in response.aiter_raw():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - scheduled
+                status = str(response.status_code)
+        else:
+            response = await client.request(method, path, json=body, timeout=timeout)
+            status = str(response.status_code)
+    except httpx.TimeoutException:
+        status = "client_timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    results.add(endpoint, status, time.perf_counter() - scheduled, first_byte)
+
+async def run(client: httpx.AsyncClient, endpoints: Dict[str, EndpointBuilder], mix: Dict[str, int],
+              rps: float, duration: float, timeout: float, seed: int,
+              track_first_byte: bool = True) -> Tuple[Results, float]:
+    """Send requests open-loop at `rps` for `duration` seconds, choosing endpoints by weight"""
+    rng = random.Random(seed)
+    names = [name for name in mix if name in endpoints]
+    weights = [mix[name] for name in names]
+    counters = {name: itertools.count() for name in names}
+    results = Results(track_first_byte)
+    tasks = []
+    total = int(rps * duration)
+    started = time.perf_counter()
+    for index in range(total):
+        scheduled = started + index / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint = rng.choices(names, weights)[0]
+        request = endpoints[endpoint](next(counters[endpoint]))
+        tasks.append(asyncio.create_task(send(client, endpoint, request, scheduled, results, timeout)))
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - started
+
+def report(results: Results, elapsed: float, target_rps: float) -> None:
+    print(f"Target rate: {target_rps:.1f} req/s, wall time: {elapsed:.1f}s\n")
+    header = f"{'endpoint':<22}{'sent':>6}{'2xx':>6}{'ok/s':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}  other statuses"
+    print(header)
+    print("-" * len(header))
+    all_latencies, sent_total, ok_total = [], 0, 0
+    for endpoint in sorted(results.statuses):
+        statuses = results.statuses[endpoint]
+        latencies = results.latencies[endpoint]
+        sent = sum(statuses.values())
+        ok = len(latencies)
+        sent_total += sent
+        ok_total += ok
+        all_latencies.extend(latencies)
+        others = ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items()) if not status.startswith("2"))
+        print(f"{endpoint:<22}{sent:>6}{ok:>6}{ok / elapsed:>7.1f}"
+              f"{percentile(latencies, 0.50):>8.3f}{percentile(latencies, 0.95):>8.3f}"
+              f"{percentile(latencies, 0.99):>8.3f}{max(latencies, default=float('nan')):>8.3f}  {others}")
+        if results.first_byte[endpoint]:
+            first = results.first_byte[endpoint]
+            print(f"{'  first byte':<22}{'':>6}{'':>6}{'':>7}{percentile(first, 0.50):>8.3f}"
+                  f"{percentile(first, 0.95):>8.3f}{percentile(first, 0.99):>8.3f}{max(first):>8.3f}")
+    print("-" * len(header))
+    print(f"{'all':<22}{sent_total:>6}{ok_total:>6}{ok_total / elapsed:>7.1f}"
+          f"{percentile(all_latencies, 0.50):>8.3f}{percentile(all_latencies, 0.95):>8.3f}"
+          f"{percentile(all_latencies, 0.99):>8.3f}{max(all_latencies, default=float('nan')):>8.3f}")
+    print("\nLatencies in seconds, measured from each request's scheduled start.")
+    if not results.track_first_byte:
+        print("Streamed responses arrive whole through the in-process transport; use --url for time to first byte.")
+
+async def main(args) -> None:
+    mix = parse_mix(args.mix)
+    unknown = set(mix) - set(build_endpoints(args.topics, ["AI agents"]))
+    if unknown:
+        sys.exit(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url) as probe:
+            topics = (await probe.get("/non-posted-topics")).json().get("topics") or ["AI agents"]
+        subtopics = [topic if isinstance(topic, str) else topic.get("subtopic", "") for topic in topics]
+        async with httpx.AsyncClient(base_url=args.url) as client:
+            results, elapsed = await run(client, build_endpoints(args.topics, subtopics), mix,
+                                         args.rps, args.duration, args.timeout, args.seed)
+        report(results, elapsed, args.rps)
+        return
+    app, subtopics = setup_in_process(args)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            results, elapsed = await run(client, build_endpoints(args.topics, subtopics), mix,
+                                         args.rps, args.duration, args.timeout, args.seed, track_first_byte=False)
+    finally:
+        cleanup_in_process(args)
+    report(results, elapsed, args.rps)
+    from ai_service import ai_service
+    print(f"Model limiter: {ai_service.limiter.stats()}")
+    print(f"Model routes:  {ai_service.router.stats()['models']}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=10, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to send requests for")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight pairs")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="fake model spec (see model_backends.FakeBackend)")
+    parser.add_argument("--topics", type=int, default=500, help="distinct topics and seeded TLDR subtopics")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="override GEMINI_MAX_IN_FLIGHT")
+    parser.add_argument("--max-queue", type=int, default=None, help="override GEMINI_MAX_QUEUE")
+    parser.add_argument("--no-cache", action="store_true", help="disable the LLM response cache")
+    parser.add_argument("--timeout", type=float, default=120, help="client timeout per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo-uri", default=None, help="use this MongoDB instead of mongomock")
+    parser.add_argument("--url", default=None, help="load-test a running server instead of an in-process app")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
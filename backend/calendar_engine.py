@@ -0,0 +1,244 @@
+"""
+Content calendar planning from a member's strategies, engagement history
+and unused TLDR subtopics.
+
+Each content type gets posts in proportion to its strategy frequency
+("once a week", "twice a week", "daily"), spread over the horizon in equal
+windows. Every (day, hour) of the horizon is scored by how well posts at
+that weekday and UTC hour have done, shrunk towards the member's average
+where history is thin and towards typical business hours where there is
+none. Slots are filled greedily, the most constrained window first, with a
+cap per day and a minimum gap between posts. Topics are then matched to
+slots greedily on a value matrix: how well a topic fits the slot's content
+type, how fresh a news topic still is on the slot's day, and how good the
+slot is, so the strongest topics land in the best times. Slots left over
+rotate through their strategy's own topics.
+
+Everything is NumPy over a (days x 24) grid, so a 90-day plan takes a
+millisecond or two per member.
+"""
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analytics_rollups import hour_label
+from tenant_store import TenantCache
+from topic_dedup import Embedder, HashingEmbedder
+
+WORD_NUMBERS = {"once": 1, "one": 1, "twice": 2, "two": 2, "thrice": 3, "three": 3, "four": 4, "five": 5,
+                "six": 6, "seven": 7}
+DEFAULT_HASHTAGS = ["#TechLeadership", "#AI", "#SoftwareEngineering"]
+# Typical LinkedIn engagement by UTC hour and weekday, used where a member has no history
+BUSINESS_HOURS = np.full(24, 0.3)
+BUSINESS_HOURS[7:19] = 1.0
+BUSINESS_HOURS[[8, 9, 12, 13, 17]] = 1.15
+WEEKDAY_PRIOR = np.array([1.0, 1.1, 1.1, 1.05, 0.95, 0.7, 0.7])
+DEFAULT_SLOT_PRIOR = np.outer(WEEKDAY_PRIOR, BUSINESS_HOURS)
+# Weight, in posts, of the prior against a member's own average engagement per hour or weekday
+PRIOR_POSTS = 5
+# News topics whose freshness falls below this on a slot's day are not used for it
+MIN_FRESHNESS = 0.1
+# Embeddings of recent strategy and topic texts, keyed by (embedder name, text)
+_vectors = TenantCache(4096, 3600)
+
+def posts_per_week(frequency: Any) -> float:
+    """Posts per week from a strategy frequency such as "once a week", "3 times a week" or "daily" """
+    if isinstance(frequency, (int, float)):
+        return max(0.0, float(frequency))
+    text = str(frequency or "").lower()
+    match = re.search(r"\d+(\.\d+)?", text)
+    if match:
+        count = float(match.group())
+    else:
+        count = next((value for word, value in WORD_NUMBERS.items() if re.search(rf"\b{word}\b", text)), 1)
+    if "month" in text:
+        return count * 7 / 30
+    if "other week" in text or "biweekly" in text or "fortnight" in text:
+        return count / 2
+    # Weekly before daily, so "twice a week on Monday" stays twice a week
+    if re.search(r"\bweek(ly)?\b", text):
+        return float(count)
+    if re.search(r"\bdaily\b|\b(a|per|each|every) day\b", text):
+        return count * 7
+    return float(count)
+
+def slot_scores(weekdays: np.ndarray, hours: np.ndarray, engagement: np.ndarray) -> np.ndarray:
+    """Expected engagement of a post by (weekday, UTC hour), relative to the member's average.
+
+    Per-hour and per-weekday means are shrunk towards the member's average by
+    PRIOR_POSTS posts and multiplied together; with no history this is the
+    default prior. Hours of -1 (posts with only a date) count towards weekdays only,
+    and weekdays of -1 (undated posts) towards neither.
+    """
+    if not len(engagement):
+        return DEFAULT_SLOT_PRIOR.copy()
+    average = float(engagement.mean()) or 1.0
+    dated = weekdays >= 0
+    day_counts = np.bincount(weekdays[dated], minlength=7)
+    day_totals = np.bincount(weekdays[dated], weights=engagement[dated], minlength=7)
+    day_factor = (day_totals + PRIOR_POSTS * average * WEEKDAY_PRIOR) / (day_counts + PRIOR_POSTS) / average
+    timed = hours >= 0
+    hour_counts = np.bincount(hours[timed], minlength=24)
+    hour_totals = np.bincount(hours[timed], weights=engagement[timed], minlength=24)
+    hour_factor = (hour_totals + PRIOR_POSTS * average * BUSINESS_HOURS) / (hour_counts + PRIOR_POSTS) / average
+    return np.outer(day_factor, hour_factor)
+
+def plan_slots(posts_by_type: Dict[str, float], scores: np.ndarray, start: date, days: int,
+               max_per_day: int = 2, min_gap_hours: int = 3,
+               not_before: Optional[datetime] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Pick (day, hour) slots for each content type; returns the slots in time order and any that did not fit.
+
+    `posts_by_type` is posts per week per content type. A type with n posts in
+    the horizon gets one slot in each of n equal windows, so its posts stay
+    spread out; when a window is full the slot may move anywhere in the horizon.
+    """
+    weekday_of_day = (np.arange(days) + start.weekday()) % 7
+    grid = scores[weekday_of_day].astype(np.float64)
+    available = np.ones((days, 24), dtype=bool)
+    if not_before is not None:
+        # Hours of the first days that have already passed
+        start_at = datetime(start.year, start.month, start.day, tzinfo=timezone.utc)
+        passed = int(np.ceil((not_before - start_at).total_seconds() / 3600))
+        available.reshape(-1)[:max(0, min(passed, days * 24))] = False
+    per_day = np.zeros(days, dtype=np.int64)
+
+    demands = []
+    for content_type, weekly in posts_by_type.items():
+        # At least one post for any type with a frequency, even over a short horizon
+        count = max(1, int(round(weekly * days / 7))) if weekly > 0 else 0
+        edges = np.linspace(0, days, count + 1).round().astype(int)
+        demands.extend((content_type, int(a), max(int(b), int(a) + 1)) for a, b in zip(edges[:-1], edges[1:]))
+    # Narrow windows first, as they have the fewest alternatives
+    demands.sort(key=lambda demand: (demand[2] - demand[1], demand[1]))
+
+    slots, unplaced = [], []
+    for content_type, first, last in demands:
+        best = None
+        for a, b in ((first, last), (0, days)):
+            window = np.where(available[a:b], grid[a:b], -np.inf)
+            flat = int(np.argmax(window))
+            if np.isfinite(window.reshape(-1)[flat]):
+                best = (a + flat // 24, flat % 24)
+                break
+        if best is None:
+            unplaced.append({"content_type": content_type, "reason": "no free slot in the horizon"})
+            continue
+        day, hour = best
+        per_day[day] += 1
+        available[day, max(0, hour - min_gap_hours + 1):hour + min_gap_hours] = False
+        if per_day[day] >= max_per_day:
+            available[day] = False
+        slots.append({"content_type": content_type, "day": day, "hour": hour, "score": float(grid[day, hour])})
+    slots.sort(key=lambda slot: (slot["day"], slot["hour"]))
+    return slots, unplaced
+
+def embed_cached(embedder: Embedder, texts: List[str]) -> np.ndarray:
+    """Embeddings of texts, reusing those of texts seen recently (news topics are shared by every member)"""
+    vectors = [_vectors.get((embedder.name, text)) for text in texts]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        for i, vector in zip(missing, embedder.embed([texts[i] for i in missing])):
+            vectors[i] = vector
+            _vectors.set((embedder.name, texts[i]), vector)
+    return np.array(vectors).reshape(len(texts), -1)
+
+def greedy_matching(value: np.ndarray) -> List[Tuple[int, int]]:
+    """(row, column) pairs of a greedy maximum-value matching over positive entries.
+
+    Works in rounds: every row takes its best free column, and each pair that
+    is also its column's best free row is matched. These locally dominant
+    pairs are the ones picking the largest remaining entry one at a time
+    would choose, without a Python step per entry.
+    """
+    value = np.where(value > 0, value, -np.inf)
+    pairs = []
+    while True:
+        best_column = np.argmax(value, axis=1)
+        best_value = value[np.arange(len(value)), best_column]
+        rows = np.flatnonzero(np.isfinite(best_value))
+        if not len(rows):
+            return pairs
+        best_row = np.argmax(value[:, best_column[rows]], axis=0)
+        mutual = rows[best_row == rows]
+        if not len(mutual):
+            # Only ties can leave no pair mutual; the largest entry is still safe to take
+            row, column = divmod(int(np.argmax(value)), value.shape[1])
+            mutual, best_column[row] = np.array([row]), column
+        pairs.extend((int(row), int(best_column[row])) for row in mutual)
+        value[mutual, :] = -np.inf
+        value[:, best_column[mutual]] = -np.inf
+
+def strategy_text(content_type: str, strategy: Dict[str, Any]) -> str:
+    topics = strategy.get("topics") or []
+    return " ".join([content_type.replace("_", " "), *map(str, topics), str(strategy.get("tone") or "")])
+
+def assign_topics(slots: List[Dict[str, Any]], news: List[Tuple[str, float]],
+                  strategies: Dict[str, Dict[str, Any]], embedder: Optional[Embedder] = None,
+                  half_life_days: float = 7) -> None:
+    """Set `topic` and `topic_source` on each slot.
+
+    `news` is (subtopic, age in days) pairs. Each news topic is used at most
+    once, by greedy matching on fit x freshness x slot score; slots without a
+    news topic rotate through their content type's strategy topics.
+    """
+    if slots and news:
+        embedder = embedder or HashingEmbedder(256)
+        types = sorted({slot["content_type"] for slot in slots})
+        type_vectors = embed_cached(embedder, [strategy_text(t, strategies.get(t, {})) for t in types])
+        topic_vectors = embed_cached(embedder, [topic for topic, _ in news])
+        # Every topic suits every type somewhat; similarity to the strategy breaks ties
+        fit = 0.5 + 0.5 * np.clip(type_vectors @ topic_vectors.T, 0, 1)
+        type_row = np.array([types.index(slot["content_type"]) for slot in slots])
+        days = np.array([slot["day"] for slot in slots], dtype=np.float64)
+        ages = np.array([age for _, age in news], dtype=np.float64)
+        freshness = 0.5 ** ((ages[None, :] + days[:, None]) / half_life_days)
+        scores = np.array([slot["score"] for slot in slots])
+        value = fit[type_row] * np.where(freshness >= MIN_FRESHNESS, freshness, 0) * scores[:, None]
+        for row, column in greedy_matching(value):
+            slots[row]["topic"], slots[row]["topic_source"] = news[column][0], "news"
+    rotation: Dict[str, int] = {}
+    for slot in slots:
+        if "topic" in slot:
+            continue
+        content_type = slot["content_type"]
+        topics = strategies.get(content_type, {}).get("topics") or [content_type.replace("_", " ").capitalize()]
+        turn = rotation.get(content_type, 0)
+        rotation[content_type] = turn + 1
+        slot["topic"], slot["topic_source"] = str(topics[turn % len(topics)]), "strategy"
+
+def build_calendar(days: int, content_types: List[str], strategies: Dict[str, Dict[str, Any]],
+                   scores: np.ndarray, news: List[Tuple[str, float]], hashtags: List[str],
+                   start: date, not_before: Optional[datetime] = None, max_per_day: int = 2,
+                   min_gap_hours: int = 3, half_life_days: float = 7,
+                   embedder: Optional[Embedder] = None) -> Dict[str, Any]:
+    """A calendar of posts over `days` days from `start`, in the shape of the /content-calendar response"""
+    posts_by_type = {
+        content_type: posts_per_week(strategies.get(content_type, {}).get("frequency", "once a week"))
+        for content_type in dict.fromkeys(content_types)
+    }
+    slots, unplaced = plan_slots(posts_by_type, scores, start, days, max_per_day, min_gap_hours, not_before)
+    assign_topics(slots, news, strategies, embedder, half_life_days)
+    best = float(scores.max()) or 1.0
+    calendar = []
+    for slot in slots:
+        day = start + timedelta(days=slot["day"])
+        scheduled = datetime(day.year, day.month, day.day, slot["hour"], tzinfo=timezone.utc)
+        calendar.append({
+            "date": day.isoformat(),
+            "scheduled_time": scheduled.isoformat(),
+            "content_type": slot["content_type"],
+            "suggested_topic": slot["topic"],
+            "topic_source": slot["topic_source"],
+            "optimal_time": f"{hour_label(slot['hour'])} UTC",
+            "slot_score": round(slot["score"] / best, 3),
+            "hashtags": list(hashtags or DEFAULT_HASHTAGS),
+        })
+    return {
+        "calendar": calendar,
+        "total_days": days,
+        "total_posts": len(calendar),
+        "posts_per_week": {content_type: round(weekly, 2) for content_type, weekly in posts_by_type.items()},
+        "unscheduled": unplaced,
+    }
@@ -0,0 +1,50 @@
+"""
+Bounded concurrency for AI model calls
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+
+class QueueFullError(Exception):
+    """Raised when no more generation requests can be queued"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Too many generation requests in progress. Please retry later.")
+        self.retry_after = retry_after
+
+class GenerationLimiter:
+    """Caps in-flight model calls and the number of callers waiting for a slot"""
+
+    def __init__(self, max_in_flight: int, max_queue: int, retry_after: int):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._in_flight = 0
+        self._waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one generation slot, rejecting the caller when the queue is full"""
+        if self._in_flight >= self.max_in_flight and self._waiting >= self.max_queue:
+            raise QueueFullError(self.retry_after)
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limiter occupancy"""
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue
+        }
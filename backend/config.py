@@ -15,11 +15,20 @@ class Config:
     # API Keys
     GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
     
+    # Database settings
+    MONGODB_URI = os.environ.get("MONGODB_URI") or os.environ.get("MONGO_URI")
+    MONGO_HEALTHCHECK_SECONDS = float(os.environ.get("MONGO_HEALTHCHECK_SECONDS", "30"))
+
     # Application settings
     APP_NAME = "LinkedIn Posts AI Agent"
     APP_VERSION = "1.0.0"
     DEBUG = os.environ.get("DEBUG", "False").lower() == "true"
     
+    # Background jobs: each one runs in whichever process holds its lease
+    RUN_BACKGROUND_JOBS = os.environ.get("RUN_BACKGROUND_JOBS", "True").lower() == "true"
+    JOB_LOCK_BACKEND = os.environ.get("JOB_LOCK_BACKEND", "auto").lower()
+    JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "30"))
+    
     # CORS settings
     CORS_ORIGINS = ["*"]  # Allow all origins for development
     CORS_CREDENTIALS = False
@@ -29,10 +38,144 @@ class Config:
     # Data file paths
     DATA_DIR = Path(__file__).parent / "data"
     USER_PROFILE_FILE = DATA_DIR / "user_profile.json"
+    # Seconds between checks of the profile file for changes
+    PROFILE_CHECK_SECONDS = float(os.environ.get("PROFILE_CHECK_SECONDS", "2"))
+    # Per-member profiles in MongoDB, with the most recently used kept in memory
+    TENANT_CACHE_MAX_ENTRIES = int(os.environ.get("TENANT_CACHE_MAX_ENTRIES", "10000"))
+    TENANT_CACHE_TTL_SECONDS = float(os.environ.get("TENANT_CACHE_TTL_SECONDS", "60"))
+    # Members whose post metrics are kept in memory as arrays for analytics
+    ANALYTICS_CACHE_MAX_MEMBERS = int(os.environ.get("ANALYTICS_CACHE_MAX_MEMBERS", "256"))
+    ANALYTICS_CACHE_TTL_SECONDS = float(os.environ.get("ANALYTICS_CACHE_TTL_SECONDS", "300"))
+
+    # Scheduled post storage: "auto" uses MongoDB when reachable, otherwise SQLite
+    SCHEDULED_POSTS_BACKEND = os.environ.get("SCHEDULED_POSTS_BACKEND", "auto").lower()
+    SCHEDULED_POSTS_DB = Path(os.environ.get("SCHEDULED_POSTS_DB", DATA_DIR / "scheduled_posts.db"))
+    SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", "4"))
+    # How often the scheduler picks up posts that other workers added to the store
+    SCHEDULER_RESYNC_SECONDS = float(os.environ.get("SCHEDULER_RESYNC_SECONDS", "30"))
+    # How often it checks for posts due before the next resync; 0 leaves only the resync
+    SCHEDULER_POLL_SECONDS = float(os.environ.get("SCHEDULER_POLL_SECONDS", "2"))
+    # A post left in posting this long was interrupted mid-publish and is marked failed
+    SCHEDULER_STALE_CLAIM_SECONDS = float(os.environ.get("SCHEDULER_STALE_CLAIM_SECONDS", "600"))
     
+    # TLDR feeds to poll, as comma-separated "url|interval_seconds" pairs
+    TLDR_FEEDS = os.environ.get("TLDR_FEEDS", "https://tldr.tech/rss|86400")
+    # Page sizes for the cursor-paginated topic and news listings
+    TOPICS_PAGE_SIZE = int(os.environ.get("TOPICS_PAGE_SIZE", "100"))
+    TOPICS_MAX_PAGE_SIZE = int(os.environ.get("TOPICS_MAX_PAGE_SIZE", "500"))
+    # Near-duplicate subtopics at ingestion: "cluster" stores them hidden under their first topic,
+    # "reject" does not store them, "off" disables the check
+    TOPIC_DEDUP_MODE = os.environ.get("TOPIC_DEDUP_MODE", "cluster").lower()
+    # Cosine similarity at which two subtopics count as the same story (about 0.85 suits "gemini")
+    TOPIC_DEDUP_THRESHOLD = float(os.environ.get("TOPIC_DEDUP_THRESHOLD", "0.6"))
+    # "hashing" (offline) or "gemini"
+    TOPIC_EMBEDDER = os.environ.get("TOPIC_EMBEDDER", "hashing").lower()
+    TOPIC_EMBEDDING_MODEL = os.environ.get("TOPIC_EMBEDDING_MODEL", "models/text-embedding-004")
+    TOPIC_EMBEDDING_DIM = int(os.environ.get("TOPIC_EMBEDDING_DIM", "1024"))
+    TOPIC_INDEX_PATH = Path(os.environ.get("TOPIC_INDEX_PATH", DATA_DIR / "topic_index.npz"))
+
+    # LinkedIn API client settings
+    LINKEDIN_API_BASE_URL = os.environ.get("LINKEDIN_API_BASE_URL", "https://api.linkedin.com")
+    LINKEDIN_CONNECT_TIMEOUT = float(os.environ.get("LINKEDIN_CONNECT_TIMEOUT", "5"))
+    LINKEDIN_READ_TIMEOUT = float(os.environ.get("LINKEDIN_READ_TIMEOUT", "30"))
+    LINKEDIN_MAX_RETRIES = int(os.environ.get("LINKEDIN_MAX_RETRIES", "3"))
+    LINKEDIN_BACKOFF_BASE = float(os.environ.get("LINKEDIN_BACKOFF_BASE", "1"))
+    LINKEDIN_BACKOFF_MAX = float(os.environ.get("LINKEDIN_BACKOFF_MAX", "60"))
+    LINKEDIN_POOL_SIZE = int(os.environ.get("LINKEDIN_POOL_SIZE", "10"))
+    LINKEDIN_MEMBER_DAILY_LIMIT = int(os.environ.get("LINKEDIN_MEMBER_DAILY_LIMIT", "150"))
+    LINKEDIN_MEMBER_BURST = int(os.environ.get("LINKEDIN_MEMBER_BURST", "10"))
+    # How long a verified access token -> member ID lookup is reused before asking LinkedIn again
+    LINKEDIN_SESSION_CACHE_SECONDS = float(os.environ.get("LINKEDIN_SESSION_CACHE_SECONDS", "300"))
+
     # Gemini model settings
     GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash-lite")
+    GEMINI_FALLBACK_MODEL = os.environ.get("GEMINI_FALLBACK_MODEL", "")
+    # Per-task models as "method=primary|fallback,...", e.g. "optimize_post=gemini-2.5-flash|gemini-2.5-flash-lite";
+    # methods without an entry use GEMINI_MODEL then GEMINI_FALLBACK_MODEL. Names starting with "fake" are offline models.
+    MODEL_ROUTES = os.environ.get("MODEL_ROUTES", "")
+    # Per-model timeouts as "model=seconds,..."; others use GEMINI_TIMEOUT_SECONDS
+    MODEL_TIMEOUTS = os.environ.get("MODEL_TIMEOUTS", "")
+    # Circuit breaker: move a task to its fallback when the primary's recent p95 or error rate is too high
+    MODEL_BREAKER_WINDOW = int(os.environ.get("MODEL_BREAKER_WINDOW", "50"))
+    MODEL_BREAKER_MIN_CALLS = int(os.environ.get("MODEL_BREAKER_MIN_CALLS", "10"))
+    MODEL_BREAKER_P95_SECONDS = float(os.environ.get("MODEL_BREAKER_P95_SECONDS", "20"))
+    MODEL_BREAKER_ERROR_RATE = float(os.environ.get("MODEL_BREAKER_ERROR_RATE", "0.5"))
+    MODEL_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("MODEL_BREAKER_COOLDOWN_SECONDS", "60"))
+    # Prompt template version from prompt_templates.TEMPLATES
+    PROMPT_TEMPLATE_VERSION = os.environ.get("PROMPT_TEMPLATE_VERSION", "v1")
+    # Cap on generated tokens per call (0 uses the model default)
+    GEMINI_MAX_OUTPUT_TOKENS = int(os.environ.get("GEMINI_MAX_OUTPUT_TOKENS", "0"))
+
+    # Generation concurrency settings
+    GEMINI_MAX_IN_FLIGHT = int(os.environ.get("GEMINI_MAX_IN_FLIGHT", "4"))
+    GEMINI_MAX_QUEUE = int(os.environ.get("GEMINI_MAX_QUEUE", "16"))
+    GEMINI_TIMEOUT_SECONDS = float(os.environ.get("GEMINI_TIMEOUT_SECONDS", "60"))
+    GEMINI_RETRY_AFTER_SECONDS = int(os.environ.get("GEMINI_RETRY_AFTER_SECONDS", "5"))
+    BATCH_GENERATION_CONCURRENCY = int(os.environ.get("BATCH_GENERATION_CONCURRENCY", str(GEMINI_MAX_IN_FLIGHT)))
+
+    # Content calendar planning
+    CALENDAR_MAX_DAYS = int(os.environ.get("CALENDAR_MAX_DAYS", "90"))
+    CALENDAR_MAX_POSTS_PER_DAY = int(os.environ.get("CALENDAR_MAX_POSTS_PER_DAY", "2"))
+    CALENDAR_MIN_GAP_HOURS = int(os.environ.get("CALENDAR_MIN_GAP_HOURS", "3"))
+    # Newest unused TLDR subtopics considered, and how fast their value halves
+    CALENDAR_NEWS_TOPICS = int(os.environ.get("CALENDAR_NEWS_TOPICS", "200"))
+    CALENDAR_NEWS_HALF_LIFE_DAYS = float(os.environ.get("CALENDAR_NEWS_HALF_LIFE_DAYS", "7"))
+    # Items accepted by one bulk schedule, reschedule or cancel request
+    BULK_SCHEDULE_MAX_ITEMS = int(os.environ.get("BULK_SCHEDULE_MAX_ITEMS", "500"))
+
+    # Response cache settings
+    LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "512"))
+    LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", "86400"))
+    LLM_CACHE_SQLITE_PATH = os.environ.get("LLM_CACHE_SQLITE_PATH", "")
+
+    # Token accounting and daily budgets (0 means unlimited)
+    LLM_DAILY_TOKEN_BUDGET = int(os.environ.get("LLM_DAILY_TOKEN_BUDGET", "0"))
+    LLM_MEMBER_DAILY_TOKEN_BUDGET = int(os.environ.get("LLM_MEMBER_DAILY_TOKEN_BUDGET", "0"))
+    # Comma-separated "method:tokens" pairs, e.g. "optimize_post:200000"
+    LLM_METHOD_DAILY_TOKEN_BUDGETS = os.environ.get("LLM_METHOD_DAILY_TOKEN_BUDGETS", "")
+    LLM_USAGE_FLUSH_SECONDS = float(os.environ.get("LLM_USAGE_FLUSH_SECONDS", "10"))
     
+    @classmethod
+    def get_tldr_feeds(cls):
+        """Parse TLDR_FEEDS into (url, interval_seconds) pairs"""
+        feeds = []
+        for item in cls.TLDR_FEEDS.split(","):
+            url, _, interval = item.strip().partition("|")
+            if url:
+                feeds.append((url, int(interval) if interval.strip() else 86400))
+        return feeds
+
+    @classmethod
+    def get_model_routes(cls):
+        """Parse MODEL_ROUTES into method -> [primary, fallbacks...], with "*" for every other method"""
+        routes = {"*": [model for model in (cls.GEMINI_MODEL, cls.GEMINI_FALLBACK_MODEL) if model]}
+        for item in cls.MODEL_ROUTES.split(","):
+            method, _, models = item.strip().partition("=")
+            if method and models:
+                routes[method.strip()] = [model.strip() for model in models.split("|") if model.strip()]
+        return routes
+
+    @classmethod
+    def get_model_timeouts(cls):
+        """Parse MODEL_TIMEOUTS into a model -> seconds mapping"""
+        timeouts = {}
+        for item in cls.MODEL_TIMEOUTS.split(","):
+            model, _, seconds = item.strip().partition("=")
+            if model and seconds.strip():
+                timeouts[model.strip()] = float(seconds)
+        return timeouts
+
+    @classmethod
+    def get_method_token_budgets(cls):
+        """Parse LLM_METHOD_DAILY_TOKEN_BUDGETS into a method -> tokens mapping"""
+        budgets = {}
+        for item in cls.LLM_METHOD_DAILY_TOKEN_BUDGETS.split(","):
+            method, _, tokens = item.strip().partition(":")
+            if method and tokens.strip():
+                budgets[method] = int(tokens)
+        return budgets
+
     @classmethod
     def validate_config(cls):
         """Validate required configuration"""
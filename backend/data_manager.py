@@ -1,32 +1,59 @@
 """
-Data access layer for user profiles and analytics
+Data access layer for user profiles and analytics.
+
+Without a member ID, reads come from the single-user profile file. With a
+LinkedIn member ID they come from the per-member store in MongoDB.
 """
-import json
-from pathlib import Path
 from typing import Dict, List, Any, Optional
+from pymongo.errors import PyMongoError
 from config import Config
+import database
+from analytics_rollups import merge_overall, summarize_posts
+from profile_store import ProfileStore
+from tenant_store import TenantStore
+from scheduled_post_store import ScheduledPostStore, create_scheduled_post_store
 
 class DataManager:
     """Manages data loading and access"""
     def __init__(self):
-        self._data = None
-        self._scheduled_posts = []  # In-memory list for scheduled posts (for demo purposes)
-        self._load_data()
+        self.profiles = ProfileStore(Config.USER_PROFILE_FILE, Config.PROFILE_CHECK_SECONDS)
+        self._scheduled_posts = None
+        self._tenants = None
+        # (post_analytics section version, post ID -> post) for the profile file's posts
+        self._post_index = None
+        # (post_analytics section version, analytics with rollups) for the profile file's posts
+        self._rollups = None
     
-    def _load_data(self) -> None:
-        """Load data from JSON file"""
-        try:
-            with open(Config.USER_PROFILE_FILE, 'r', encoding='utf-8') as f:
-                self._data = json.load(f)
-        except FileNotFoundError:
-            print(f"❌ Data file not found: {Config.USER_PROFILE_FILE}")
-            self._data = {}
-        except json.JSONDecodeError as e:
-            print(f"❌ Error parsing JSON data: {e}")
-            self._data = {}
+    @property
+    def _data(self) -> Dict[str, Any]:
+        """Profile file contents from the current snapshot (read-only)"""
+        return self.profiles.snapshot.data
+
+    def reload_profile(self) -> Dict[str, Any]:
+        """Re-read the profile file now instead of waiting for the next change check"""
+        reloaded = self.profiles.reload()
+        return {"reloaded": reloaded, **self.profiles.stats()}
     
-    def get_user_profile(self) -> Dict[str, Any]:
-        """Get user profile data"""
+    @property
+    def tenants(self) -> TenantStore:
+        """Per-member store, opened on first use"""
+        if self._tenants is None:
+            self._tenants = TenantStore(
+                database.get_db(), Config.TENANT_CACHE_MAX_ENTRIES, Config.TENANT_CACHE_TTL_SECONDS
+            )
+        return self._tenants
+
+    def tenant_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Member profile cache counters, or None before the per-member store is first used"""
+        if self._tenants is None:
+            return None
+        return self._tenants.cache.stats()
+
+    def get_user_profile(self, member_id: str = None) -> Dict[str, Any]:
+        """Get user profile data; raises UnknownMemberError for a member with nothing stored"""
+        if member_id:
+            self.tenants.require_member(member_id)
+            return self.tenants.get_profile(member_id)
         return self._data.get("user_profile", {})
     
     def get_industry_trends(self, industry: str = None) -> Dict[str, Any]:
@@ -40,31 +67,85 @@ class DataManager:
             }
         return trends
     
-    def get_content_strategies(self) -> Dict[str, Any]:
-        """Get content strategies data"""
+    def get_content_strategies(self, member_id: str = None) -> Dict[str, Any]:
+        """Get content strategies data; raises UnknownMemberError for a member with nothing stored"""
+        if member_id:
+            self.tenants.require_member(member_id)
+            return self.tenants.get_strategies(member_id)
         return self._data.get("content_strategies", {})
     
-    def get_post_analytics(self) -> Dict[str, Any]:
+    def get_post_analytics(self, member_id: str = None) -> Dict[str, Any]:
         """Get post analytics data"""
-        return self._data.get("post_analytics", {})
+        if member_id:
+            return self.tenants.get_analytics(member_id)
+        snapshot = self.profiles.snapshot
+        version = snapshot.section_versions.get("post_analytics", snapshot.version)
+        if self._rollups is None or self._rollups[0] != version:
+            analytics = dict(snapshot.section("post_analytics"))
+            rollups = summarize_posts(analytics.get("recent_posts", []))
+            analytics["overall_metrics"] = merge_overall(
+                analytics.get("overall_metrics", {}), rollups["overall_metrics"]
+            )
+            analytics["rollups"] = rollups["rollups"]
+            self._rollups = (version, analytics)
+        return self._rollups[1]
     
-    def get_post_by_id(self, post_id: str) -> Optional[Dict[str, Any]]:
+    def get_post_by_id(self, post_id: str, member_id: str = None) -> Optional[Dict[str, Any]]:
         """Get specific post analytics by ID"""
-        analytics = self.get_post_analytics()
-        recent_posts = analytics.get("recent_posts", [])
-        return next((post for post in recent_posts if post["id"] == post_id), None)
+        if member_id:
+            return self.tenants.get_post(member_id, post_id)
+        snapshot = self.profiles.snapshot
+        version = snapshot.section_versions.get("post_analytics", snapshot.version)
+        if self._post_index is None or self._post_index[0] != version:
+            recent_posts = snapshot.section("post_analytics").get("recent_posts", [])
+            # Reversed so the first post with an ID wins, as the previous linear scan did
+            self._post_index = (version, {post["id"]: post for post in reversed(recent_posts)})
+        return self._post_index[1].get(post_id)
     
+    def record_published_post(self, member_id: str, post_id: str, content: str, posted_at: str) -> bool:
+        """Record a post just published for a member with zero metrics, so its rollups count it right away"""
+        if not member_id or not database.is_available():
+            return False
+        try:
+            self.tenants.record_post(member_id, {
+                "id": post_id, "content": content, "posted_at": posted_at, "date": posted_at[:10],
+                "likes": 0, "comments": 0, "shares": 0, "impressions": 0,
+            })
+        except PyMongoError as e:
+            print(f"[Rollups] Could not record published post {post_id}: {e}")
+            return False
+        return True
+
+    @property
+    def scheduled_posts(self) -> ScheduledPostStore:
+        """Persistent scheduled post store, opened on first use"""
+        if self._scheduled_posts is None:
+            self._scheduled_posts = create_scheduled_post_store()
+        return self._scheduled_posts
+
     def add_scheduled_post(self, post_data: Dict[str, Any]) -> str:
-        """Add a scheduled post (in-memory for demo)"""
-        post_id = f"scheduled_{len(self._scheduled_posts) + 1}"
-        post_data["id"] = post_id
-        post_data["status"] = "pending"
-        self._scheduled_posts.append(post_data)
-        return post_id
+        """Add a scheduled post; fills in its ID, status and UTC scheduled_time"""
+        return self.scheduled_posts.add(post_data)
+
+    def add_scheduled_posts(self, posts: List[Dict[str, Any]]) -> List[str]:
+        """Add scheduled posts in one all-or-nothing batch"""
+        return self.scheduled_posts.add_many(posts)
+
+    def reschedule_scheduled_posts(self, times: Dict[str, str]) -> Dict[str, str]:
+        """Move pending posts to new UTC times; returns the status of each post found"""
+        return self.scheduled_posts.reschedule_many(times)
+
+    def cancel_scheduled_posts(self, post_ids: List[str]) -> Dict[str, str]:
+        """Cancel pending posts; returns the status of each post found"""
+        return self.scheduled_posts.cancel_many(post_ids)
+
+    def get_scheduled_news_topics(self, post_ids: List[str]) -> List[str]:
+        """News topics the given scheduled posts were planned for"""
+        return self.scheduled_posts.news_topics(post_ids)
     
     def get_scheduled_posts(self) -> List[Dict[str, Any]]:
-        """Get scheduled posts (in-memory)"""
-        return self._scheduled_posts
+        """Get all scheduled posts ordered by scheduled time"""
+        return self.scheduled_posts.list_all()
 
 # Global data manager instance
 data_manager = DataManager()
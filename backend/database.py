@@ -0,0 +1,168 @@
+"""
+MongoDB connection and index management
+"""
+import threading
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne, monitoring
+from pymongo.errors import PyMongoError
+from config import Config
+from metrics import MONGO_OPERATION_DURATION
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """Records MongoDB command latency per collection"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        value = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            value = event.command.get("collection")
+        self._collections[event.request_id] = value if isinstance(value, str) else ""
+
+    def _observe(self, event, outcome: str) -> None:
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_OPERATION_DURATION.observe(
+            event.duration_micros / 1e6, collection=collection, command=event.command_name, outcome=outcome
+        )
+
+    def succeeded(self, event):
+        self._observe(event, "success")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+# MongoDB connection, created lazily on first use
+MONGO_URI = Config.MONGODB_URI or "mongodb://localhost:27017/"
+DATABASE_NAME = "linkedin_ai_agent"
+
+_client = None
+_client_lock = threading.Lock()
+# None until the first health check finishes
+_available = None
+_checked = threading.Event()
+_monitor_stop = threading.Event()
+_monitor_thread = None
+_indexes_created = False
+
+def get_client() -> MongoClient:
+    """Return the shared MongoClient, creating it on first use (this does not block on the network)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(
+                    MONGO_URI, serverSelectionTimeoutMS=5000, event_listeners=[MongoMetricsListener()]
+                )
+    return _client
+
+def get_db():
+    """Application database"""
+    return get_client()[DATABASE_NAME]
+
+def is_available() -> bool:
+    """Whether MongoDB answered the last health check; optimistic until the first check completes"""
+    return _available is not False
+
+def has_checked() -> bool:
+    """Whether at least one health check has finished"""
+    return _checked.is_set()
+
+def get_tldr_collection():
+    """TLDR news collection, or None when MongoDB is unavailable"""
+    return get_db()["tldr_news"] if is_available() else None
+
+def get_feed_state_collection():
+    """Feed polling state collection, or None when MongoDB is unavailable"""
+    return get_db()["feed_state"] if is_available() else None
+
+def check_connection() -> bool:
+    """Ping MongoDB and update the availability flag, creating indexes after the first success"""
+    global _available, _indexes_created
+    try:
+        get_client().admin.command('ping')
+    except PyMongoError as exc:
+        if _available is not False:
+            print(f"Warning: MongoDB unavailable ({exc}); TLDR news will be disabled until it reconnects.")
+        _available = False
+        _checked.set()
+        return False
+    if _available is False:
+        print("MongoDB connection restored.")
+    _available = True
+    _checked.set()
+    if not _indexes_created:
+        ensure_tldr_indexes()
+        _indexes_created = True
+    return True
+
+def _monitor(interval: float) -> None:
+    while not _monitor_stop.is_set():
+        check_connection()
+        _monitor_stop.wait(interval)
+
+def start_monitor(interval: float) -> None:
+    """Check the MongoDB connection in the background, reconnecting when it comes back"""
+    global _monitor_thread
+    if _monitor_thread is not None and _monitor_thread.is_alive():
+        return
+    _monitor_stop.clear()
+    _monitor_thread = threading.Thread(target=_monitor, args=(interval,), name="mongo-monitor", daemon=True)
+    _monitor_thread.start()
+
+def close() -> None:
+    """Stop the health check and close the client"""
+    global _client
+    _monitor_stop.set()
+    if _monitor_thread is not None:
+        _monitor_thread.join(timeout=1)
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+def ensure_tldr_indexes() -> None:
+    """Create the indexes used by TLDR ingestion and topic listing"""
+    tldr_collection = get_tldr_collection()
+    if tldr_collection is None:
+        return
+    indexes = [
+        ([("link", ASCENDING), ("subtopic", ASCENDING)], {"unique": True, "name": "link_subtopic_unique"}),
+        ([("subtopic", ASCENDING)], {"name": "subtopic"}),
+        ([("posted", ASCENDING), ("published_at", DESCENDING), ("_id", DESCENDING)],
+         {"name": "posted_published_at_id"}),
+        ([("published_at", DESCENDING), ("_id", DESCENDING)], {"name": "published_at_id"}),
+    ]
+    for keys, options in indexes:
+        try:
+            tldr_collection.create_index(keys, **options)
+        except PyMongoError as e:
+            # A pre-existing duplicate (link, subtopic) pair blocks the unique index; keep serving
+            print(f"Warning: could not create index {options['name']} on tldr_news: {e}")
+    backfill_published_at(tldr_collection)
+
+def backfill_published_at(tldr_collection, batch_size: int = 1000) -> int:
+    """Give documents stored before `published_at` existed a datetime from their `published`
+    string, or from their _id's creation time when that cannot be parsed"""
+    updated = 0
+    operations = []
+    try:
+        for doc in tldr_collection.find({"published_at": None}, {"published": 1}):
+            try:
+                published_at = parsedate_to_datetime(doc["published"])
+                if published_at.tzinfo is None:
+                    published_at = published_at.replace(tzinfo=timezone.utc)
+            except (KeyError, TypeError, ValueError):
+                published_at = doc["_id"].generation_time
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"published_at": published_at}}))
+            if len(operations) >= batch_size:
+                updated += tldr_collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            updated += tldr_collection.bulk_write(operations, ordered=False).modified_count
+    except PyMongoError as e:
+        print(f"Warning: could not backfill published_at on tldr_news: {e}")
+    if updated:
+        print(f"Backfilled published_at on {updated} TLDR documents.")
+    return updated
@@ -0,0 +1,187 @@
+"""
+Leases that let exactly one process run each background job.
+
+A lease is a document in the MongoDB `job_leases` collection (shared by all
+replicas) or an advisory lock on a local file (shared by the workers of one
+host). The holder renews it periodically; if the holder dies, the lease
+expires and another process takes over.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+import database
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Identifies this process as a lease owner
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class JobLock(ABC):
+    """A named lease held by at most one process at a time"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abstractmethod
+    def acquire(self) -> bool:
+        """Take or renew the lease; returns whether this process holds it"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def release(self) -> None:
+        raise NotImplementedError
+
+class MongoJobLock(JobLock):
+    """Lease stored as one document per job in MongoDB"""
+
+    def __init__(self, collection, name: str, ttl_seconds: float, owner: str = PROCESS_ID):
+        super().__init__(name)
+        self._collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.owner = owner
+        # Monotonic deadline of the lease we last renewed, so a brief MongoDB outage does not cost leadership
+        self._held_until = 0.0
+
+    def acquire(self) -> bool:
+        now = datetime.now(timezone.utc)
+        started = time.monotonic()
+        try:
+            doc = self._collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                          "renewed_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another process holds an unexpired lease, so the upsert collided with its document
+            self._held_until = 0.0
+            return False
+        except PyMongoError as e:
+            print(f"[JobLock] Could not renew lease '{self.name}': {e}")
+            return time.monotonic() < self._held_until
+        if doc and doc.get("owner") == self.owner:
+            self._held_until = started + self.ttl_seconds
+            return True
+        self._held_until = 0.0
+        return False
+
+    def release(self) -> None:
+        self._held_until = 0.0
+        try:
+            self._collection.delete_one({"_id": self.name, "owner": self.owner})
+        except PyMongoError as e:
+            print(f"[JobLock] Could not release lease '{self.name}': {e}")
+
+class FileJobLock(JobLock):
+    """Advisory lock on a local file; the OS drops it when the process exits"""
+
+    def __init__(self, path: Path, name: str):
+        super().__init__(name)
+        self.path = Path(path)
+        self._file = None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            handle.close()
+            return False
+        self._file = handle
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+def create_job_lock(name: str) -> JobLock:
+    """Pick the lease backend from JOB_LOCK_BACKEND.
+
+    "auto" uses MongoDB when a MongoDB URI is configured (so replicas on
+    different hosts coordinate) and a file lock otherwise.
+    """
+    backend = Config.JOB_LOCK_BACKEND
+    if backend == "mongo" or (backend == "auto" and Config.MONGODB_URI):
+        return MongoJobLock(database.get_db()["job_leases"], name, Config.JOB_LEASE_SECONDS)
+    return FileJobLock(Config.DATA_DIR / f"{name}.lock", name)
+
+class LeaderElector:
+    """Runs a job only while this process holds its lease"""
+
+    def __init__(self, lock: JobLock, on_elected: Callable[[], None], on_demoted: Callable[[], None],
+                 renew_seconds: float):
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.renew_seconds = renew_seconds
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _step(self) -> None:
+        """Try to take or keep the lease and start or stop the job on a change"""
+        held = self.lock.acquire()
+        if held and not self.is_leader:
+            print(f"[JobLock] Acquired lease '{self.lock.name}', starting job")
+            self.is_leader = True
+            self.on_elected()
+        elif not held and self.is_leader:
+            print(f"[JobLock] Lost lease '{self.lock.name}', stopping job")
+            self.is_leader = False
+            self.on_demoted()
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._step()
+            except Exception as e:
+                print(f"[JobLock] Error in leader election for '{self.lock.name}': {e}")
+            self._stop.wait(self.renew_seconds)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=f"leader-{self.lock.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop campaigning, stop the job if running and give up the lease"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self.is_leader:
+            self.is_leader = False
+            self.on_demoted()
+        self.lock.release()
@@ -0,0 +1,47 @@
+"""
+Application startup and shutdown
+"""
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+import database
+from config import Config
+
+_electors = []
+
+def start_background_jobs() -> None:
+    """Campaign for the TLDR fetcher and scheduler leases; each job runs only where its lease is held"""
+    from ai_service import start_tldr_fetcher, stop_tldr_fetcher
+    from job_lock import LeaderElector, create_job_lock
+    from scheduler import start_scheduler, stop_scheduler
+
+    renew_seconds = Config.JOB_LEASE_SECONDS / 3
+    _electors.extend([
+        LeaderElector(create_job_lock("tldr-fetcher"), start_tldr_fetcher, stop_tldr_fetcher, renew_seconds),
+        LeaderElector(create_job_lock("scheduler"), start_scheduler, stop_scheduler, renew_seconds),
+    ])
+    for elector in _electors:
+        elector.start()
+    print("Background jobs started.")
+
+def stop_background_jobs() -> None:
+    """Stop background jobs, letting in-flight work finish, and release their leases"""
+    while _electors:
+        _electors.pop().stop()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background work without blocking the first request, and stop it on shutdown"""
+    from ai_service import ai_service
+
+    database.start_monitor(Config.MONGO_HEALTHCHECK_SECONDS)
+    ai_service.usage.start()
+    if Config.RUN_BACKGROUND_JOBS:
+        start_background_jobs()
+    yield
+    if Config.RUN_BACKGROUND_JOBS:
+        stop_background_jobs()
+    # Flushes token usage counted since the last interval
+    ai_service.usage.stop()
+    database.close()
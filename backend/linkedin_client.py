@@ -0,0 +1,227 @@
+"""
+LinkedIn REST API client with connection pooling, retries and rate limiting
+"""
+import hashlib
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+from config import Config
+from metrics import LINKEDIN_PUBLISH, LINKEDIN_REQUEST_DURATION
+from tenant_store import TenantCache
+
+# Statuses that mean LinkedIn did not create the post, so publishing again cannot duplicate it
+RETRYABLE_STATUSES = {429, 503}
+
+def failed_before_send(error: requests.ConnectionError) -> bool:
+    """Whether a connection error happened while connecting, before any of the request was sent"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    # Refused connections and DNS failures arrive wrapped in urllib3's MaxRetryError
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a fixed rate"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> Optional[float]:
+        """Take one token; returns None on success or the seconds until a token is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.rate_per_second
+
+class LinkedInClient:
+    """Publishes posts to LinkedIn over a pooled keep-alive session"""
+
+    def __init__(self, base_url: str = None):
+        self.base_url = (base_url or Config.LINKEDIN_API_BASE_URL).rstrip("/")
+        self.timeout = (Config.LINKEDIN_CONNECT_TIMEOUT, Config.LINKEDIN_READ_TIMEOUT)
+        self.max_retries = Config.LINKEDIN_MAX_RETRIES
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Config.LINKEDIN_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._outcomes: Dict[str, int] = {}
+        self._latency = {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        self._retries = 0
+        # sha256 of an access token -> the member ID LinkedIn says it belongs to
+        self._sessions = TenantCache(10000, Config.LINKEDIN_SESSION_CACHE_SECONDS)
+
+    def _bucket_for(self, member_id: str) -> TokenBucket:
+        """Per-member bucket sized to LinkedIn's daily member quota"""
+        with self._lock:
+            bucket = self._buckets.get(member_id)
+            if bucket is None:
+                bucket = TokenBucket(
+                    Config.LINKEDIN_MEMBER_DAILY_LIMIT / 86400.0,
+                    Config.LINKEDIN_MEMBER_BURST
+                )
+                self._buckets[member_id] = bucket
+            return bucket
+
+    def _record(self, outcome: str, elapsed: float = None) -> None:
+        LINKEDIN_PUBLISH.inc(outcome=outcome)
+        if elapsed is not None:
+            LINKEDIN_REQUEST_DURATION.observe(elapsed, outcome=outcome)
+        with self._lock:
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+            if outcome == "retried":
+                self._retries += 1
+            if elapsed is not None:
+                self._latency["count"] += 1
+                self._latency["total_seconds"] += elapsed
+                self._latency["max_seconds"] = max(self._latency["max_seconds"], elapsed)
+
+    def _backoff_seconds(self, attempt: int, response: requests.Response = None) -> float:
+        """Retry-After when the server sends one, otherwise exponential backoff with full jitter"""
+        if response is not None:
+            retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, Config.LINKEDIN_BACKOFF_MAX)
+        return random.uniform(0, min(Config.LINKEDIN_BACKOFF_MAX, Config.LINKEDIN_BACKOFF_BASE * 2 ** attempt))
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def create_post(self, content: str, access_token: str, user_id: str) -> Dict[str, Any]:
+        """Publish a text post for a member"""
+        wait = self._bucket_for(user_id).try_acquire()
+        if wait is not None:
+            self._record("local_rate_limited")
+            return {
+                "ok": False,
+                "status": 429,
+                "data": "Local LinkedIn rate limit reached for this member.",
+                "postIdHeader": None,
+                "retryAfter": round(wait, 1),
+            }
+        post_body = {
+            "author": f"urn:li:person:{user_id}",
+            "commentary": content,
+            "visibility": "PUBLIC",
+            "distribution": {
+                "feedDistribution": "MAIN_FEED",
+                "targetEntities": [],
+                "thirdPartyDistributionChannels": []
+            },
+            "lifecycleState": "PUBLISHED",
+            "isReshareDisabledByAuthor": False
+        }
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+            "LinkedIn-Version": "202306",
+            "X-Restli-Protocol-Version": "2.0.0",
+        }
+        url = f"{self.base_url}/rest/posts"
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.post(url, json=post_body, headers=headers, timeout=self.timeout)
+            except requests.ConnectionError as e:
+                # Only a failure to connect is known to leave no post behind; a connection dropped
+                # after the request went out ("Connection aborted") may have created it
+                if failed_before_send(e) and attempt < self.max_retries:
+                    self._record("retried")
+                    time.sleep(self._backoff_seconds(attempt))
+                    attempt += 1
+                    continue
+                self._record("network_error", time.perf_counter() - started)
+                return {"ok": False, "status": None, "data": str(e), "postIdHeader": None}
+            except requests.Timeout as e:
+                # A read timeout may mean the post was created; never retry it
+                self._record("timeout", time.perf_counter() - started)
+                return {"ok": False, "status": None, "data": str(e), "postIdHeader": None}
+            elapsed = time.perf_counter() - started
+            # 500/502/504 can come back after the post was created, so only 429 and 503 are retried
+            if response.status_code in RETRYABLE_STATUSES and attempt < self.max_retries:
+                self._record("retried", elapsed)
+                time.sleep(self._backoff_seconds(attempt, response))
+                attempt += 1
+                continue
+            if response.ok:
+                outcome = "success"
+            elif response.status_code == 429:
+                outcome = "rate_limited"
+            elif response.status_code >= 500:
+                outcome = "server_error"
+            else:
+                outcome = "client_error"
+            self._record(outcome, elapsed)
+            try:
+                data = response.json()
+            except Exception:
+                data = response.text
+            result = {
+                "ok": response.ok,
+                "status": response.status_code,
+                "data": data,
+                "postIdHeader": response.headers.get("x-restli-id"),
+            }
+            retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+            if response.status_code == 429 and retry_after is not None:
+                result["retryAfter"] = round(retry_after, 1)
+            return result
+
+    def member_id_for_token(self, access_token: str) -> Optional[str]:
+        """LinkedIn member ID (OpenID "sub") of an access token, or None if LinkedIn rejects the token"""
+        key = hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+        member_id = self._sessions.get(key)
+        if member_id is not None:
+            return member_id
+        response = self.session.get(
+            f"{self.base_url}/v2/userinfo", headers={"Authorization": f"Bearer {access_token}"}, timeout=self.timeout
+        )
+        if response.status_code in (401, 403):
+            return None
+        response.raise_for_status()
+        member_id = response.json().get("sub")
+        if member_id:
+            self._sessions.set(key, member_id)
+        return member_id
+
+    def stats(self) -> Dict[str, Any]:
+        """Outcome counters and request latency"""
+        with self._lock:
+            count = self._latency["count"]
+            return {
+                "outcomes": dict(self._outcomes),
+                "retries": self._retries,
+                "requests": count,
+                "avg_latency_seconds": round(self._latency["total_seconds"] / count, 4) if count else 0.0,
+                "max_latency_seconds": round(self._latency["max_seconds"], 4)
+            }
+
+# Global LinkedIn client instance
+linkedin_client = LinkedInClient()
@@ -3,12 +3,15 @@ LinkedIn Posts AI Agent Backend
 A professional AI-powered LinkedIn content creation and management system.
 """
 import os
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 load_dotenv()
 from config import Config
 from routes import router
+from lifecycle import lifespan
+from metrics import HTTP_REQUEST_DURATION
 
 # Initialize configuration
 Config.validate_config()
@@ -19,7 +22,8 @@ app = FastAPI(
     version=Config.APP_VERSION,
     description="AI-powered LinkedIn content creation and management system",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -31,6 +35,24 @@ app.add_middleware(
     allow_headers=Config.CORS_HEADERS,
 )
 
+# Record per-route latency; the route template keeps label cardinality bounded
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        )
+
 # Include API routes
 app.include_router(router)
 
@@ -0,0 +1,184 @@
+"""
+Minimal Prometheus-style metrics registry and text exposition
+"""
+import bisect
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set"""
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+class Gauge(_Metric):
+    """Value that can go up and down, or is read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                items.append((key, float(function())))
+            except Exception:
+                continue
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts, then +Inf count, then sum
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = self.header()
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+))
+LLM_CALL_DURATION = registry.register(Histogram(
+    "llm_call_duration_seconds", "Model call duration by AIService method and model", ("method", "model", "outcome"),
+    buckets=SLOW_BUCKETS
+))
+LLM_ROUTE_DECISIONS = registry.register(Counter(
+    "llm_route_decisions_total", "Model chosen per AIService method and why (primary, fallback, all_open)",
+    ("method", "model", "reason")
+))
+SINGLEFLIGHT_CALLS = registry.register(Counter(
+    "singleflight_calls_total", "Coalesced calls by group: leaders ran the call, coalesced callers shared it",
+    ("group", "role")
+))
+LLM_TOKENS = registry.register(Counter(
+    "llm_tokens_total", "Gemini tokens by AIService method and kind (prompt or output)", ("method", "kind")
+))
+LLM_IN_FLIGHT = registry.register(Gauge(
+    "llm_in_flight", "Gemini calls currently running or waiting for a slot", ("state",)
+))
+MONGO_OPERATION_DURATION = registry.register(Histogram(
+    "mongo_operation_duration_seconds", "MongoDB command latency", ("collection", "command", "outcome")
+))
+SCHEDULER_LAG = registry.register(Histogram(
+    "scheduler_lag_seconds", "Actual publish time minus scheduled_time", buckets=LAG_BUCKETS
+))
+SCHEDULER_QUEUE_DEPTH = registry.register(Gauge(
+    "scheduler_queue_depth", "Scheduled posts waiting in the scheduler heap"
+))
+LINKEDIN_PUBLISH = registry.register(Counter(
+    "linkedin_publish_total", "LinkedIn publish attempts by outcome", ("outcome",)
+))
+LINKEDIN_REQUEST_DURATION = registry.register(Histogram(
+    "linkedin_request_duration_seconds", "LinkedIn API request latency", ("outcome",)
+))
+
+def render_latest() -> str:
+    """Render every registered metric in Prometheus text format"""
+    return registry.render()
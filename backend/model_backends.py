@@ -0,0 +1,196 @@
+"""
+Model backends that AIService routes generation calls to.
+
+A backend takes the per-call prompt, an optional system instruction and a
+generation config, and returns a response with `.text` and
+`.usage_metadata` (or, when streaming, an async iterator of such chunks),
+as the Gemini SDK does. Model names starting with "fake" create a
+FakeBackend, so routes can point at an offline model for tests, local
+runs and load tests.
+"""
+import asyncio
+import math
+import random
+import threading
+import types
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from config import Config
+
+# Most Gemini models kept bound to distinct system instructions, per backend
+SYSTEM_MODEL_CACHE_SIZE = 256
+
+class ModelBackend(ABC):
+    """One named model that can generate content"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def is_configured(self) -> bool:
+        return True
+
+    @abstractmethod
+    async def generate(self, prompt: str, system_instruction: Optional[str] = None,
+                       generation_config: Optional[Dict[str, Any]] = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stream(self, prompt: str, system_instruction: Optional[str] = None,
+                     generation_config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Any]:
+        """Async iterator of response chunks"""
+        raise NotImplementedError
+
+class GeminiBackend(ModelBackend):
+    """A Gemini model through google-generativeai"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_configured(self) -> bool:
+        return bool(Config.GEMINI_API_KEY)
+
+    def _model_for(self, system_instruction: Optional[str]):
+        """GenerativeModel bound to a system instruction, created on first use"""
+        with self._lock:
+            model = self._models.get(system_instruction)
+            if model is not None:
+                self._models.move_to_end(system_instruction)
+                return model
+        # Imported here because the SDK alone takes most of the app's import time
+        import google.generativeai as genai
+        genai.configure(api_key=Config.GEMINI_API_KEY)
+        model = genai.GenerativeModel(self.name, system_instruction=system_instruction)
+        with self._lock:
+            self._models[system_instruction] = model
+            while len(self._models) > SYSTEM_MODEL_CACHE_SIZE:
+                self._models.popitem(last=False)
+        return model
+
+    async def generate(self, prompt: str, system_instruction: Optional[str] = None,
+                       generation_config: Optional[Dict[str, Any]] = None):
+        return await self._model_for(system_instruction).generate_content_async(
+            prompt, generation_config=generation_config
+        )
+
+    async def stream(self, prompt: str, system_instruction: Optional[str] = None,
+                     generation_config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Any]:
+        response = await self._model_for(system_instruction).generate_content_async(
+            prompt, stream=True, generation_config=generation_config
+        )
+        async for chunk in response:
+            yield chunk
+
+def fake_response(text: str, prompt_tokens: int = 0, output_tokens: int = 0):
+    """Response object shaped like the Gemini SDK's"""
+    usage = types.SimpleNamespace(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=output_tokens,
+        total_token_count=prompt_tokens + output_tokens,
+        cached_content_token_count=0
+    )
+    return types.SimpleNamespace(text=text, usage_metadata=usage)
+
+class FakeModelError(Exception):
+    """Injected failure from a FakeBackend"""
+
+FAKE_WORDS = (
+    "teams", "ship", "faster", "when", "AI", "agents", "handle", "the", "busywork", "and", "engineers",
+    "focus", "on", "design", "growth", "insight", "data", "cloud", "platform", "#AI", "#Engineering", "🚀",
+)
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency sampler from "fixed:S", "uniform:LOW:HIGH", "exponential:MEAN" or "lognormal:MEDIAN:SIGMA" (seconds)"""
+    kind, *params = spec.split(":")
+    values = [float(value) for value in params]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    if kind == "lognormal":
+        return lambda rng: values[0] * math.exp(rng.gauss(0, values[1]))
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+class FakeBackend(ModelBackend):
+    """Offline model with configurable latency, failures and output length.
+
+    Options come from the model name's query string, e.g.
+    "fake:slow?latency=lognormal:0.8:0.5&error_rate=0.02&timeout_rate=0.01&output_tokens=200&chunk_tokens=8&seed=1".
+    Each call's latency, outcome and text are derived from the seed and the
+    prompt, so the same prompt always behaves the same way.
+    """
+
+    def __init__(self, name: str = "fake", latency: str = "fixed:0", error_rate: float = 0.0,
+                 timeout_rate: float = 0.0, output_tokens: int = 60, chunk_tokens: int = 8, seed: int = 0):
+        super().__init__(name)
+        self.latency = latency
+        self._sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.output_tokens = output_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.seed = seed
+        self.calls = 0
+
+    @classmethod
+    def from_name(cls, name: str) -> "FakeBackend":
+        options = dict(parse_qsl(urlsplit(name).query))
+        return cls(
+            name,
+            latency=options.get("latency", "fixed:0"),
+            error_rate=float(options.get("error_rate", 0)),
+            timeout_rate=float(options.get("timeout_rate", 0)),
+            output_tokens=int(options.get("output_tokens", 60)),
+            chunk_tokens=int(options.get("chunk_tokens", 8)),
+            seed=int(options.get("seed", 0))
+        )
+
+    def _plan(self, prompt: str, system_instruction: Optional[str]):
+        """Latency, outcome and output words for one call"""
+        self.calls += 1
+        rng = random.Random(f"{self.seed}:{system_instruction or ''}:{prompt}")
+        latency = max(0.0, self._sample_latency(rng))
+        roll = rng.random()
+        outcome = "error" if roll < self.error_rate else "timeout" if roll < self.error_rate + self.timeout_rate else "ok"
+        words = [rng.choice(FAKE_WORDS) for _ in range(self.output_tokens)]
+        prompt_tokens = (len(prompt) + len(system_instruction or "")) // 4
+        return latency, outcome, words, prompt_tokens
+
+    async def generate(self, prompt: str, system_instruction: Optional[str] = None,
+                       generation_config: Optional[Dict[str, Any]] = None):
+        latency, outcome, words, prompt_tokens = self._plan(prompt, system_instruction)
+        if outcome == "timeout":
+            # Never answers; the router's per-model timeout ends the call
+            await asyncio.Event().wait()
+        await asyncio.sleep(latency)
+        if outcome == "error":
+            raise FakeModelError(f"{self.name}: injected error")
+        return fake_response(" ".join(words), prompt_tokens, len(words))
+
+    async def stream(self, prompt: str, system_instruction: Optional[str] = None,
+                     generation_config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Any]:
+        latency, outcome, words, prompt_tokens = self._plan(prompt, system_instruction)
+        if outcome == "timeout":
+            await asyncio.Event().wait()
+        chunks = [words[i:i + self.chunk_tokens] for i in range(0, len(words), self.chunk_tokens)] or [[]]
+        # Spread the call's latency evenly over its chunks
+        delay = latency / len(chunks)
+        for index, chunk in enumerate(chunks):
+            await asyncio.sleep(delay)
+            if outcome == "error" and index == len(chunks) // 2:
+                raise FakeModelError(f"{self.name}: injected error mid-stream")
+            last = index == len(chunks) - 1
+            text = " ".join(chunk) + ("" if last else " ")
+            yield fake_response(text, prompt_tokens if last else 0, len(words) if last else 0)
+
+def create_backend(name: str) -> ModelBackend:
+    """Backend for a model name from MODEL_ROUTES or GEMINI_MODEL"""
+    if name == "fake" or name.startswith(("fake:", "fake?")):
+        return FakeBackend.from_name(name)
+    return GeminiBackend(name)
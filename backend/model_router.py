@@ -0,0 +1,197 @@
+"""
+Per-task model routing with circuit breakers.
+
+Each AIService method (task) maps to an ordered list of models: a primary
+and its fallbacks. Every model has a circuit breaker over its recent calls.
+When the p95 latency or the error rate of the window crosses its threshold,
+the breaker opens and the task's traffic moves to the next model. After a
+cooldown, one probe call is let through, and a good probe closes the
+breaker again. Changes of the chosen model per task are logged.
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, List
+
+from metrics import LLM_ROUTE_DECISIONS
+from model_backends import ModelBackend, create_backend
+
+# Route used for tasks without their own entry in MODEL_ROUTES
+DEFAULT_TASK = "*"
+
+class CircuitBreaker:
+    """Opens on high p95 latency or error rate over the last `window` calls"""
+
+    def __init__(self, window: int = 50, min_calls: int = 10, p95_threshold: float = 20.0,
+                 error_rate_threshold: float = 0.5, cooldown: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.min_calls = min_calls
+        self.p95_threshold = p95_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.reason = ""
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+
+    def _p95(self) -> float:
+        latencies = sorted(latency for latency, _ in self._samples)
+        return latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)] if latencies else 0.0
+
+    def _error_rate(self) -> float:
+        return sum(1 for _, ok in self._samples if not ok) / len(self._samples) if self._samples else 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go to this model now"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self.clock() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+            # A probe that never reported back (e.g. a cancelled request) is replaced after a cooldown
+            if self.state == "half_open" and (not self._probing or self.clock() - self._probe_started >= self.cooldown):
+                self._probing = True
+                self._probe_started = self.clock()
+                return True
+            return False
+
+    def _open(self, reason: str) -> None:
+        self.state = "open"
+        self.reason = reason
+        self._opened_at = self.clock()
+        self._probing = False
+
+    def cancel(self) -> None:
+        """Forget a call abandoned by its caller: it is no sample, and a probe's slot is freed for the next call"""
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            if self.state == "half_open" and self._probing:
+                if ok and latency <= self.p95_threshold:
+                    self.state = "closed"
+                    self.reason = ""
+                    self._samples.clear()
+                    self._probing = False
+                else:
+                    self._open(f"probe {'slow' if ok else 'failed'} ({latency:.2f}s)")
+                return
+            self._samples.append((latency, ok))
+            if self.state != "closed" or len(self._samples) < self.min_calls:
+                return
+            p95, error_rate = self._p95(), self._error_rate()
+            if error_rate > self.error_rate_threshold:
+                self._open(f"error rate {error_rate:.0%} > {self.error_rate_threshold:.0%}")
+            elif p95 > self.p95_threshold:
+                self._open(f"p95 {p95:.2f}s > {self.p95_threshold:.2f}s")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "reason": self.reason,
+                "calls": len(self._samples),
+                "p95_seconds": round(self._p95(), 3),
+                "error_rate": round(self._error_rate(), 4),
+            }
+
+class ModelRouter:
+    """Chooses the model for each task and tracks every model's health"""
+
+    def __init__(self, routes: Dict[str, List[str]], timeouts: Dict[str, float], default_timeout: float,
+                 breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker):
+        self.routes = {task: list(models) for task, models in routes.items() if models}
+        self.timeouts = dict(timeouts)
+        self.default_timeout = default_timeout
+        self.breaker_factory = breaker_factory
+        self.backends: Dict[str, ModelBackend] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._last_choice: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def register(self, backend: ModelBackend) -> None:
+        """Use this backend for its model name (e.g. a FakeBackend in tests)"""
+        with self._lock:
+            self.backends[backend.name] = backend
+            self.breakers[backend.name] = self.breaker_factory()
+
+    def use_backend(self, backend: ModelBackend) -> None:
+        """Register a backend and route every task to it alone"""
+        self.register(backend)
+        self.routes = {DEFAULT_TASK: [backend.name]}
+        self._last_choice.clear()
+
+    def models_for(self, task: str) -> List[str]:
+        return self.routes.get(task) or self.routes[DEFAULT_TASK]
+
+    def primary(self, task: str) -> str:
+        return self.models_for(task)[0]
+
+    def backend(self, name: str) -> ModelBackend:
+        with self._lock:
+            if name not in self.backends:
+                self.backends[name] = create_backend(name)
+                self.breakers[name] = self.breaker_factory()
+            return self.backends[name]
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        self.backend(name)
+        return self.breakers[name]
+
+    def timeout_for(self, name: str) -> float:
+        return self.timeouts.get(name, self.default_timeout)
+
+    def is_configured(self, task: str) -> bool:
+        return any(self.backend(name).is_configured() for name in self.models_for(task))
+
+    def candidates(self, task: str) -> Iterator[ModelBackend]:
+        """Backends to try for a task, in order. Breakers are consulted lazily, so a
+        half-open fallback's probe is only used if the call actually reaches it."""
+        models = [name for name in self.models_for(task) if self.backend(name).is_configured()]
+        yielded = False
+        for name in models:
+            if self.breaker(name).allow():
+                yielded = True
+                self._log_choice(task, name, models[0], "primary" if name == models[0] else "fallback")
+                yield self.backend(name)
+        if not yielded:
+            # Every model's breaker is open: keep trying them in order rather than failing outright
+            for name in models:
+                self._log_choice(task, name, models[0], "all_open")
+                yield self.backend(name)
+
+    def _log_choice(self, task: str, chosen: str, primary: str, reason: str) -> None:
+        LLM_ROUTE_DECISIONS.inc(method=task, model=chosen, reason=reason)
+        if self._last_choice.get(task) == chosen:
+            return
+        self._last_choice[task] = chosen
+        if reason == "primary":
+            print(f"[ModelRouter] {task} -> {chosen} (primary)")
+        else:
+            breaker = self.breaker(primary)
+            detail = f"{primary} circuit {breaker.state}" + (f": {breaker.reason}" if breaker.reason else "")
+            print(f"[ModelRouter] {task} -> {chosen} ({reason}; {detail})")
+
+    def record(self, name: str, latency: float, ok: bool) -> None:
+        self.breaker(name).record(latency, ok)
+
+    def cancel(self, name: str) -> None:
+        self.breaker(name).cancel()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "routes": self.routes,
+            "current": dict(self._last_choice),
+            "models": {
+                name: {"timeout_seconds": self.timeout_for(name), **self.breakers[name].stats()}
+                for name in list(self.backends)
+            },
+        }
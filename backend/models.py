@@ -1,6 +1,7 @@
 
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+from datetime import date
 
 # Model for basic user input when generating a post
 class UserInput(BaseModel):
@@ -11,15 +12,38 @@ class UserInput(BaseModel):
 class GenerateRequest(BaseModel):
     topic: str
     content_type: Optional[str] = "thought_leadership"
+    # LinkedIn member ID (OpenID "sub"); omit to use the single-user profile file
+    member_id: Optional[str] = None
+    bypass_cache: bool = False
+    refresh_cache: bool = False
 
 # Model for sending post content to be optimized
 class PostContent(BaseModel):
     text: str
+    member_id: Optional[str] = None
+    bypass_cache: bool = False
+    refresh_cache: bool = False
+
+# Model for generating news posts for many TLDR subtopics in one request
+class BatchNewsPostRequest(BaseModel):
+    titles: Optional[List[str]] = None
+    all_non_posted: bool = False
+    max_concurrency: Optional[int] = None
+    bypass_cache: bool = False
+    refresh_cache: bool = False
 
 # Model for requesting a content calendar
 class ContentCalendarRequest(BaseModel):
     days: int = 7
     content_types: Optional[List[str]] = ["thought_leadership", "educational", "engagement"]
+    member_id: Optional[str] = None
+    # First day of the calendar (UTC); defaults to today
+    start_date: Optional[date] = None
+    # Also generate every post of the calendar, concurrently
+    generate_posts: bool = False
+    max_concurrency: Optional[int] = None
+    bypass_cache: bool = False
+    refresh_cache: bool = False
 
 # Model for requesting analytics data for posts
 class AnalyticsRequest(BaseModel):
@@ -32,6 +56,36 @@ class SchedulePostRequest(BaseModel):
     scheduled_time: str
     content_type: Optional[str] = "general"
 
+# One calendar item to schedule; items from /content-calendar can be sent as they are
+class CalendarItem(BaseModel):
+    scheduled_time: str
+    content: Optional[str] = None
+    # Generated post from /content-calendar with generate_posts, used when content is empty
+    post: Optional[str] = None
+    content_type: Optional[str] = "general"
+    suggested_topic: Optional[str] = None
+    topic_source: Optional[str] = None
+
+# Model for scheduling a whole calendar at once
+class BulkScheduleRequest(BaseModel):
+    calendar: List[CalendarItem]
+    member_id: Optional[str] = None
+    # Generate posts for items without content from their suggested topic
+    generate_missing: bool = True
+    max_concurrency: Optional[int] = None
+    bypass_cache: bool = False
+    refresh_cache: bool = False
+
+class RescheduleItem(BaseModel):
+    post_id: str
+    scheduled_time: str
+
+class BulkRescheduleRequest(BaseModel):
+    posts: List[RescheduleItem]
+
+class BulkCancelRequest(BaseModel):
+    post_ids: List[str]
+
 # Model for a user's LinkedIn profile
 class UserProfile(BaseModel):
     id: str
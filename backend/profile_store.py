@@ -0,0 +1,147 @@
+"""
+In-memory user profile store that follows changes to user_profile.json.
+
+Reads are served from an immutable snapshot. When the file's mtime or size
+changes (checked at most every PROFILE_CHECK_SECONDS) or a reload is
+requested, the file is hashed and, only if its content changed, parsed into
+a new snapshot that replaces the old one in a single assignment. Readers
+holding the previous snapshot keep a consistent view of it.
+
+Snapshot data is built from read-only dict and list subclasses, so callers
+cannot edit a published snapshot in place (caches keyed on its objects rely
+on that), while it still serializes and type-checks as plain JSON data.
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Profile snapshots are read-only; copy the data before changing it")
+
+class ReadOnlyDict(dict):
+    """A dict that refuses changes"""
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # Copies and pickles are plain, writable dicts
+        return dict, (dict(self),)
+
+class ReadOnlyList(list):
+    """A list that refuses changes"""
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+def freeze(value: Any) -> Any:
+    """Read-only copy of parsed JSON data"""
+    if isinstance(value, dict):
+        return ReadOnlyDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return ReadOnlyList(freeze(item) for item in value)
+    return value
+
+EMPTY_SECTION = ReadOnlyDict()
+
+@dataclass(frozen=True)
+class ProfileSnapshot:
+    """One parsed version of the profile file; never mutated after it is published"""
+    data: Dict[str, Any]
+    version: str
+    loaded_at: str
+    # Content hash per top-level section, so callers can cache per section
+    section_versions: Dict[str, str] = field(default_factory=dict)
+
+    def section(self, name: str) -> Dict[str, Any]:
+        return self.data.get(name, EMPTY_SECTION)
+
+EMPTY_SNAPSHOT = ProfileSnapshot(data=ReadOnlyDict(), version="", loaded_at="", section_versions=ReadOnlyDict())
+
+def _hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+class ProfileStore:
+    """Serves profile data from memory and reloads it when the file changes"""
+
+    def __init__(self, path: Path, check_interval: float = 2.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._snapshot = EMPTY_SNAPSHOT
+        self._stat = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    @property
+    def snapshot(self) -> ProfileSnapshot:
+        """Current snapshot, refreshed first if the file changed since the last check"""
+        if time.monotonic() >= self._next_check:
+            self.reload(force=False)
+        return self._snapshot
+
+    def _file_stat(self) -> Optional[tuple]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self, force: bool = True) -> bool:
+        """Re-read the file if it changed (or unconditionally with force); returns whether a new snapshot was published"""
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            stat = self._file_stat()
+            if not force and stat == self._stat:
+                return False
+            self._stat = stat
+            try:
+                raw = self.path.read_bytes()
+            except FileNotFoundError:
+                print(f"❌ Data file not found: {self.path}")
+                return False
+            version = _hash(raw)
+            if version == self._snapshot.version:
+                return False
+            try:
+                data = json.loads(raw)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                # Keep serving the last good snapshot while the file is mid-edit or invalid
+                print(f"❌ Error parsing JSON data: {e}")
+                return False
+            self._snapshot = self._build_snapshot(data, version)
+        print(f"Loaded user profile data version {version}")
+        return True
+
+    def _build_snapshot(self, data: Dict[str, Any], version: str) -> ProfileSnapshot:
+        """Build the new snapshot, reusing the previous objects for sections that did not change"""
+        previous = self._snapshot
+        sections, section_versions = {}, {}
+        for name, value in data.items():
+            section_version = _hash(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+            if previous.section_versions.get(name) == section_version:
+                value = previous.data[name]
+            else:
+                value = freeze(value)
+            sections[name] = value
+            section_versions[name] = section_version
+        return ProfileSnapshot(
+            data=ReadOnlyDict(sections),
+            version=version,
+            loaded_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            section_versions=ReadOnlyDict(section_versions)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "path": str(self.path),
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at,
+            "section_versions": dict(snapshot.section_versions),
+        }
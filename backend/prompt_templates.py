@@ -0,0 +1,178 @@
+"""
+Versioned prompt templates for Gemini.
+
+Each template has a system instruction, holding the role, the rules and
+(for personalized posts) the profile block, and a short per-call prompt
+with only the topic-specific part. Templates are prepared once at import.
+The personalized system instruction is rendered once per profile and reused
+until the profile changes, and the unchanged prefix lets Gemini's implicit
+caching reuse it across calls.
+"""
+import textwrap
+import threading
+from collections import OrderedDict
+from string import Formatter
+from typing import Dict, Any, List, Tuple
+
+class PromptTemplate:
+    """A system instruction and per-call prompt, dedented and checked once at import"""
+
+    def __init__(self, name: str, version: str, system: str, prompt: str):
+        self.name = name
+        self.version = version
+        self._system, self.system_fields = self._compile(system)
+        self._prompt, self.prompt_fields = self._compile(prompt)
+
+    @staticmethod
+    def _compile(text: str) -> Tuple[str, List[str]]:
+        """Dedent a template and list its fields, rejecting format specs so rendering stays a plain substitution"""
+        text = textwrap.dedent(text).strip()
+        fields = []
+        for _, field, spec, conversion in Formatter().parse(text):
+            if spec or conversion:
+                raise ValueError(f"Format specs are not supported in prompt templates: {field}")
+            if field is not None:
+                fields.append(field)
+        return text, fields
+
+    def render_system(self, **values) -> str:
+        return self._system.format_map(values) if self.system_fields else self._system
+
+    def render_prompt(self, **values) -> str:
+        return self._prompt.format_map(values)
+
+PLAIN_TEXT_RULE = (
+    "Do NOT use any Markdown formatting (such as ##, #, *, or other Markdown symbols) in the post. "
+    "Write the post as plain text only, without headings or Markdown."
+)
+
+TEMPLATES: Dict[str, Dict[str, PromptTemplate]] = {
+    "personalized_post": {
+        "v1": PromptTemplate("personalized_post", "v1", system="""
+            Act as a LinkedIn content expert. You're writing for {name}, who is a {headline}.
+            Add a hook to grab attention.
+            User Background:
+            - Industry: {industry}
+            - Position: {position} at {company}
+            - Skills: {skills}
+            - Interests: {interests}
+            - Summary: {summary}
+
+            Every post you write:
+            1. Reflects their expertise and experience
+            2. Uses their authentic voice and perspective
+            3. Includes relevant insights from their background
+            4. Encourages meaningful engagement
+            5. Includes 5-7 relevant hashtags
+            6. Uses 3-4 emojis
+
+            Keep it professional, engaging, and under 300 words.
+            """ + PLAIN_TEXT_RULE, prompt="""
+            Generate a {content_type} LinkedIn post about '{topic}'.
+            """),
+    },
+    "news_post": {
+        "v1": PromptTemplate("news_post", "v1", system="""
+            Act as an expert LinkedIn content writer and news researcher.
+            Add a hook to grab attention.
+            Each title comes from the TLDR newsletter, so read the TLDR newsletter containing the topic online before writing the post.
+            You can also look at other LinkedIn posts on the same topic for reference.
+            The tone of the text should be professional and insightful.
+            Don't mention things like these explicitly: TLDR newsletter, **Call to Action:**
+            Use 3-4 emojis. Do NOT use any Markdown formatting (such as ##, #, *, or other Markdown symbols) in the post.
+            Include 3-5 relevant hashtags, a call to action, and keep it under 200 words.
+            """, prompt="""
+            Generate an engaging LinkedIn post based on the following news item:
+            Title: "{title}"
+            """),
+    },
+    "optimize_post": {
+        "v1": PromptTemplate("optimize_post", "v1", system="""
+            Analyze LinkedIn posts and provide optimization suggestions.
+
+            Provide:
+            1. Engagement score (1-10)
+            2. Specific improvement suggestions
+            3. Optimized version of the post
+            4. Best hashtags for this content
+            5. Optimal posting time recommendations
+
+            Focus on maximizing likes, comments, and shares while maintaining professionalism.
+            """, prompt="""
+            Post: "{post_content}"
+            """),
+    },
+}
+
+def get_template(name: str, version: str) -> PromptTemplate:
+    """Look up a template, falling back to its latest version when the requested one does not exist"""
+    versions = TEMPLATES[name]
+    return versions.get(version) or list(versions.values())[-1]
+
+def profile_values(user_profile: Dict[str, Any]) -> Dict[str, str]:
+    """Profile fields used by the personalized template, with defaults for missing ones"""
+    skills = user_profile.get("skills") or []
+    if not isinstance(skills, list):
+        skills = [str(skills)]
+    interests = user_profile.get("interests") or []
+    if not isinstance(interests, list):
+        interests = [str(interests)]
+    return {
+        "name": user_profile.get("name", "a LinkedIn professional"),
+        "headline": user_profile.get("headline", "industry expert"),
+        "industry": user_profile.get("industry", "Technology"),
+        "position": user_profile.get("position", "Professional"),
+        "company": user_profile.get("company", "their organization"),
+        "summary": user_profile.get("summary", "Experienced professional with practical insights."),
+        "skills": ", ".join(str(skill) for skill in skills[:5]) if skills else "Leadership, Communication",
+        "interests": ", ".join(str(interest) for interest in interests[:3]) if interests else "Innovation, Growth",
+    }
+
+class PromptBuilder:
+    """Builds (system instruction, prompt) pairs, reusing rendered profile blocks"""
+
+    def __init__(self, version: str, max_profiles: int = 1024):
+        self.version = version
+        self.max_profiles = max_profiles
+        # Keyed by id() of the profile dict; the dict is kept in the entry so its id cannot be reused.
+        # Profile snapshots and the member cache hand out the same dict until the profile changes.
+        self._systems = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _personalized_system(self, template: PromptTemplate, user_profile: Dict[str, Any]) -> str:
+        key = (id(user_profile), template.version)
+        with self._lock:
+            entry = self._systems.get(key)
+            if entry is not None and entry[0] is user_profile:
+                self._systems.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        system = template.render_system(**profile_values(user_profile))
+        with self._lock:
+            self._systems[key] = (user_profile, system)
+            while len(self._systems) > self.max_profiles:
+                self._systems.popitem(last=False)
+        return system
+
+    def personalized_post(self, topic: str, content_type: str, user_profile: Dict[str, Any]) -> Tuple[str, str]:
+        template = get_template("personalized_post", self.version)
+        return (
+            self._personalized_system(template, user_profile),
+            template.render_prompt(topic=topic, content_type=content_type)
+        )
+
+    def news_post(self, title: str) -> Tuple[str, str]:
+        template = get_template("news_post", self.version)
+        return template.render_system(), template.render_prompt(title=title)
+
+    def optimize_post(self, post_content: str) -> Tuple[str, str]:
+        template = get_template("optimize_post", self.version)
+        return template.render_system(), template.render_prompt(post_content=post_content)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"version": self.version, "profile_hits": self.hits, "profile_misses": self.misses,
+                    "profiles": len(self._systems)}
@@ -0,0 +1,139 @@
+"""
+Content-addressed cache for AI model responses
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Any, Optional
+
+class ResponseCache:
+    """In-memory LRU cache with TTL, optionally backed by a SQLite store"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, sqlite_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        # SQLite reads and writes take their own lock, so memory hits never wait on disk
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        if sqlite_path:
+            self._open_store(sqlite_path)
+
+    def _open_store(self, sqlite_path: str) -> None:
+        """Open the persistent tier, disabling it if the file cannot be used"""
+        try:
+            Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: response cache store unavailable ({e}); using memory only.")
+            self._db = None
+
+    @staticmethod
+    def make_key(model: str, method: str, prompt: str, system_instruction: Optional[str] = None) -> str:
+        """Hash the model name, method, system instruction and rendered prompt into a cache key"""
+        parts = [model, method, prompt] if system_instruction is None else [model, method, system_instruction, prompt]
+        payload = json.dumps(parts, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def persistent(self) -> bool:
+        """Whether lookups may touch the SQLite tier, so callers on an event loop should use a thread"""
+        return self._db is not None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None if missing or expired"""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        # The SQLite lookup runs outside the memory lock
+        found = self._get_persistent(key, now)
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            value, created_at = found
+            self._store_memory(key, value, created_at)
+            self.hits += 1
+            self.persistent_hits += 1
+            return value
+
+    def _get_persistent(self, key: str, now: float) -> Optional[tuple]:
+        """(value, created_at) from the persistent tier, or None if missing or expired"""
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if now - created_at >= self.ttl_seconds:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    return None
+        except sqlite3.Error as e:
+            print(f"Warning: response cache read failed: {e}")
+            return None
+        return value, created_at
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response in every enabled tier"""
+        created_at = self.clock()
+        with self._lock:
+            self._store_memory(key, value, created_at)
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                        (key, value, created_at)
+                    )
+                    self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: response cache write failed: {e}")
+
+    def _store_memory(self, key: str, value: str, created_at: float) -> None:
+        """Insert into the LRU tier, evicting the least recently used entries"""
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "persistent_hits": self.persistent_hits,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self._db is not None
+            }
@@ -2,24 +2,83 @@
 """
 API route handlers for the LinkedIn Posts AI Agent
 """
-from fastapi import APIRouter, HTTPException, Request, Response
-from starlette.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from models import (
     UserInput, GenerateRequest, PostContent, 
-    ContentCalendarRequest, AnalyticsRequest, SchedulePostRequest
+    ContentCalendarRequest, AnalyticsRequest, SchedulePostRequest,
+    BatchNewsPostRequest, UserProfile, ContentStrategy, PostAnalytics,
+    BulkScheduleRequest, BulkRescheduleRequest, BulkCancelRequest
 )
 from services import (
     ProfileService, IndustryService, ContentService, 
-    AnalyticsService, SchedulingService
+    AnalyticsService, SchedulingService, NewsService
 )
-from ai_service import ai_service, tldr_collection, MONGO_AVAILABLE, fetch_non_posted_topics
+from ai_service import ai_service, mark_topics_as_posted
+from database import get_tldr_collection
+from data_manager import data_manager
+from concurrency import QueueFullError
+from usage_tracker import BudgetExceededError
+from linkedin_client import linkedin_client
+from tenant_store import UnknownMemberError
+from metrics import render_latest
+from topic_pages import etag_for, etag_matches
 from pydantic import BaseModel
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
 import json
 import traceback
+import requests
 
 """Using a single router for all endpoints"""
 router = APIRouter()  
 
+def raise_generation_error(exc: Exception) -> None:
+    """Translate limiter, budget, timeout and unknown-member failures from AI generation into HTTP errors"""
+    if isinstance(exc, UnknownMemberError):
+        raise HTTPException(status_code=404, detail=str(exc))
+    if isinstance(exc, (QueueFullError, BudgetExceededError)):
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)}
+        )
+    if isinstance(exc, asyncio.TimeoutError):
+        raise HTTPException(status_code=504, detail="AI generation timed out")
+
+def format_sse(event: str, data: dict) -> str:
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def sse_response(events, context: str) -> StreamingResponse:
+    """Stream events as SSE, surfacing failures before the first event as HTTP errors"""
+    try:
+        first = await events.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        raise_generation_error(e)
+        print(f"Error in {context}:", traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def body():
+        if first is not None:
+            yield format_sse(first["event"], first["data"])
+        try:
+            async for item in events:
+                yield format_sse(item["event"], item["data"])
+        except Exception as e:
+            print(f"Error in {context}:", traceback.format_exc())
+            yield format_sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Logout endpoint must come after router is defined
 @router.post("/api/linkedin/logout")
 def linkedin_logout():
@@ -29,19 +88,22 @@ def linkedin_logout():
     return response
 
 # TLDR news endpoint
+def json_with_etag(request: Request, content: Dict) -> Response:
+    """JSON response with an ETag, or 304 when the client already has this exact content"""
+    etag = etag_for(content)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
 @router.get("/tldr-news")
-def get_tldr_news():
-    """Get latest TLDR news from MongoDB."""
-    # If MongoDB is unavailable, return empty list
-    if not MONGO_AVAILABLE or tldr_collection is None:
-        return JSONResponse(content={"news": []})
+def get_tldr_news(request: Request, limit: int = 10, cursor: Optional[str] = None,
+                  since: Optional[datetime] = None, until: Optional[datetime] = None, prefix: Optional[str] = None):
+    """Get TLDR news from MongoDB, newest first. Pass `next_cursor` back as `cursor` for the next page."""
     try:
-        news = list(
-            tldr_collection.find({}, {"_id": 0})
-            .sort("published", -1)
-            .limit(10)
-        )
-        return JSONResponse(content={"news": news})
+        return json_with_etag(request, NewsService.list_news(limit, cursor, since, until, prefix))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -62,6 +124,77 @@ def get_user_profile():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/profile/reload")
+def reload_profile():
+    """Re-read user_profile.json without restarting the server"""
+    return data_manager.reload_profile()
+
+# Per-member endpoints, keyed by LinkedIn member ID
+def require_member_session(request: Request, member_id: str) -> None:
+    """Allow only a caller whose LinkedIn session (auth cookie or bearer token) belongs to `member_id`"""
+    token = request.cookies.get("linkedin_access_token")
+    authorization = request.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if not token:
+        raise HTTPException(status_code=401, detail="LinkedIn login required",
+                            headers={"WWW-Authenticate": "Bearer"})
+    try:
+        session_member_id = linkedin_client.member_id_for_token(token)
+    except requests.RequestException as e:
+        raise HTTPException(status_code=503, detail=f"Could not verify the LinkedIn session: {e}")
+    if session_member_id is None:
+        raise HTTPException(status_code=401, detail="LinkedIn session is invalid or expired",
+                            headers={"WWW-Authenticate": "Bearer"})
+    if session_member_id != member_id:
+        raise HTTPException(status_code=403, detail="This LinkedIn session belongs to another member")
+
+def require_optional_member_session(request: Request, member_id: Optional[str] = None) -> None:
+    """Check the session when a `member_id` query parameter is given; without one the single-user profile is used"""
+    if member_id is not None:
+        require_member_session(request, member_id)
+
+async def check_member_session(request: Request, member_id: Optional[str]) -> None:
+    """Session check for a `member_id` taken from a request body, off the event loop"""
+    if member_id is not None:
+        await run_in_threadpool(require_member_session, request, member_id)
+
+@router.get("/users/{member_id}/profile", dependencies=[Depends(require_member_session)])
+def get_member_profile(member_id: str):
+    """Get a member's stored profile and content strategies"""
+    try:
+        return ProfileService.get_member_profile(member_id)
+    except UnknownMemberError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/users/{member_id}/profile", dependencies=[Depends(require_member_session)])
+def save_member_profile(member_id: str, profile: UserProfile):
+    """Create or replace a member's profile"""
+    try:
+        return ProfileService.save_member_profile(member_id, profile.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.put("/users/{member_id}/strategies", dependencies=[Depends(require_member_session)])
+def save_member_strategies(member_id: str, strategies: Dict[str, ContentStrategy]):
+    """Create or replace a member's content strategies, keyed by content type"""
+    try:
+        return ProfileService.save_member_strategies(
+            member_id, {name: strategy.model_dump() for name, strategy in strategies.items()}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/users/{member_id}/analytics", dependencies=[Depends(require_member_session)])
+def record_member_post(member_id: str, post: PostAnalytics):
+    """Record or update analytics for one of a member's posts"""
+    try:
+        return ProfileService.record_member_post(member_id, post.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Industry research endpoints
 @router.get("/industry-trends/{industry}")
 def get_industry_trends(industry: str):
@@ -83,12 +216,21 @@ def get_content_strategy():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/content-calendar")
-def generate_content_calendar(request: ContentCalendarRequest):
-    """Generate a content calendar"""
+async def generate_content_calendar(request: ContentCalendarRequest, http_request: Request):
+    """Generate a content calendar from strategies, engagement history and unused news topics"""
+    await check_member_session(http_request, request.member_id)
     try:
-        calendar = ContentService.generate_content_calendar(request.days, request.content_types)
+        calendar = await ContentService.generate_content_calendar(
+            request.days, request.content_types, request.member_id, request.start_date,
+            generate_posts=request.generate_posts, max_concurrency=request.max_concurrency,
+            bypass_cache=request.bypass_cache, refresh_cache=request.refresh_cache
+        )
         return JSONResponse(content=calendar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        raise_generation_error(e)
+        print("Error in /content-calendar:", traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 # Content generation endpoints
@@ -102,40 +244,61 @@ def generate_post(user_input: UserInput):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/generate-personalized-content")
-def generate_personalized_content(request: GenerateRequest):
+async def generate_personalized_content(request: GenerateRequest, http_request: Request):
     """Generate personalized content based on user profile"""
+    await check_member_session(http_request, request.member_id)
     try:
-        result = ContentService.generate_personalized_content(request.topic, request.content_type)
+        result = await ContentService.generate_personalized_content(
+            request.topic, request.content_type, request.member_id,
+            bypass_cache=request.bypass_cache, refresh_cache=request.refresh_cache
+        )
         return JSONResponse(content=result)
     except Exception as e:
+        raise_generation_error(e)
         print("Error in /generate-personalized-content:", traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate-personalized-content/stream")
+async def stream_personalized_content(request: GenerateRequest, http_request: Request):
+    """Stream personalized content as Server-Sent Events"""
+    await check_member_session(http_request, request.member_id)
+    events = ContentService.stream_personalized_content(
+        request.topic, request.content_type, request.member_id,
+        bypass_cache=request.bypass_cache, refresh_cache=request.refresh_cache
+    )
+    return await sse_response(events, "/generate-personalized-content/stream")
+
 # Engagement optimization endpoints
 @router.post("/optimize-post")
-def optimize_post(post_content: PostContent):
+async def optimize_post(post_content: PostContent, request: Request):
     """Analyze and optimize a post for better engagement"""
+    await check_member_session(request, post_content.member_id)
     try:
-        result = ContentService.optimize_post(post_content.text)
+        result = await ContentService.optimize_post(
+            post_content.text,
+            bypass_cache=post_content.bypass_cache, refresh_cache=post_content.refresh_cache,
+            member_id=post_content.member_id
+        )
         return JSONResponse(content=result)
     except Exception as e:
+        raise_generation_error(e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Analytics endpoints
-@router.get("/analytics")
-def get_analytics():
-    """Get post performance analytics"""
+@router.get("/analytics", dependencies=[Depends(require_optional_member_session)])
+def get_analytics(member_id: Optional[str] = None, days: int = 0):
+    """Get post performance analytics; `days` adds a per-day engagement series for that many days"""
     try:
-        analytics = AnalyticsService.get_analytics()
+        analytics = AnalyticsService.get_analytics(member_id, min(max(0, days), 366))
         return JSONResponse(content=analytics)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/analytics/post/{post_id}")
-def get_post_analytics(post_id: str):
+@router.get("/analytics/post/{post_id}", dependencies=[Depends(require_optional_member_session)])
+def get_post_analytics(post_id: str, member_id: Optional[str] = None):
     """Get analytics for a specific post"""
     try:
-        analytics = AnalyticsService.get_post_analytics(post_id)
+        analytics = AnalyticsService.get_post_analytics(post_id, member_id)
         return JSONResponse(content=analytics)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -145,8 +308,49 @@ def get_post_analytics(post_id: str):
 def schedule_post(request: SchedulePostRequest):
     """Schedule a post for future publishing"""
     try:
-        result = SchedulingService.schedule_post(request.content, request.scheduled_time)
+        result = SchedulingService.schedule_post(request.content, request.scheduled_time, request.content_type)
+        return JSONResponse(content=result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/schedule-posts/bulk")
+async def schedule_posts_bulk(request: BulkScheduleRequest, http_request: Request):
+    """Schedule a whole calendar at once, generating posts for items without content"""
+    await check_member_session(http_request, request.member_id)
+    try:
+        result = await SchedulingService.schedule_calendar(
+            [item.model_dump() for item in request.calendar], request.member_id,
+            generate_missing=request.generate_missing, max_concurrency=request.max_concurrency,
+            bypass_cache=request.bypass_cache, refresh_cache=request.refresh_cache
+        )
+        return JSONResponse(content=result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise_generation_error(e)
+        print("Error in /schedule-posts/bulk:", traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/scheduled-posts/reschedule")
+def reschedule_posts(request: BulkRescheduleRequest):
+    """Move pending scheduled posts to new times"""
+    try:
+        result = SchedulingService.reschedule_posts([(post.post_id, post.scheduled_time) for post in request.posts])
         return JSONResponse(content=result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/scheduled-posts/cancel")
+def cancel_posts(request: BulkCancelRequest):
+    """Cancel pending scheduled posts"""
+    try:
+        return JSONResponse(content=SchedulingService.cancel_posts(request.post_ids))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -159,6 +363,40 @@ def get_scheduled_posts():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/metrics")
+def get_metrics():
+    """Prometheus metrics for HTTP, Gemini, MongoDB, scheduler and LinkedIn"""
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
+
+@router.get("/linkedin/metrics")
+def get_linkedin_metrics():
+    """Get LinkedIn publishing outcomes and latency"""
+    return linkedin_client.stats()
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Get AI response and member profile cache hit/miss counters, and request coalescing counters"""
+    stats = ai_service.cache.stats()
+    member_profiles = data_manager.tenant_cache_stats()
+    if member_profiles is not None:
+        stats["member_profiles"] = member_profiles
+    flights = [NewsService.flights] + list(ai_service.flights.values())
+    stats["coalescing"] = {flight.name: flight.stats() for flight in flights}
+    return stats
+
+@router.get("/models")
+def get_model_routes():
+    """Get the model route per AIService method and each model's circuit breaker state"""
+    return ai_service.router.stats()
+
+@router.get("/usage", dependencies=[Depends(require_optional_member_session)])
+def get_usage(days: int = 7, member_id: Optional[str] = None, method: Optional[str] = None):
+    """Get Gemini token usage per day, optionally for one member and/or AIService method"""
+    try:
+        return ai_service.usage.report(days, member_id, method)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Test endpoints
 @router.get("/test-gemini")
 def test_gemini():
@@ -168,51 +406,91 @@ def test_gemini():
 # News post generation endpoint
 class NewsPostRequest(BaseModel):
     title: str
+    bypass_cache: bool = False
+    refresh_cache: bool = False
 
 @router.post("/generate-news-post")
-def generate_news_post(request: NewsPostRequest):
+async def generate_news_post(request: NewsPostRequest):
     """Generate a LinkedIn post based on a news item"""
     try:
-        post = ai_service.generate_news_post(request.title, {})
-        # Mark the topic as posted in MongoDB for persistence
-        tldr_collection.update_many({"subtopic": request.title}, {"$set": {"posted": True}})
+        post = await NewsService.generate_news_post(
+            request.title, bypass_cache=request.bypass_cache, refresh_cache=request.refresh_cache
+        )
         return JSONResponse(content={"post": post})
     except Exception as e:
+        raise_generation_error(e)
         print('Error in /generate-news-post:', traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate-news-post/stream")
+async def stream_news_post(request: NewsPostRequest):
+    """Stream a LinkedIn post based on a news item as Server-Sent Events"""
+    async def events():
+        parts = []
+        async for text in ai_service.stream_news_post(
+            request.title, {}, bypass_cache=request.bypass_cache, refresh_cache=request.refresh_cache
+        ):
+            parts.append(text)
+            yield {"event": "chunk", "data": {"text": text}}
+        # Mark the topic as posted in MongoDB for persistence (skipped while it is unavailable)
+        await run_in_threadpool(mark_topics_as_posted, [request.title])
+        yield {"event": "done", "data": {"post": "".join(parts)}}
+
+    return await sse_response(events(), "/generate-news-post/stream")
+
+@router.post("/generate-news-posts/batch")
+async def generate_news_posts_batch(request: BatchNewsPostRequest):
+    """Generate posts for many TLDR subtopics, streaming one JSON line per item as it finishes"""
+    if not request.titles and not request.all_non_posted:
+        raise HTTPException(status_code=400, detail="Provide titles or set all_non_posted.")
+    results = NewsService.generate_news_posts_batch(
+        request.titles, all_non_posted=request.all_non_posted,
+        max_concurrency=request.max_concurrency,
+        bypass_cache=request.bypass_cache, refresh_cache=request.refresh_cache
+    )
+
+    async def lines():
+        async for item in results:
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/user-interests")
 def get_user_interests():
-    """Fetch user interests from user_profile.json."""
-    try:
-        with open("backend/data/user_profile.json", "r") as file:
-            data = json.load(file)
-            interests = data.get("user_profile", {}).get("interests", [])
-            return {"interests": interests}
-    except Exception as e:
-        return {"error": str(e)}
+    """Fetch user interests from the user profile."""
+    return {"interests": data_manager.get_user_profile().get("interests", [])}
 
 @router.get("/non-posted-topics")
-def get_non_posted_topics():
-    """Fetch individual subtopics that have not been posted about."""
+def get_non_posted_topics(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None,
+                          since: Optional[datetime] = None, until: Optional[datetime] = None,
+                          prefix: Optional[str] = None):
+    """Fetch a page of subtopics that have not been posted about, newest first."""
     try:
-        topics = fetch_non_posted_topics()
-        # Ensure topics is a flat list of subtopics
-        return {"topics": topics}
+        return json_with_etag(request, NewsService.list_topics(False, limit, cursor, since, until, prefix))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching non-posted topics: {e}")
 
 @router.get("/used-topics")
-def get_used_topics():
-    """Fetch topics that have already been posted about."""
+def get_used_topics(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None,
+                    since: Optional[datetime] = None, until: Optional[datetime] = None,
+                    prefix: Optional[str] = None):
+    """Fetch a page of subtopics that have already been posted about, newest first."""
     try:
-        # Find all documents where 'posted' is True and collect all subtopics (now using 'subtopic' string)
-        used_docs = tldr_collection.find({"posted": True}, {"_id": 0, "subtopic": 1})
-        used_topics = [doc.get("subtopic") for doc in used_docs if doc.get("subtopic")]
-        return {"topics": used_topics}
+        return json_with_etag(request, NewsService.list_topics(True, limit, cursor, since, until, prefix))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching used topics: {e}")
 
+def require_tldr_collection():
+    """TLDR news collection, or a 503 while MongoDB is unavailable"""
+    tldr_collection = get_tldr_collection()
+    if tldr_collection is None:
+        raise HTTPException(status_code=503, detail="MongoDB is unavailable.")
+    return tldr_collection
+
 @router.post("/mark-topic-posted")
 async def mark_topic_posted(request: Request):
     """Mark a topic as posted in the database."""
@@ -222,8 +500,10 @@ async def mark_topic_posted(request: Request):
         if not topic:
             raise HTTPException(status_code=400, detail="No topic provided.")
         # Set 'posted' to True for all docs containing this subtopic (use 'subtopic' field)
-        tldr_collection.update_many({"subtopic": topic}, {"$set": {"posted": True}})
+        require_tldr_collection().update_many({"subtopic": topic}, {"$set": {"posted": True}})
         return {"status": "success"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error marking topic as posted: {e}")
 
@@ -241,8 +521,10 @@ async def save_generated_post(request: Request):
         update_fields = {"generated_post": post}
         if linkedin_post_url:
             update_fields["linkedin_post_url"] = linkedin_post_url
-        tldr_collection.update_many({"subtopic": topic}, {"$set": update_fields})
+        require_tldr_collection().update_many({"subtopic": topic}, {"$set": update_fields})
         return {"status": "success"}
+    except HTTPException:
+        raise
     except Exception as e:
         print('Error in /save-generated-post:', traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error saving generated post: {e}")
@@ -251,6 +533,9 @@ async def save_generated_post(request: Request):
 @router.get("/get-generated-post/{topic}")
 def get_generated_post(topic: str):
     """Get the generated post for a topic from MongoDB."""
+    tldr_collection = get_tldr_collection()
+    if tldr_collection is None:
+        return {"post": None, "linkedin_post_url": None}
     try:
         doc = tldr_collection.find_one({"subtopic": topic}, {"_id": 0, "generated_post": 1, "linkedin_post_url": 1})
         return {
@@ -0,0 +1,432 @@
+"""
+Persistent storage for scheduled LinkedIn posts
+"""
+import json
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from config import Config
+import database
+
+def normalize_scheduled_time(value: str) -> str:
+    """Parse an ISO-8601 time and return it as a UTC ISO string; naive times are taken as UTC"""
+    if not value:
+        raise ValueError("scheduled_time is required")
+    text = value.strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"Invalid scheduled_time: {value!r}. Use ISO-8601, e.g. 2025-01-31T09:00:00Z")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+def utc_now_iso(delay_seconds: float = 0) -> str:
+    """Current UTC time, or that many seconds from now, in the same format as normalized scheduled times"""
+    return (datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)).isoformat(timespec="seconds")
+
+# LinkedIn may have created the post before the process died, so it is not retried automatically
+STALE_CLAIM_ERROR = "Publishing was interrupted; check LinkedIn before rescheduling"
+
+def new_post_id() -> str:
+    """Collision-free scheduled post ID"""
+    return f"scheduled_{uuid.uuid4().hex}"
+
+class ScheduledPostStore(ABC):
+    """Interface for scheduled post persistence.
+
+    Posts move pending -> posting -> posted/failed. A post is claimed (moved to
+    posting) before it is published, so a crash mid-publish never re-posts it;
+    a claim left behind by a crash is later marked failed instead.
+    Pending posts can be rescheduled or cancelled.
+    """
+
+    @abstractmethod
+    def add(self, post_data: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_many(self, posts: List[Dict[str, Any]]) -> List[str]:
+        """Add posts all together or not at all; fills in each one's ID, status and UTC scheduled_time"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def reschedule_many(self, times: Dict[str, str]) -> Dict[str, str]:
+        """Move pending posts to new normalized times; returns the status of every post found"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def cancel_many(self, post_ids: List[str]) -> Dict[str, str]:
+        """Cancel pending posts; returns every found post's status before the call, so exactly
+        the posts reported pending were cancelled by it"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def news_topics(self, post_ids: List[str]) -> List[str]:
+        """News topics the given posts were scheduled for"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_all(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_due(self, now_iso: str, limit: int = 100) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_pending(self, due_before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """IDs and times of pending posts, optionally only those due at or before a normalized time"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, post_id: str, now_iso: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Move a pending post to posting; with `now_iso`, only if it is due by then (it may have been rescheduled)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def release(self, post_id: str, scheduled_time: str, reason: str) -> None:
+        """Put a claimed post back to pending at a normalized time, e.g. after it was rate limited"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def fail_stale_claims(self, claimed_before: str) -> List[str]:
+        """Mark failed the posts claimed before a normalized time and never finished; returns their IDs"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def mark_posted(self, post_id: str, result: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def mark_failed(self, post_id: str, error: str) -> None:
+        raise NotImplementedError
+
+    @staticmethod
+    def _new_record(post_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in ID, status and normalized time for a new scheduled post"""
+        record = dict(post_data)
+        record["id"] = new_post_id()
+        record["status"] = "pending"
+        record["scheduled_time"] = normalize_scheduled_time(record.get("scheduled_time"))
+        record["created_at"] = utc_now_iso()
+        return record
+
+class SQLiteScheduledPostStore(ScheduledPostStore):
+    """Scheduled posts in a local SQLite file"""
+
+    COLUMNS = ("id", "content", "scheduled_time", "content_type", "status",
+               "created_at", "posted_at", "linkedin_result", "error", "news_topic", "claimed_at")
+
+    def __init__(self, path: Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS scheduled_posts ("
+                "id TEXT PRIMARY KEY, content TEXT NOT NULL, scheduled_time TEXT NOT NULL, "
+                "content_type TEXT, status TEXT NOT NULL, created_at TEXT NOT NULL, "
+                "posted_at TEXT, linkedin_result TEXT, error TEXT, news_topic TEXT, claimed_at TEXT)"
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(scheduled_posts)")}
+            for column in ("news_topic", "claimed_at"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE scheduled_posts ADD COLUMN {column} TEXT")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_status_scheduled_time "
+                "ON scheduled_posts (status, scheduled_time)"
+            )
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        post = {key: row[key] for key in self.COLUMNS if row[key] is not None}
+        if "linkedin_result" in post:
+            post["linkedin_result"] = json.loads(post["linkedin_result"])
+        return post
+
+    def add(self, post_data: Dict[str, Any]) -> str:
+        record = self._new_record(post_data)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO scheduled_posts (id, content, scheduled_time, content_type, status, created_at, news_topic) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (record["id"], record["content"], record["scheduled_time"],
+                 record.get("content_type"), record["status"], record["created_at"], record.get("news_topic"))
+            )
+        post_data.update(record)
+        return record["id"]
+
+    def add_many(self, posts: List[Dict[str, Any]]) -> List[str]:
+        records = [self._new_record(post_data) for post_data in posts]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO scheduled_posts (id, content, scheduled_time, content_type, status, created_at, news_topic) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(record["id"], record["content"], record["scheduled_time"], record.get("content_type"),
+                  record["status"], record["created_at"], record.get("news_topic")) for record in records]
+            )
+        for post_data, record in zip(posts, records):
+            post_data.update(record)
+        return [record["id"] for record in records]
+
+    def _statuses(self, post_ids: List[str]) -> Dict[str, str]:
+        statuses = {}
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(post_ids), 500):
+            chunk = post_ids[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT id, status FROM scheduled_posts WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            statuses.update((row["id"], row["status"]) for row in rows)
+        return statuses
+
+    def reschedule_many(self, times: Dict[str, str]) -> Dict[str, str]:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE scheduled_posts SET scheduled_time = ? WHERE id = ? AND status = 'pending'",
+                [(scheduled_time, post_id) for post_id, scheduled_time in times.items()]
+            )
+            return self._statuses(list(times))
+
+    def cancel_many(self, post_ids: List[str]) -> Dict[str, str]:
+        with self._lock, self._conn:
+            statuses = self._statuses(list(post_ids))
+            self._conn.executemany(
+                "UPDATE scheduled_posts SET status = 'cancelled' WHERE id = ? AND status = 'pending'",
+                [(post_id,) for post_id, status in statuses.items() if status == "pending"]
+            )
+            return statuses
+
+    def news_topics(self, post_ids: List[str]) -> List[str]:
+        topics = []
+        with self._lock:
+            for start in range(0, len(post_ids), 500):
+                chunk = post_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT news_topic FROM scheduled_posts WHERE id IN ({','.join('?' * len(chunk))}) "
+                    "AND news_topic IS NOT NULL", chunk
+                ).fetchall()
+                topics.extend(row["news_topic"] for row in rows)
+        return topics
+
+    def list_all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM scheduled_posts ORDER BY scheduled_time").fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def get_due(self, now_iso: str, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM scheduled_posts WHERE status = 'pending' AND scheduled_time <= ? "
+                "ORDER BY scheduled_time LIMIT ?",
+                (now_iso, limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def list_pending(self, due_before: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, scheduled_time FROM scheduled_posts "
+                "WHERE status = 'pending' AND (? IS NULL OR scheduled_time <= ?) ORDER BY scheduled_time",
+                (due_before, due_before)
+            ).fetchall()
+        return [{"id": row["id"], "scheduled_time": row["scheduled_time"]} for row in rows]
+
+    def claim(self, post_id: str, now_iso: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        with self._lock, self._conn:
+            claimed = self._conn.execute(
+                "UPDATE scheduled_posts SET status = 'posting', claimed_at = ? "
+                "WHERE id = ? AND status = 'pending' AND (? IS NULL OR scheduled_time <= ?)",
+                (utc_now_iso(), post_id, now_iso, now_iso)
+            ).rowcount
+            if not claimed:
+                return None
+            row = self._conn.execute("SELECT * FROM scheduled_posts WHERE id = ?", (post_id,)).fetchone()
+        return self._to_dict(row)
+
+    def release(self, post_id: str, scheduled_time: str, reason: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE scheduled_posts SET status = 'pending', scheduled_time = ?, error = ? "
+                "WHERE id = ? AND status = 'posting'",
+                (scheduled_time, reason, post_id)
+            )
+
+    def fail_stale_claims(self, claimed_before: str) -> List[str]:
+        with self._lock, self._conn:
+            # Claims from before claimed_at was recorded are stale too
+            stale = "status = 'posting' AND (claimed_at IS NULL OR claimed_at < ?)"
+            rows = self._conn.execute(f"SELECT id FROM scheduled_posts WHERE {stale}", (claimed_before,)).fetchall()
+            self._conn.execute(
+                f"UPDATE scheduled_posts SET status = 'failed', error = ? WHERE {stale}",
+                (STALE_CLAIM_ERROR, claimed_before)
+            )
+        return [row["id"] for row in rows]
+
+    def mark_posted(self, post_id: str, result: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE scheduled_posts SET status = 'posted', posted_at = ?, linkedin_result = ?, error = NULL "
+                "WHERE id = ?",
+                (utc_now_iso(), json.dumps(result, default=str), post_id)
+            )
+
+    def mark_failed(self, post_id: str, error: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE scheduled_posts SET status = 'failed', error = ? WHERE id = ?",
+                (error, post_id)
+            )
+
+class MongoScheduledPostStore(ScheduledPostStore):
+    """Scheduled posts in the scheduled_posts MongoDB collection"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        try:
+            self._collection.create_index(
+                [("status", ASCENDING), ("scheduled_time", ASCENDING)], name="status_scheduled_time"
+            )
+        except PyMongoError as e:
+            print(f"Warning: could not create scheduled_posts index: {e}")
+
+    @staticmethod
+    def _to_dict(doc: Dict[str, Any]) -> Dict[str, Any]:
+        doc["id"] = doc.pop("_id")
+        return doc
+
+    def add(self, post_data: Dict[str, Any]) -> str:
+        record = self._new_record(post_data)
+        doc = dict(record)
+        doc["_id"] = doc.pop("id")
+        self._collection.insert_one(doc)
+        post_data.update(record)
+        return record["id"]
+
+    def add_many(self, posts: List[Dict[str, Any]]) -> List[str]:
+        records = [self._new_record(post_data) for post_data in posts]
+        docs = [dict(record, _id=record["id"]) for record in records]
+        for doc in docs:
+            del doc["id"]
+        try:
+            self._collection.insert_many(docs, ordered=True)
+        except PyMongoError as e:
+            # Transactions need a replica set; undo a partial insert instead so the batch stays all-or-nothing
+            post_ids = [doc["_id"] for doc in docs]
+            try:
+                self._collection.delete_many({"_id": {"$in": post_ids}})
+            except PyMongoError as undo_error:
+                # An ordered insert stops at the first error, so only the leading documents can exist
+                if isinstance(e, BulkWriteError):
+                    post_ids = post_ids[:e.details.get("nInserted", len(post_ids))]
+                print(f"Error undoing a partial scheduled post batch, {len(post_ids)} posts may remain: "
+                      f"{undo_error} | IDs: {post_ids}")
+            raise
+        for post_data, record in zip(posts, records):
+            post_data.update(record)
+        return [record["id"] for record in records]
+
+    def _statuses(self, post_ids: List[str]) -> Dict[str, str]:
+        cursor = self._collection.find({"_id": {"$in": post_ids}}, {"_id": 1, "status": 1})
+        return {doc["_id"]: doc["status"] for doc in cursor}
+
+    def reschedule_many(self, times: Dict[str, str]) -> Dict[str, str]:
+        if times:
+            self._collection.bulk_write([
+                UpdateOne({"_id": post_id, "status": "pending"}, {"$set": {"scheduled_time": scheduled_time}})
+                for post_id, scheduled_time in times.items()
+            ], ordered=False)
+        return self._statuses(list(times))
+
+    def cancel_many(self, post_ids: List[str]) -> Dict[str, str]:
+        statuses = self._statuses(list(post_ids))
+        pending = [post_id for post_id, status in statuses.items() if status == "pending"]
+        if pending:
+            self._collection.update_many(
+                {"_id": {"$in": pending}, "status": "pending"}, {"$set": {"status": "cancelled"}}
+            )
+            # A post claimed between the read and the update was not cancelled here
+            for post_id, status in self._statuses(pending).items():
+                if status != "cancelled":
+                    statuses[post_id] = status
+        return statuses
+
+    def news_topics(self, post_ids: List[str]) -> List[str]:
+        cursor = self._collection.find(
+            {"_id": {"$in": list(post_ids)}, "news_topic": {"$ne": None}}, {"_id": 0, "news_topic": 1}
+        )
+        return [doc["news_topic"] for doc in cursor]
+
+    def list_all(self) -> List[Dict[str, Any]]:
+        return [self._to_dict(doc) for doc in self._collection.find({}).sort("scheduled_time", ASCENDING)]
+
+    def get_due(self, now_iso: str, limit: int = 100) -> List[Dict[str, Any]]:
+        cursor = self._collection.find(
+            {"status": "pending", "scheduled_time": {"$lte": now_iso}}
+        ).sort("scheduled_time", ASCENDING).limit(limit)
+        return [self._to_dict(doc) for doc in cursor]
+
+    def list_pending(self, due_before: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = {"status": "pending"}
+        if due_before is not None:
+            query["scheduled_time"] = {"$lte": due_before}
+        cursor = self._collection.find(query, {"_id": 1, "scheduled_time": 1}).sort("scheduled_time", ASCENDING)
+        return [self._to_dict(doc) for doc in cursor]
+
+    def claim(self, post_id: str, now_iso: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        query = {"_id": post_id, "status": "pending"}
+        if now_iso is not None:
+            query["scheduled_time"] = {"$lte": now_iso}
+        doc = self._collection.find_one_and_update(
+            query,
+            {"$set": {"status": "posting", "claimed_at": utc_now_iso()}},
+            return_document=ReturnDocument.AFTER
+        )
+        return self._to_dict(doc) if doc else None
+
+    def release(self, post_id: str, scheduled_time: str, reason: str) -> None:
+        self._collection.update_one(
+            {"_id": post_id, "status": "posting"},
+            {"$set": {"status": "pending", "scheduled_time": scheduled_time, "error": reason}}
+        )
+
+    def fail_stale_claims(self, claimed_before: str) -> List[str]:
+        # Claims from before claimed_at was recorded are stale too
+        query = {"status": "posting", "$or": [{"claimed_at": {"$lt": claimed_before}}, {"claimed_at": None}]}
+        post_ids = [doc["_id"] for doc in self._collection.find(query, {"_id": 1})]
+        if post_ids:
+            self._collection.update_many(
+                dict(query, _id={"$in": post_ids}), {"$set": {"status": "failed", "error": STALE_CLAIM_ERROR}}
+            )
+        return post_ids
+
+    def mark_posted(self, post_id: str, result: Dict[str, Any]) -> None:
+        self._collection.update_one(
+            {"_id": post_id},
+            {"$set": {"status": "posted", "posted_at": utc_now_iso(), "linkedin_result": result},
+             "$unset": {"error": ""}}
+        )
+
+    def mark_failed(self, post_id: str, error: str) -> None:
+        self._collection.update_one({"_id": post_id}, {"$set": {"status": "failed", "error": error}})
+
+def create_scheduled_post_store() -> ScheduledPostStore:
+    """Pick the scheduled post backend from SCHEDULED_POSTS_BACKEND.
+
+    "auto" uses MongoDB when a MongoDB URI is configured and SQLite otherwise,
+    so the choice never waits on a network round trip.
+    """
+    backend = Config.SCHEDULED_POSTS_BACKEND
+    if backend == "mongo" or (backend == "auto" and Config.MONGODB_URI):
+        return MongoScheduledPostStore(database.get_db()["scheduled_posts"])
+    return SQLiteScheduledPostStore(Config.SCHEDULED_POSTS_DB)
@@ -1,39 +1,290 @@
 """
 Background scheduler for posting scheduled LinkedIn posts.
+
+Pending posts sit in a min-heap keyed on their UTC due time. The scheduler
+thread sleeps until the earliest one is due (or until an earlier post is
+added) and hands due posts to a worker pool for publishing. The process
+that holds the scheduler lease also re-reads pending posts from the store
+periodically, picking up posts scheduled through other workers, and polls
+more often for just the posts due before the next full re-read.
 """
+import heapq
+import itertools
+import os
 import threading
 import time
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Any, List, Optional
 
+from config import Config
 from data_manager import data_manager
-import os
-from services import post_to_linkedin
-
-def process_scheduled_posts():
-    while True:
-        now = datetime.now(timezone.utc)
-        for post in data_manager.get_scheduled_posts():
-            if post.get("status") == "pending":
-                scheduled_time = post.get("scheduled_time")
-                if scheduled_time:
-                    try:
-                        scheduled_dt = datetime.fromisoformat(scheduled_time)
-                    except Exception:
-                        continue
-                    if scheduled_dt <= now:
-                        # --- Call real LinkedIn posting logic ---
-                        access_token = os.environ.get("LINKEDIN_ACCESS_TOKEN")
-                        user_id = os.environ.get("LINKEDIN_USER_ID")
-                        if not access_token or not user_id:
-                            print("[Scheduler] Missing LinkedIn access token or user id in environment.")
-                            continue
-                        result = post_to_linkedin(post["content"], access_token, user_id)
-                        print(f"[Scheduler] Posted scheduled post: {post['id']} at {now.isoformat()} | Result: {result}")
-                        post["status"] = "posted"
-                        post["posted_at"] = now.isoformat()
-                        post["linkedin_result"] = result
-        time.sleep(60)  # Check every minute
-
-# Start the scheduler in a background thread
-scheduler_thread = threading.Thread(target=process_scheduled_posts, daemon=True)
-scheduler_thread.start()
+from linkedin_client import linkedin_client
+from metrics import SCHEDULER_LAG, SCHEDULER_QUEUE_DEPTH
+from scheduled_post_store import utc_now_iso
+
+# Seconds to wait before retrying a post that could not be published yet
+MISSING_CREDENTIALS_RETRY_SECONDS = 60
+
+class SchedulerEngine:
+    """Dispatches scheduled posts at their due time"""
+
+    def __init__(self, dispatch: Callable[[str], Optional[float]], clock: Callable[[], float] = time.time,
+                 workers: int = 4):
+        self.dispatch = dispatch
+        self.clock = clock
+        self._heap = []
+        # Due timestamp of each queued post, so reloading from the store does not queue a post twice.
+        # Heap entries whose timestamp no longer matches were rescheduled or removed and are skipped.
+        self._queued: Dict[str, float] = {}
+        # Retry time of each post re-queued by a publish that asked to be retried; reloads do not move it earlier
+        self._not_before: Dict[str, float] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self.workers = workers
+        self._executor = None
+        self._thread = None
+        self._stopped = False
+
+    @staticmethod
+    def due_timestamp(scheduled_time: str) -> float:
+        """Convert a normalized UTC ISO time to an epoch timestamp"""
+        return datetime.fromisoformat(scheduled_time).timestamp()
+
+    def add(self, post_id: str, scheduled_time: str) -> None:
+        """Queue a post; wakes the scheduler if it is now the earliest"""
+        self.add_at(post_id, self.due_timestamp(scheduled_time))
+
+    def add_at(self, post_id: str, due_ts: float, replace: bool = False) -> None:
+        """Queue a post at an epoch timestamp; with `replace`, move an already queued post"""
+        with self._condition:
+            if post_id in self._queued and (not replace or self._queued[post_id] == due_ts):
+                return
+            self._queued[post_id] = due_ts
+            heapq.heappush(self._heap, (due_ts, next(self._sequence), post_id))
+            if self._heap[0][2] == post_id:
+                self._condition.notify()
+
+    def reschedule(self, post_id: str, scheduled_time: str) -> None:
+        """Move a post to a new time, queueing it if it was not queued"""
+        with self._condition:
+            self._not_before.pop(post_id, None)
+        self.add_at(post_id, self.due_timestamp(scheduled_time), replace=True)
+
+    def retry_at(self, post_id: str, due_ts: float) -> None:
+        """Re-queue a post that could not be published yet; reloading from the store does not move it earlier"""
+        with self._condition:
+            self._not_before[post_id] = due_ts
+        self.add_at(post_id, due_ts, replace=True)
+
+    def remove(self, post_id: str) -> None:
+        """Stop dispatching a post; its heap entry is skipped when it comes up"""
+        with self._condition:
+            self._queued.pop(post_id, None)
+            self._not_before.pop(post_id, None)
+
+    def _drop_stale(self) -> None:
+        """Pop rescheduled or removed entries off the top, and rebuild the heap if they pile up"""
+        while self._heap and self._queued.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if len(self._heap) > 2 * len(self._queued) + 64:
+            self._heap = [entry for entry in self._heap if self._queued.get(entry[2]) == entry[0]]
+            heapq.heapify(self._heap)
+
+    def load_pending(self, posts: List[Dict[str, Any]]) -> None:
+        """Bulk-load pending posts, e.g. from the store at startup; the store's time wins for queued posts,
+        except that a post waiting to be retried is not moved before its retry time"""
+        with self._condition:
+            added = False
+            for post in posts:
+                due_ts = max(self.due_timestamp(post["scheduled_time"]), self._not_before.get(post["id"], 0.0))
+                if self._queued.get(post["id"]) == due_ts:
+                    continue
+                self._queued[post["id"]] = due_ts
+                self._heap.append((due_ts, next(self._sequence), post["id"]))
+                added = True
+            if added:
+                heapq.heapify(self._heap)
+                self._condition.notify()
+
+    def pop_due(self, now: float = None) -> List[str]:
+        """Remove and return the IDs of every post due at or before now"""
+        now = self.clock() if now is None else now
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                due_ts, _, post_id = heapq.heappop(self._heap)
+                if self._queued.get(post_id) != due_ts:
+                    continue
+                del self._queued[post_id]
+                self._not_before.pop(post_id, None)
+                due.append(post_id)
+        return due
+
+    def seconds_until_next(self, now: float = None) -> Optional[float]:
+        """Seconds until the earliest queued post is due, or None if the queue is empty"""
+        now = self.clock() if now is None else now
+        with self._condition:
+            self._drop_stale()
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - now)
+
+    def queue_depth(self) -> int:
+        """Number of posts waiting in the heap"""
+        with self._condition:
+            return len(self._queued)
+
+    def is_running(self) -> bool:
+        """Whether the scheduler thread is running in this process"""
+        return self._thread is not None and not self._stopped
+
+    def _publish(self, post_id: str) -> None:
+        """Run the dispatch callable in a worker, re-queueing posts that ask to be retried"""
+        try:
+            retry_after = self.dispatch(post_id)
+        except Exception as e:
+            print(f"[Scheduler] Error dispatching scheduled post {post_id}: {e}")
+            return
+        if retry_after is not None:
+            self.retry_at(post_id, self.clock() + retry_after)
+
+    def run(self) -> None:
+        """Scheduler loop: sleep until the next due post, then hand due posts to the worker pool"""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    self._drop_stale()
+                    if self._heap and self._heap[0][0] <= self.clock():
+                        break
+                    timeout = self._heap[0][0] - self.clock() if self._heap else None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+            for post_id in self.pop_due():
+                self._executor.submit(self._publish, post_id)
+
+    def start(self) -> None:
+        """Start the scheduler thread"""
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scheduler-worker")
+        self._thread = threading.Thread(target=self.run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the scheduler thread and wait for in-flight publishes"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._condition:
+            self._heap.clear()
+            self._queued.clear()
+            self._not_before.clear()
+
+def publish_scheduled_post(post_id: str) -> Optional[float]:
+    """Publish one due post; returns a retry delay in seconds when it cannot be published yet"""
+    store = data_manager.scheduled_posts
+    # Claim before publishing so a post is never published twice, and only once it is due:
+    # it may have been rescheduled through another worker since it was queued here
+    post = store.claim(post_id, utc_now_iso())
+    if not post:
+        return None
+    # --- Call real LinkedIn posting logic ---
+    access_token = os.environ.get("LINKEDIN_ACCESS_TOKEN")
+    user_id = os.environ.get("LINKEDIN_USER_ID")
+    if not access_token or not user_id:
+        # Saved with the post, so no worker picks it up again before the retry
+        store.release(post_id, utc_now_iso(MISSING_CREDENTIALS_RETRY_SECONDS), "Missing LinkedIn credentials")
+        print("[Scheduler] Missing LinkedIn access token or user id in environment.")
+        return MISSING_CREDENTIALS_RETRY_SECONDS
+    try:
+        result = linkedin_client.create_post(post["content"], access_token, user_id)
+    except Exception as e:
+        store.mark_failed(post_id, str(e))
+        print(f"[Scheduler] Failed to post scheduled post {post_id}: {e}")
+        return None
+    if result.get("status") == 429 and result.get("retryAfter") is not None:
+        # Rate limited before LinkedIn created the post: put it back until it may be retried
+        retry_after = max(1.0, float(result["retryAfter"]))
+        store.release(post_id, utc_now_iso(retry_after), f"Rate limited: {result.get('data')}")
+        print(f"[Scheduler] Scheduled post {post_id} rate limited, retrying in {retry_after}s")
+        return retry_after
+    if not result.get("ok"):
+        store.mark_failed(post_id, f"LinkedIn returned {result.get('status')}: {result.get('data')}")
+        print(f"[Scheduler] LinkedIn rejected scheduled post {post_id} | Result: {result}")
+        return None
+    store.mark_posted(post_id, result)
+    if data_manager.record_published_post(user_id, result.get("postIdHeader") or post_id, post["content"], utc_now_iso()):
+        # Imported here so NumPy stays off the startup path
+        from analytics_engine import analytics_engine
+        analytics_engine.invalidate(user_id)
+    SCHEDULER_LAG.observe(max(0.0, time.time() - SchedulerEngine.due_timestamp(post["scheduled_time"])))
+    print(f"[Scheduler] Posted scheduled post: {post_id} at {utc_now_iso()} | Result: {result}")
+    return None
+
+scheduler_engine = SchedulerEngine(publish_scheduled_post, workers=Config.SCHEDULER_WORKERS)
+SCHEDULER_QUEUE_DEPTH.set_function(scheduler_engine.queue_depth)
+
+_resync_stop = threading.Event()
+_resync_thread = None
+
+def fail_stale_claims() -> None:
+    """Mark failed the posts whose publish never finished, e.g. because the worker died mid-publish"""
+    stale = data_manager.scheduled_posts.fail_stale_claims(utc_now_iso(-Config.SCHEDULER_STALE_CLAIM_SECONDS))
+    if stale:
+        print(f"[Scheduler] Marked {len(stale)} interrupted scheduled posts as failed: {stale}")
+
+def resync_pending(stop_event: threading.Event, interval: float, poll_interval: float = 0) -> None:
+    """Load pending posts from the store now and then every interval, until stopped.
+
+    Each full load first marks failed the posts left in posting for longer than
+    SCHEDULER_STALE_CLAIM_SECONDS.
+
+    With a poll interval, posts due before the next full load are also loaded
+    that often, so a post scheduled through another worker is not held up
+    until then. That query only reads the (status, scheduled_time) index range.
+    """
+    poll_interval = min(poll_interval, interval) if poll_interval > 0 else interval
+    next_full_load = 0.0
+    while not stop_event.is_set():
+        now = time.time()
+        try:
+            if now >= next_full_load:
+                fail_stale_claims()
+                scheduler_engine.load_pending(data_manager.scheduled_posts.list_pending())
+                next_full_load = now + interval
+            else:
+                scheduler_engine.load_pending(data_manager.scheduled_posts.list_pending(utc_now_iso(interval)))
+        except Exception as e:
+            if stop_event.is_set():
+                return
+            print(f"[Scheduler] Could not load pending posts, retrying in {poll_interval}s: {e}")
+        stop_event.wait(poll_interval)
+
+def start_scheduler(resync_seconds: float = None, poll_seconds: float = None) -> None:
+    """Start the scheduler thread and keep it in sync with pending posts in the store"""
+    global _resync_thread
+    scheduler_engine.start()
+    _resync_stop.clear()
+    _resync_thread = threading.Thread(
+        target=resync_pending,
+        args=(_resync_stop, resync_seconds or Config.SCHEDULER_RESYNC_SECONDS,
+              Config.SCHEDULER_POLL_SECONDS if poll_seconds is None else poll_seconds),
+        name="scheduler-resync", daemon=True
+    )
+    _resync_thread.start()
+
+def stop_scheduler() -> None:
+    """Stop the scheduler thread and wait for in-flight publishes"""
+    global _resync_thread
+    _resync_stop.set()
+    if _resync_thread is not None:
+        _resync_thread.join(timeout=2)
+        _resync_thread = None
+    scheduler_engine.stop()
@@ -1,15 +1,54 @@
 """
 Service layer for business logic
 """
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 from data_manager import data_manager
-from ai_service import ai_service
-import os
-import requests
+from scheduler import scheduler_engine
+from ai_service import ai_service, fetch_non_posted_topics, mark_topics_as_posted, unmark_topics_as_posted
+from database import get_tldr_collection
+from concurrency import QueueFullError
+from usage_tracker import BudgetExceededError
+from tenant_store import UnknownMemberError
+from config import Config
+from pymongo import UpdateMany
+from starlette.concurrency import run_in_threadpool
+from linkedin_client import linkedin_client
+from singleflight import SingleFlight
+from topic_pages import as_utc, build_query, fetch_page
+from scheduled_post_store import normalize_scheduled_time
 
 class ProfileService:
     """Handles user profile analysis and recommendations"""
+
+    @staticmethod
+    def get_member_profile(member_id: str) -> Dict[str, Any]:
+        """Stored profile and content strategies for a LinkedIn member"""
+        data_manager.tenants.require_member(member_id)
+        return {
+            "member_id": member_id,
+            "profile": data_manager.tenants.get_profile(member_id),
+            "content_strategies": data_manager.tenants.get_strategies(member_id),
+        }
+
+    @staticmethod
+    def save_member_profile(member_id: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+        data_manager.tenants.put_profile(member_id, profile)
+        return {"message": "Profile saved", "member_id": member_id}
+
+    @staticmethod
+    def save_member_strategies(member_id: str, strategies: Dict[str, Any]) -> Dict[str, Any]:
+        data_manager.tenants.put_strategies(member_id, strategies)
+        return {"message": "Content strategies saved", "member_id": member_id}
+
+    @staticmethod
+    def record_member_post(member_id: str, post: Dict[str, Any]) -> Dict[str, Any]:
+        # Imported here so NumPy stays off the startup path
+        from analytics_engine import analytics_engine
+        data_manager.tenants.record_post(member_id, post)
+        analytics_engine.invalidate(member_id)
+        return {"message": "Post analytics recorded", "member_id": member_id, "post_id": post["id"]}
     
     @staticmethod
     def get_profile_analysis() -> Dict[str, Any]:
@@ -77,22 +116,95 @@ class ContentService:
         }
     
     @staticmethod
-    def generate_content_calendar(days: int, content_types: List[str]) -> Dict[str, Any]:
-        """Generate a content calendar"""
-        calendar = []
-        for i in range(days):
-            date = datetime.now() + timedelta(days=i)
-            content_type = content_types[i % len(content_types)]
-            
-            calendar.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "content_type": content_type,
-                "suggested_topic": f"Topic for {content_type} on {date.strftime('%A')}",
-                "optimal_time": "1:00 PM PST",
-                "hashtags": ["#TechLeadership", "#AI", "#SoftwareEngineering"]
-            })
-        
-        return {"calendar": calendar, "total_days": days}
+    def calendar_news_topics(limit: int) -> List[Tuple[str, float]]:
+        """Newest non-posted subtopics with their age in days"""
+        tldr_collection = get_tldr_collection()
+        if tldr_collection is None:
+            return []
+        try:
+            docs, _ = fetch_page(
+                tldr_collection, {"posted": {"$in": [False, None]}, "duplicate_of": None},
+                {"_id": 1, "subtopic": 1}, limit
+            )
+        except Exception as e:
+            print(f"[Calendar] Could not fetch news topics: {e}")
+            return []
+        now = datetime.now(timezone.utc)
+        return [
+            (doc["subtopic"], max(0.0, (now - as_utc(doc["published_at"])).total_seconds() / 86400)
+             if doc.get("published_at") else 0.0)
+            for doc in docs if doc.get("subtopic")
+        ]
+
+    @staticmethod
+    def plan_content_calendar(days: int, content_types: Optional[List[str]] = None, member_id: Optional[str] = None,
+                              start_date: Optional[date] = None) -> Dict[str, Any]:
+        """Plan a content calendar from the member's strategies, engagement by hour and unused news topics"""
+        from analytics_engine import analytics_engine
+        from calendar_engine import DEFAULT_HASHTAGS, build_calendar, slot_scores
+        if not 1 <= days <= Config.CALENDAR_MAX_DAYS:
+            raise ValueError(f"days must be between 1 and {Config.CALENDAR_MAX_DAYS}")
+        strategies = data_manager.get_content_strategies(member_id) or {}
+        content_types = content_types or list(strategies) or ["thought_leadership", "educational", "engagement"]
+        frame = analytics_engine.frame(member_id)
+        overall_metrics = data_manager.get_post_analytics(member_id).get("overall_metrics", {})
+        now = datetime.now(timezone.utc)
+        calendar = build_calendar(
+            days, content_types, strategies,
+            slot_scores(frame.weekdays, frame.hours, frame.engagement),
+            ContentService.calendar_news_topics(Config.CALENDAR_NEWS_TOPICS),
+            overall_metrics.get("top_performing_hashtags") or DEFAULT_HASHTAGS,
+            start_date or now.date(),
+            # Leave an hour to review or generate the first post
+            not_before=now + timedelta(hours=1),
+            max_per_day=Config.CALENDAR_MAX_POSTS_PER_DAY,
+            min_gap_hours=Config.CALENDAR_MIN_GAP_HOURS,
+            half_life_days=Config.CALENDAR_NEWS_HALF_LIFE_DAYS,
+        )
+        calendar["history_posts"] = len(frame)
+        return calendar
+
+    @staticmethod
+    async def generate_calendar_posts(items: List[Dict[str, Any]], member_id: Optional[str] = None,
+                                      max_concurrency: int = None, bypass_cache: bool = False,
+                                      refresh_cache: bool = False) -> Dict[str, int]:
+        """Generate the post of every calendar item concurrently, setting `post` or `error` on each"""
+        user_profile = await ContentService.load_user_profile(member_id)
+        concurrency = min(
+            max(1, max_concurrency or Config.BATCH_GENERATION_CONCURRENCY),
+            Config.BATCH_GENERATION_CONCURRENCY
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def generate(item: Dict[str, Any]) -> bool:
+            async with semaphore:
+                try:
+                    item["post"] = await ai_service.generate_personalized_post(
+                        item["suggested_topic"], item["content_type"], user_profile,
+                        bypass_cache=bypass_cache, refresh_cache=refresh_cache, member_id=member_id
+                    )
+                    return True
+                except Exception as e:
+                    item["error"] = str(e) or type(e).__name__
+                    return False
+
+        results = await asyncio.gather(*(generate(item) for item in items))
+        return {"succeeded": sum(results), "failed": len(results) - sum(results)}
+
+    @staticmethod
+    async def generate_content_calendar(days: int, content_types: Optional[List[str]] = None,
+                                        member_id: Optional[str] = None, start_date: Optional[date] = None,
+                                        generate_posts: bool = False, max_concurrency: int = None,
+                                        bypass_cache: bool = False, refresh_cache: bool = False) -> Dict[str, Any]:
+        """Generate a content calendar, optionally with every post written"""
+        calendar = await run_in_threadpool(
+            ContentService.plan_content_calendar, days, content_types, member_id, start_date
+        )
+        if generate_posts:
+            calendar["generation"] = await ContentService.generate_calendar_posts(
+                calendar["calendar"], member_id, max_concurrency, bypass_cache, refresh_cache
+            )
+        return calendar
     
     @staticmethod
     def generate_basic_post(role: str, industry: str) -> Dict[str, Any]:
@@ -104,31 +216,68 @@ class ContentService:
             raise Exception(f"Failed to generate post: {str(e)}")
     
     @staticmethod
-    def generate_personalized_content(topic: str, content_type: str) -> Dict[str, Any]:
+    def _personalized_result(post_content: str, topic: str, content_type: str,
+                             user_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the response payload for a personalized post"""
+        return {
+            "post": post_content,
+            "content_type": content_type,
+            "topic": topic,
+            "user_context": {
+                "name": user_profile.get('name'),
+                "headline": user_profile.get('headline'),
+                "industry": user_profile.get('industry')
+            },
+            "status": "success"
+        }
+
+    @staticmethod
+    async def load_user_profile(member_id: Optional[str] = None) -> Dict[str, Any]:
+        """Profile to personalize for; member profiles may need a MongoDB round trip, so read them off the event loop"""
+        if not member_id:
+            return data_manager.get_user_profile()
+        return await run_in_threadpool(data_manager.get_user_profile, member_id)
+
+    @staticmethod
+    async def generate_personalized_content(topic: str, content_type: str, member_id: Optional[str] = None,
+                                            bypass_cache: bool = False, refresh_cache: bool = False) -> Dict[str, Any]:
         """Generate personalized content based on user profile"""
         try:
-            user_profile = data_manager.get_user_profile()
-            post_content = ai_service.generate_personalized_post(topic, content_type, user_profile)
-            
-            return {
-                "post": post_content,
-                "content_type": content_type,
-                "topic": topic,
-                "user_context": {
-                    "name": user_profile.get('name'),
-                    "headline": user_profile.get('headline'),
-                    "industry": user_profile.get('industry')
-                },
-                "status": "success"
-            }
+            user_profile = await ContentService.load_user_profile(member_id)
+            post_content = await ai_service.generate_personalized_post(
+                topic, content_type, user_profile, bypass_cache=bypass_cache, refresh_cache=refresh_cache,
+                member_id=member_id
+            )
+            return ContentService._personalized_result(post_content, topic, content_type, user_profile)
+        except (QueueFullError, BudgetExceededError, UnknownMemberError, asyncio.TimeoutError):
+            raise
         except Exception as e:
             raise Exception(f"Failed to generate personalized content: {str(e)}")
+
+    @staticmethod
+    async def stream_personalized_content(topic: str, content_type: str, member_id: Optional[str] = None,
+                                          bypass_cache: bool = False,
+                                          refresh_cache: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Stream personalized content as chunk events followed by a final done event"""
+        user_profile = await ContentService.load_user_profile(member_id)
+        parts = []
+        async for text in ai_service.stream_personalized_post(
+            topic, content_type, user_profile, bypass_cache=bypass_cache, refresh_cache=refresh_cache,
+            member_id=member_id
+        ):
+            parts.append(text)
+            yield {"event": "chunk", "data": {"text": text}}
+        result = ContentService._personalized_result("".join(parts), topic, content_type, user_profile)
+        yield {"event": "done", "data": result}
     
     @staticmethod
-    def optimize_post(post_content: str) -> Dict[str, Any]:
+    async def optimize_post(post_content: str, bypass_cache: bool = False, refresh_cache: bool = False,
+                            member_id: Optional[str] = None) -> Dict[str, Any]:
         """Analyze and optimize a post for better engagement"""
         try:
-            optimization_analysis = ai_service.optimize_post(post_content)
+            optimization_analysis = await ai_service.optimize_post(
+                post_content, bypass_cache=bypass_cache, refresh_cache=refresh_cache, member_id=member_id
+            )
             
             return {
                 "original_post": post_content,
@@ -141,146 +290,303 @@ class ContentService:
                 ],
                 "best_posting_times": ["9:00 AM", "1:00 PM", "5:00 PM PST"]
             }
+        except (QueueFullError, BudgetExceededError, asyncio.TimeoutError):
+            raise
         except Exception as e:
             raise Exception(f"Failed to optimize post: {str(e)}")
 
+class NewsService:
+    """Handles news-based post generation for TLDR subtopics"""
+
+    # Concurrent requests for the same subtopic share one generation and one update
+    flights = SingleFlight("generate_news_post_route")
+
+    @staticmethod
+    async def generate_news_post(title: str, bypass_cache: bool = False, refresh_cache: bool = False) -> str:
+        """Generate a post for a subtopic and mark the subtopic as posted"""
+        async def generate_and_mark() -> str:
+            post = await ai_service.generate_news_post(
+                title, {}, bypass_cache=bypass_cache, refresh_cache=refresh_cache
+            )
+            # Skipped when MongoDB is unavailable, as for batches
+            await run_in_threadpool(mark_topics_as_posted, [title])
+            return post
+
+        return await NewsService.flights.do(title, generate_and_mark)
+
+    @staticmethod
+    def list_topics(posted: bool, limit: int = None, cursor: Optional[str] = None, since: datetime = None,
+                    until: datetime = None, prefix: Optional[str] = None) -> Dict[str, Any]:
+        """One page of posted or non-posted subtopics, newest first"""
+        limit = min(max(1, limit or Config.TOPICS_PAGE_SIZE), Config.TOPICS_MAX_PAGE_SIZE)
+        tldr_collection = get_tldr_collection()
+        if tldr_collection is None:
+            return {"topics": [], "next_cursor": None}
+        # Point values rather than $ne, so the index returns each posted value already sorted
+        # Near-duplicates stay hidden behind the first subtopic of their story
+        base = {"posted": True} if posted else {"posted": {"$in": [False, None]}, "duplicate_of": None}
+        docs, next_cursor = fetch_page(
+            tldr_collection, build_query(base, since, until, prefix), {"_id": 1, "subtopic": 1}, limit, cursor
+        )
+        return {"topics": [doc["subtopic"] for doc in docs if doc.get("subtopic")], "next_cursor": next_cursor}
+
+    @staticmethod
+    def list_news(limit: int = None, cursor: Optional[str] = None, since: datetime = None,
+                  until: datetime = None, prefix: Optional[str] = None) -> Dict[str, Any]:
+        """One page of stored TLDR items, newest first; `prefix` matches the issue title"""
+        limit = min(max(1, limit or 10), Config.TOPICS_MAX_PAGE_SIZE)
+        tldr_collection = get_tldr_collection()
+        if tldr_collection is None:
+            return {"news": [], "next_cursor": None}
+        projection = {"_id": 1, "title": 1, "subtopic": 1, "link": 1, "published": 1, "posted": 1}
+        docs, next_cursor = fetch_page(
+            tldr_collection, build_query({}, since, until, prefix, prefix_field="title"), projection, limit, cursor
+        )
+        news = []
+        for doc in docs:
+            doc.pop("_id")
+            published_at = as_utc(doc.get("published_at"))
+            doc["published_at"] = published_at.isoformat() if published_at else None
+            news.append(doc)
+        return {"news": news, "next_cursor": next_cursor}
+
+    @staticmethod
+    async def _persist_generated_posts(succeeded: List[Dict[str, Any]]) -> Tuple[int, Optional[str]]:
+        """Store generated posts on their subtopics with one bulk write; returns (modified, error)"""
+        tldr_collection = get_tldr_collection()
+        if not succeeded or tldr_collection is None:
+            return 0, None
+        operations = [
+            UpdateMany(
+                {"subtopic": item["title"]},
+                {"$set": {"generated_post": item["post"], "posted": True}}
+            )
+            for item in succeeded
+        ]
+        try:
+            result = await run_in_threadpool(tldr_collection.bulk_write, operations, ordered=False)
+            return result.modified_count, None
+        except Exception as e:
+            print(f"[NewsService] Could not store {len(succeeded)} generated posts: {e}")
+            return 0, str(e)
+
+    @staticmethod
+    async def generate_news_posts_batch(titles: List[str], all_non_posted: bool = False,
+                                        max_concurrency: int = None, bypass_cache: bool = False,
+                                        refresh_cache: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Generate posts for many subtopics concurrently, yielding each result as it finishes"""
+        if all_non_posted:
+            titles = list(titles or []) + await run_in_threadpool(fetch_non_posted_topics)
+        titles = list(dict.fromkeys(title for title in titles or [] if title))
+        concurrency = min(
+            max(1, max_concurrency or Config.BATCH_GENERATION_CONCURRENCY),
+            Config.BATCH_GENERATION_CONCURRENCY
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def generate(title: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    post = await ai_service.generate_news_post(
+                        title, {}, bypass_cache=bypass_cache, refresh_cache=refresh_cache
+                    )
+                    return {"title": title, "status": "success", "post": post}
+                except Exception as e:
+                    return {"title": title, "status": "error", "detail": str(e) or type(e).__name__}
+
+        succeeded = []
+        failed = 0
+        tasks = [asyncio.ensure_future(generate(title)) for title in titles]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                if item["status"] == "success":
+                    succeeded.append(item)
+                else:
+                    failed += 1
+                yield item
+        finally:
+            # A client that disconnects mid-stream closes the generator: stop spending model
+            # quota on the remaining titles, but keep every post generated so far
+            generated = [
+                task.result() for task in tasks
+                if task.done() and not task.cancelled() and task.result()["status"] == "success"
+            ]
+            for task in tasks:
+                task.cancel()
+            persisted, persist_error = await NewsService._persist_generated_posts(generated)
+        summary = {
+            "total": len(titles),
+            "succeeded": len(succeeded),
+            "failed": failed,
+            "persisted": persisted
+        }
+        if persist_error:
+            summary["persist_error"] = persist_error
+        yield {"summary": summary}
+
 class AnalyticsService:
     """Handles performance analytics"""
     
     @staticmethod
-    def get_analytics() -> Dict[str, Any]:
-        """Get post performance analytics"""
-        return data_manager.get_post_analytics()
+    def get_analytics(member_id: Optional[str] = None, daily_days: int = 0) -> Dict[str, Any]:
+        """Get post performance analytics, with engagement computed over every post"""
+        from analytics_engine import analytics_engine
+        analytics = dict(data_manager.get_post_analytics(member_id))
+        analytics["performance"] = analytics_engine.summary(member_id, daily_days)
+        return analytics
     
     @staticmethod
-    def get_post_analytics(post_id: str) -> Dict[str, Any]:
-        """Get analytics for a specific post"""
-        post = data_manager.get_post_by_id(post_id)
+    def get_post_analytics(post_id: str, member_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get analytics for a specific post, compared with the member's other posts"""
+        from analytics_engine import analytics_engine
+        post = data_manager.get_post_by_id(post_id, member_id)
         if not post:
             raise Exception("Post not found")
         
         return {
             "post": post,
-            "insights": {
-                "performance_vs_average": "+12% above average engagement",
-                "best_performing_element": "Technical insights resonated well",
-                "audience_demographics": "Primarily software engineers (65%), tech leads (25%)",
-                "engagement_timeline": "Peak engagement at 2:30 PM PST"
-            }
+            "insights": analytics_engine.post_insights(post_id, member_id) or {}
         }
 
 class SchedulingService:
 
     @staticmethod
-    def schedule_post(content: str, scheduled_time: str) -> Dict[str, Any]:
+    def schedule_post(content: str, scheduled_time: str, content_type: str = "general") -> Dict[str, Any]:
         """Schedule a post for future publishing"""
         post_data = {
             "content": content,
             "scheduled_time": scheduled_time,
+            "content_type": content_type,
         }
         post_id = data_manager.add_scheduled_post(post_data)
+        # Posts scheduled on a worker that does not run the scheduler are picked up by its next resync
+        if scheduler_engine.is_running():
+            scheduler_engine.add(post_id, post_data["scheduled_time"])
         return {
             "message": "Post scheduled successfully",
             "post_id": post_id,
             "content": content,
-            "scheduled_time": scheduled_time,
+            "scheduled_time": post_data["scheduled_time"],
             "status": "scheduled"
         }
 
     @staticmethod
-    def get_scheduled_posts() -> Dict[str, Any]:
-        """Get all scheduled posts"""
-        scheduled_posts = data_manager.get_scheduled_posts()
-        return {"scheduled_posts": scheduled_posts}
+    async def schedule_calendar(items: List[Dict[str, Any]], member_id: Optional[str] = None,
+                                generate_missing: bool = True, max_concurrency: int = None,
+                                bypass_cache: bool = False, refresh_cache: bool = False) -> Dict[str, Any]:
+        """Schedule every item of a calendar in one all-or-nothing batch, generating missing posts concurrently"""
+        if len(items) > Config.BULK_SCHEDULE_MAX_ITEMS:
+            raise ValueError(f"At most {Config.BULK_SCHEDULE_MAX_ITEMS} items can be scheduled at once")
+        results = [{"index": index, "scheduled_time": item.get("scheduled_time")} for index, item in enumerate(items)]
+        valid, to_generate = [], []
+        for item, result in zip(items, results):
+            try:
+                result["scheduled_time"] = normalize_scheduled_time(item.get("scheduled_time"))
+            except ValueError as e:
+                result.update(status="invalid", detail=str(e))
+                continue
+            if not (item.get("content") or item.get("post")):
+                if not (generate_missing and item.get("suggested_topic")):
+                    result.update(status="invalid", detail="content or a suggested_topic to generate it from is required")
+                    continue
+                to_generate.append(item)
+            valid.append((item, result))
+        if to_generate:
+            await ContentService.generate_calendar_posts(
+                to_generate, member_id, max_concurrency, bypass_cache, refresh_cache
+            )
 
-# Standalone function to post content to LinkedIn
-def post_to_linkedin(content: str, access_token: str, user_id: str) -> dict:
-    """Post content to LinkedIn using the REST API."""
-    url = "https://api.linkedin.com/rest/posts"
-    post_body = {
-        "author": f"urn:li:person:{user_id}",
-        "commentary": content,
-        "visibility": "PUBLIC",
-        "distribution": {
-            "feedDistribution": "MAIN_FEED",
-            "targetEntities": [],
-            "thirdPartyDistributionChannels": []
-        },
-        "lifecycleState": "PUBLISHED",
-        "isReshareDisabledByAuthor": False
-    }
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-        "LinkedIn-Version": "202306",
-        "X-Restli-Protocol-Version": "2.0.0",
-    }
-    response = requests.post(url, json=post_body, headers=headers)
-    try:
-        data = response.json()
-    except Exception:
-        data = response.text
-    return {
-        "ok": response.ok,
-        "status": response.status_code,
-        "data": data,
-        "postIdHeader": response.headers.get("x-restli-id"),
-    }
-    """Handles post scheduling"""
-    
+        posts, accepted = [], []
+        for item, result in valid:
+            content = item.get("content") or item.get("post")
+            if not content:
+                result.update(status="generation_failed", detail=item.get("error"))
+                continue
+            post = {
+                "content": content,
+                "scheduled_time": result["scheduled_time"],
+                "content_type": item.get("content_type") or "general",
+            }
+            if item.get("topic_source") == "news" and item.get("suggested_topic"):
+                # Remembered so cancelling the post offers the news again
+                post["news_topic"] = item["suggested_topic"]
+            posts.append(post)
+            accepted.append((item, result))
+        if posts:
+            post_ids = await run_in_threadpool(data_manager.add_scheduled_posts, posts)
+            if scheduler_engine.is_running():
+                scheduler_engine.load_pending(posts)
+            for (item, result), post_id, post in zip(accepted, post_ids, posts):
+                result.update(status="scheduled", post_id=post_id, content=post["content"])
+            # Calendars should not offer the same news again
+            news = [post["news_topic"] for post in posts if post.get("news_topic")]
+            if news:
+                await run_in_threadpool(mark_topics_as_posted, news)
+        return {"scheduled": len(posts), "failed": len(items) - len(posts), "items": results}
 
     @staticmethod
-    def schedule_post(content: str, scheduled_time: str) -> Dict[str, Any]:
-        """Schedule a post for future publishing"""
-        post_data = {
-            "content": content,
-            "scheduled_time": scheduled_time,
-        }
-        post_id = data_manager.add_scheduled_post(post_data)
-        return {
-            "message": "Post scheduled successfully",
-            "post_id": post_id,
-            "content": content,
-            "scheduled_time": scheduled_time,
-            "status": "scheduled"
-        }
+    def _check_batch_size(count: int) -> None:
+        if count > Config.BULK_SCHEDULE_MAX_ITEMS:
+            raise ValueError(f"At most {Config.BULK_SCHEDULE_MAX_ITEMS} posts can be changed at once")
+
+    @staticmethod
+    def _unchanged(post_id: str, status: Optional[str]) -> Dict[str, Any]:
+        if status is None:
+            return {"post_id": post_id, "status": "not_found"}
+        return {"post_id": post_id, "status": "not_pending", "current_status": status}
+
+    @staticmethod
+    def reschedule_posts(times: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Move pending posts to new times in one batch, with a status per post"""
+        SchedulingService._check_batch_size(len(times))
+        normalized, invalid = {}, {}
+        for post_id, scheduled_time in times:
+            try:
+                normalized[post_id] = normalize_scheduled_time(scheduled_time)
+            except ValueError as e:
+                invalid[post_id] = str(e)
+        statuses = data_manager.reschedule_scheduled_posts(normalized) if normalized else {}
+        items = []
+        for post_id in dict.fromkeys(post_id for post_id, _ in times):
+            if post_id in invalid:
+                items.append({"post_id": post_id, "status": "invalid", "detail": invalid[post_id]})
+            elif statuses.get(post_id) == "pending":
+                if scheduler_engine.is_running():
+                    scheduler_engine.reschedule(post_id, normalized[post_id])
+                items.append({"post_id": post_id, "status": "rescheduled", "scheduled_time": normalized[post_id]})
+            else:
+                items.append(SchedulingService._unchanged(post_id, statuses.get(post_id)))
+        return {"rescheduled": sum(item["status"] == "rescheduled" for item in items), "items": items}
+
+    @staticmethod
+    def cancel_posts(post_ids: List[str]) -> Dict[str, Any]:
+        """Cancel pending posts in one batch, with a status per post; their news topics are offered again"""
+        SchedulingService._check_batch_size(len(post_ids))
+        post_ids = list(dict.fromkeys(post_ids))
+        # Statuses from before the cancel, so posts that were already cancelled are not pending
+        statuses = data_manager.cancel_scheduled_posts(post_ids) if post_ids else {}
+        items, cancelled = [], []
+        for post_id in post_ids:
+            if statuses.get(post_id) == "pending":
+                scheduler_engine.remove(post_id)
+                cancelled.append(post_id)
+                items.append({"post_id": post_id, "status": "cancelled"})
+            else:
+                items.append(SchedulingService._unchanged(post_id, statuses.get(post_id)))
+        if cancelled:
+            news = data_manager.get_scheduled_news_topics(cancelled)
+            if news:
+                unmark_topics_as_posted(news)
+        return {"cancelled": len(cancelled), "items": items}
 
     @staticmethod
     def get_scheduled_posts() -> Dict[str, Any]:
         """Get all scheduled posts"""
         scheduled_posts = data_manager.get_scheduled_posts()
-    return {"scheduled_posts": scheduled_posts}
-
-
+        return {"scheduled_posts": scheduled_posts}
 
+# Standalone function to post content to LinkedIn
+def post_to_linkedin(content: str, access_token: str, user_id: str) -> dict:
     """Post content to LinkedIn using the REST API."""
-    url = "https://api.linkedin.com/rest/posts"
-    post_body = {
-        "author": f"urn:li:person:{user_id}",
-        "commentary": content,
-        "visibility": "PUBLIC",
-        "distribution": {
-            "feedDistribution": "MAIN_FEED",
-            "targetEntities": [],
-            "thirdPartyDistributionChannels": []
-        },
-        "lifecycleState": "PUBLISHED",
-        "isReshareDisabledByAuthor": False
-    }
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-        "LinkedIn-Version": "202306",
-        "X-Restli-Protocol-Version": "2.0.0",
-    }
-    response = requests.post(url, json=post_body, headers=headers)
-    try:
-        data = response.json()
-    except Exception:
-        data = response.text
-    return {
-        "ok": response.ok,
-        "status": response.status_code,
-        "data": data,
-        "postIdHeader": response.headers.get("x-restli-id"),
-    }
+    return linkedin_client.create_post(content, access_token, user_id)
@@ -0,0 +1,61 @@
+"""
+Request coalescing for identical concurrent calls.
+
+While a call for a key is running, callers with the same key wait for that
+call and get its result (or its exception) instead of starting their own.
+The shared call runs in its own task, so one caller going away (e.g. a
+closed connection) does not cancel it for the others; it is only cancelled
+when every caller has gone. Unlike the response cache, nothing is kept once
+the call finishes.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from metrics import SINGLEFLIGHT_CALLS
+
+class _Flight:
+    def __init__(self, loop: asyncio.AbstractEventLoop, task: asyncio.Task):
+        self.loop = loop
+        self.task = task
+        self.waiters = 0
+        self.cancelled = False
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its result with concurrent callers"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `function()`, or the call already running for `key`"""
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        # Tasks belong to one event loop, so calls from another loop (thread) run on their own
+        if flight is not None and flight.loop is loop and not flight.cancelled and not flight.task.done():
+            self.coalesced += 1
+            SINGLEFLIGHT_CALLS.inc(group=self.name, role="coalesced")
+        else:
+            flight = _Flight(loop, loop.create_task(function()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.calls += 1
+            SINGLEFLIGHT_CALLS.inc(group=self.name, role="leader")
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller was cancelled, so nobody needs the result
+                flight.cancelled = True
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), "calls": self.calls, "coalesced": self.coalesced}
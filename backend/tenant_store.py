@@ -0,0 +1,165 @@
+"""
+Per-member profiles, content strategies and post analytics in MongoDB.
+
+Members are keyed by their LinkedIn member ID (the OpenID `sub`). Profiles
+and strategies are read far more often than they change, so the most
+recently used members are kept in a bounded in-memory LRU; writes through
+this process invalidate the entry and other workers see them after
+TENANT_CACHE_TTL_SECONDS.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from analytics_rollups import AnalyticsRollups, merge_overall
+from scheduled_post_store import utc_now_iso
+
+class TenantCache:
+    """Thread-safe LRU of per-member documents with a TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+class UnknownMemberError(LookupError):
+    """Raised when a member ID has no stored profile or content strategies"""
+
+    def __init__(self, member_id: str):
+        self.member_id = member_id
+        super().__init__(f"Unknown member: {member_id}")
+
+class TenantStore:
+    """Profiles, strategies and analytics for many LinkedIn members"""
+
+    def __init__(self, db, max_cached: int = 10000, ttl_seconds: float = 60):
+        self._profiles = db["user_profiles"]
+        self._strategies = db["content_strategies"]
+        self._analytics = db["post_analytics"]
+        self.cache = TenantCache(max_cached, ttl_seconds)
+        self.rollups = AnalyticsRollups(db)
+        # Profiles and strategies use the member ID as _id, so they need no extra index
+        indexes = [
+            ([("member_id", ASCENDING), ("id", ASCENDING)], {"unique": True, "name": "member_post_unique"}),
+            ([("member_id", ASCENDING), ("date", DESCENDING)], {"name": "member_date"}),
+        ]
+        for keys, options in indexes:
+            try:
+                self._analytics.create_index(keys, **options)
+            except PyMongoError as e:
+                print(f"Warning: could not create index {options['name']} on post_analytics: {e}")
+
+    def _load(self, member_id: str) -> Dict[str, Any]:
+        """Profile and strategies for one member, from the cache or MongoDB"""
+        entry = self.cache.get(member_id)
+        if entry is None:
+            profile = self._profiles.find_one({"_id": member_id}) or {}
+            strategies = self._strategies.find_one({"_id": member_id}) or {}
+            entry = {
+                "exists": bool(profile or strategies),
+                "profile": profile.get("profile", {}),
+                "overall_metrics": profile.get("overall_metrics", {}),
+                "strategies": strategies.get("strategies", {}),
+            }
+            self.cache.set(member_id, entry)
+        return entry
+
+    def require_member(self, member_id: str) -> None:
+        """Raise UnknownMemberError unless the member has a stored profile or strategies"""
+        if not self._load(member_id)["exists"]:
+            raise UnknownMemberError(member_id)
+
+    def get_profile(self, member_id: str) -> Dict[str, Any]:
+        """Profile for a member; empty if the member has none stored"""
+        return self._load(member_id)["profile"]
+
+    def get_strategies(self, member_id: str) -> Dict[str, Any]:
+        return self._load(member_id)["strategies"]
+
+    def put_profile(self, member_id: str, profile: Dict[str, Any],
+                    overall_metrics: Optional[Dict[str, Any]] = None) -> None:
+        update = {"profile": profile, "updated_at": utc_now_iso()}
+        if overall_metrics is not None:
+            update["overall_metrics"] = overall_metrics
+        self._profiles.update_one({"_id": member_id}, {"$set": update}, upsert=True)
+        self.cache.invalidate(member_id)
+
+    def put_strategies(self, member_id: str, strategies: Dict[str, Any]) -> None:
+        self._strategies.update_one(
+            {"_id": member_id}, {"$set": {"strategies": strategies, "updated_at": utc_now_iso()}}, upsert=True
+        )
+        self.cache.invalidate(member_id)
+
+    def record_post(self, member_id: str, post: Dict[str, Any]) -> None:
+        """Insert or update analytics for one of a member's posts, and add the change to its rollups"""
+        doc = {k: v for k, v in post.items() if k != "_id"}
+        doc["member_id"] = member_id
+        previous = self._analytics.find_one_and_update(
+            {"member_id": member_id, "id": doc["id"]}, {"$set": doc},
+            upsert=True, return_document=ReturnDocument.BEFORE
+        )
+        current = dict(previous or {}, **doc)
+        try:
+            self.rollups.apply(member_id, previous, current)
+        except PyMongoError as e:
+            # The post is stored; `python -m analytics_rollups rebuild` brings the rollups back in line
+            print(f"[Rollups] Could not update rollups for {member_id}: {e}")
+
+    def get_post(self, member_id: str, post_id: str) -> Optional[Dict[str, Any]]:
+        return self._analytics.find_one({"member_id": member_id, "id": post_id}, {"_id": 0, "member_id": 0})
+
+    def get_post_metrics(self, member_id: str) -> List[Dict[str, Any]]:
+        """Every post's ID, date and counters for a member, without content"""
+        projection = {"_id": 0, "id": 1, "date": 1, "posted_at": 1, "likes": 1, "comments": 1, "shares": 1,
+                      "impressions": 1, "engagement_rate": 1}
+        return list(self._analytics.find({"member_id": member_id}, projection, batch_size=10000))
+
+    def get_analytics(self, member_id: str, limit: int = 20) -> Dict[str, Any]:
+        """Recent posts, overall metrics and daily/weekly rollups in the same shape as the single-user analytics"""
+        recent_posts: List[Dict[str, Any]] = list(
+            self._analytics.find({"member_id": member_id}, {"_id": 0, "member_id": 0})
+            .sort("date", DESCENDING).limit(limit)
+        )
+        rollups = self.rollups.read(member_id)
+        overall_metrics = merge_overall(self._load(member_id)["overall_metrics"], rollups["overall_metrics"])
+        return {"recent_posts": recent_posts, "overall_metrics": overall_metrics, "rollups": rollups["rollups"]}
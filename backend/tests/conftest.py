@@ -0,0 +1,28 @@
+import os
+import sys
+
+import mongomock
+import mongomock.collection
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# pymongo 4.14 passes `sort` to bulk updates, which mongomock 4.3 does not accept yet
+_add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+def _add_update_without_sort(self, selector, doc, multi=False, upsert=False, collation=None,
+                             array_filters=None, hint=None, sort=None, **kwargs):
+    return _add_update(self, selector, doc, multi=multi, upsert=upsert, collation=collation,
+                       array_filters=array_filters, hint=hint)
+
+mongomock.collection.BulkOperationBuilder.add_update = _add_update_without_sort
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """An in-memory database behind database.get_db"""
+    import database
+    db = mongomock.MongoClient()["test"]
+    monkeypatch.setattr(database, "get_db", lambda: db)
+    monkeypatch.setattr(database, "_available", True)
+    return db
@@ -0,0 +1,35 @@
+from analytics_engine import PostFrame
+from calendar_engine import slot_scores
+
+POSTS = [
+    {"id": "monday", "posted_at": "2026-01-05T09:00:00Z", "likes": 5, "impressions": 100},
+    {"id": "tuesday", "posted_at": "2026-01-06T09:00:00Z", "likes": 2, "impressions": 100},
+    {"id": "undated", "likes": 50, "impressions": 100},
+]
+
+def test_undated_posts_stay_out_of_date_based_figures():
+    summary = PostFrame(POSTS).summary()
+
+    assert summary["total_posts"] == 3
+    assert summary["first_post"].startswith("2026-01-05")
+    assert [day["day"] for day in summary["best_posting_days"]] == ["Monday", "Tuesday"]
+    assert summary["rolling_engagement_rate"]["7d"] == 3.5
+    # Still counted in date-free figures
+    assert summary["top_posts"][0]["id"] == "undated"
+
+def test_undated_post_insights_have_no_day():
+    frame = PostFrame(POSTS)
+
+    insights = frame.post_insights(frame.row("undated"))
+
+    assert insights["posted_day"] is None
+    assert insights["rolling_30d_engagement_rate"] is None
+
+def test_only_undated_posts_have_no_dates():
+    frame = PostFrame([{"id": "a", "likes": 1, "impressions": 10}])
+
+    summary = frame.summary(daily_days=7)
+
+    assert summary["first_post"] is None and summary["last_post"] is None
+    assert summary["daily"] == []
+    assert slot_scores(frame.weekdays, frame.hours, frame.engagement).shape == (7, 24)
@@ -0,0 +1,44 @@
+from analytics_rollups import AnalyticsRollups, compare
+from tenant_store import TenantStore
+
+POSTS = [
+    {"id": "p1", "posted_at": "2026-01-05T09:00:00Z", "content": "Hello #ai", "likes": 5, "comments": 1,
+     "impressions": 100},
+    {"id": "p2", "date": "2026-01-06", "content": "More #ai #rust", "likes": 2, "shares": 3, "impressions": 50},
+    {"id": "p3", "posted_at": "2026-01-13T15:30:00Z", "content": "No tags", "likes": 8, "impressions": 200},
+    {"id": "p4", "content": "Undated #rust", "engagement_rate": 4.5},
+]
+
+def stored_rollups(db, member_id):
+    return {doc["_id"]: doc for doc in db["analytics_rollups"].find({"member_id": member_id})}
+
+def test_incremental_rollups_match_a_full_rebuild(mongo_db):
+    store = TenantStore(mongo_db, 10, 60)
+    for post in POSTS:
+        store.record_post("ada", post)
+    # A metrics sync moves a post's numbers, hashtags and day
+    store.record_post("ada", dict(POSTS[0], likes=9, content="Hello #rust", posted_at="2026-01-07T18:00:00Z"))
+    store.record_post("grace", POSTS[2])
+    incremental = stored_rollups(mongo_db, "ada")
+
+    rollups = AnalyticsRollups(mongo_db)
+    assert rollups.check() == []
+    rollups.rebuild("ada")
+    rebuilt = stored_rollups(mongo_db, "ada")
+
+    for key in set(incremental) | set(rebuilt):
+        assert compare(rebuilt.get(key, {}), incremental.get(key, {})) is None, key
+    overall = rebuilt["ada|all|all"]
+    assert overall["posts"] == 4 and overall["likes"] == 19
+    assert overall["hashtags"]["rust"]["posts"] == 3
+
+def test_check_reports_drift_and_rebuild_repairs_it(mongo_db):
+    store = TenantStore(mongo_db, 10, 60)
+    for post in POSTS:
+        store.record_post("ada", post)
+    mongo_db["analytics_rollups"].update_one({"_id": "ada|all|all"}, {"$inc": {"likes": 1}})
+    rollups = AnalyticsRollups(mongo_db)
+
+    assert rollups.check("ada") == ["ada|all|all: likes expected 15, stored 16"]
+    rollups.rebuild("ada")
+    assert rollups.check("ada") == []
@@ -0,0 +1,65 @@
+import pytest
+from pymongo.errors import BulkWriteError, PyMongoError
+
+import services
+from scheduled_post_store import MongoScheduledPostStore, SQLiteScheduledPostStore, utc_now_iso
+from services import SchedulingService
+
+@pytest.fixture(params=["sqlite", "mongo"])
+def store(request, monkeypatch, tmp_path, mongo_db):
+    if request.param == "sqlite":
+        store = SQLiteScheduledPostStore(tmp_path / "scheduled_posts.db")
+    else:
+        store = MongoScheduledPostStore(mongo_db["scheduled_posts"])
+    monkeypatch.setattr(services.data_manager, "_scheduled_posts", store)
+    return store
+
+def test_cancelling_twice_reports_the_post_as_not_pending(store):
+    post_id = store.add({"content": "Text", "scheduled_time": utc_now_iso(3600)})
+
+    first = SchedulingService.cancel_posts([post_id])
+    second = SchedulingService.cancel_posts([post_id])
+
+    assert first["cancelled"] == 1
+    assert second["cancelled"] == 0
+    assert second["items"] == [{"post_id": post_id, "status": "not_pending", "current_status": "cancelled"}]
+
+def test_cancelling_a_news_post_offers_its_topic_again(store, mongo_db):
+    news = mongo_db["tldr_news"]
+    news.insert_many([{"subtopic": "Rust in the kernel", "posted": True}, {"subtopic": "Chip rules", "posted": True}])
+    post_ids = store.add_many([
+        {"content": "Rust", "scheduled_time": utc_now_iso(3600), "news_topic": "Rust in the kernel"},
+        {"content": "Chips", "scheduled_time": utc_now_iso(3600), "news_topic": "Chip rules"},
+    ])
+
+    SchedulingService.cancel_posts(post_ids[:1])
+
+    assert news.find_one({"subtopic": "Rust in the kernel"})["posted"] is False
+    assert news.find_one({"subtopic": "Chip rules"})["posted"] is True
+
+class PartialInsertCollection:
+    """Inserts the first document of a batch, then fails; deleting fails too"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def insert_many(self, docs, ordered=True):
+        self.collection.insert_one(docs[0])
+        raise BulkWriteError({"nInserted": 1, "writeErrors": [{"index": 1, "code": 11000, "errmsg": "E11000"}]})
+
+    def delete_many(self, query):
+        raise PyMongoError("connection lost")
+
+def test_failed_undo_reports_the_posts_left_behind(mongo_db, capsys):
+    store = MongoScheduledPostStore(PartialInsertCollection(mongo_db["scheduled_posts"]))
+
+    with pytest.raises(BulkWriteError):
+        store.add_many([{"content": "One", "scheduled_time": utc_now_iso(60)},
+                        {"content": "Two", "scheduled_time": utc_now_iso(60)}])
+
+    left_behind = mongo_db["scheduled_posts"].find_one()["_id"]
+    output = capsys.readouterr().out
+    assert "1 posts may remain" in output and left_behind in output
@@ -0,0 +1,16 @@
+import pytest
+
+from calendar_engine import posts_per_week
+
+@pytest.mark.parametrize("frequency, expected", [
+    ("daily", 7),
+    ("once a day", 7),
+    ("3 times per day", 21),
+    ("3 times a week", 3),
+    ("twice a week on Monday", 2),
+    ("Tuesday and Thursday", 1),
+    ("every other week", 0.5),
+    (4, 4),
+])
+def test_posts_per_week_reads_strategy_frequencies(frequency, expected):
+    assert posts_per_week(frequency) == pytest.approx(expected)
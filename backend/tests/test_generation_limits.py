@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import routes
+from ai_service import ai_service
+from concurrency import GenerationLimiter
+from config import Config
+from model_backends import FakeBackend
+from model_router import DEFAULT_TASK, ModelRouter
+
+@pytest.fixture
+def app(monkeypatch, mongo_db):
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", False)
+    # One call at a time and nobody waiting, so a second concurrent call is rejected
+    monkeypatch.setattr(ai_service, "limiter", GenerationLimiter(1, 0, 7))
+    monkeypatch.setattr(ai_service, "flights", {})
+    app = FastAPI()
+    app.include_router(routes.router)
+    return app
+
+def use_model(monkeypatch, backend: FakeBackend) -> None:
+    router = ModelRouter({DEFAULT_TASK: [backend.name]}, {}, 5.0)
+    router.register(backend)
+    monkeypatch.setattr(ai_service, "router", router)
+
+def optimize(client: httpx.AsyncClient, text: str):
+    return client.post("/optimize-post", json={"text": text})
+
+def run(app, *texts):
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(optimize(client, text) for text in texts))
+    return asyncio.run(main())
+
+def test_request_beyond_the_queue_gets_429_with_retry_after(app, monkeypatch):
+    use_model(monkeypatch, FakeBackend("fake:slow", latency="fixed:0.2"))
+
+    first, second = run(app, "first post", "second post")
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert second.headers["Retry-After"] == "7"
+
+def test_failed_generation_frees_its_slot(app, monkeypatch):
+    use_model(monkeypatch, FakeBackend("fake:broken", error_rate=1.0))
+
+    (failed,) = run(app, "first post")
+
+    assert failed.status_code == 500
+    assert ai_service.limiter.stats()["in_flight"] == 0
+    use_model(monkeypatch, FakeBackend("fake:ok"))
+    (retried,) = run(app, "first post")
+    assert retried.status_code == 200
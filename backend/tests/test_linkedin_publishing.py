@@ -0,0 +1,112 @@
+import requests
+import pytest
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+import scheduler
+from config import Config
+from linkedin_client import LinkedInClient
+from scheduled_post_store import SQLiteScheduledPostStore, utc_now_iso
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.ok = 200 <= status_code < 300
+        self.headers = headers or {}
+        self.text = ""
+
+    def json(self):
+        return {}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Config, "LINKEDIN_BACKOFF_MAX", 0)
+    monkeypatch.setattr(Config, "LINKEDIN_MAX_RETRIES", 2)
+    return LinkedInClient("http://linkedin.invalid")
+
+def respond_with(client, monkeypatch, *outcomes):
+    """Make the session return or raise each outcome in turn; returns the list of calls"""
+    calls = []
+    def post(*args, **kwargs):
+        outcome = outcomes[len(calls)]
+        calls.append(kwargs)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    monkeypatch.setattr(client.session, "post", post)
+    return calls
+
+def refused():
+    reason = NewConnectionError(None, "Failed to establish a new connection")
+    return requests.ConnectionError(MaxRetryError(None, "/rest/posts", reason))
+
+@pytest.mark.parametrize("status", [500, 502, 504])
+def test_server_errors_that_may_have_created_the_post_are_not_retried(client, monkeypatch, status):
+    calls = respond_with(client, monkeypatch, FakeResponse(status), FakeResponse(201))
+
+    result = client.create_post("hello", "token", "member")
+
+    assert len(calls) == 1
+    assert result["status"] == status
+    assert client.stats()["retries"] == 0
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_rejections_are_retried(client, monkeypatch, status):
+    calls = respond_with(client, monkeypatch, FakeResponse(status), FakeResponse(201))
+
+    result = client.create_post("hello", "token", "member")
+
+    assert len(calls) == 2
+    assert result["ok"] is True
+    assert client.stats()["retries"] == 1
+
+def test_only_connect_phase_failures_are_retried(client, monkeypatch):
+    calls = respond_with(client, monkeypatch, refused(), requests.exceptions.ConnectTimeout(), FakeResponse(201))
+    assert client.create_post("hello", "token", "member")["ok"] is True
+    assert len(calls) == 3
+
+    aborted = requests.ConnectionError(ProtocolError("Connection aborted.", ConnectionResetError()))
+    calls = respond_with(client, monkeypatch, aborted, FakeResponse(201))
+    result = client.create_post("hello", "token", "member")
+    assert len(calls) == 1
+    assert result["ok"] is False and result["status"] is None
+
+def test_rate_limit_after_retries_reports_retry_after(client, monkeypatch):
+    limited = FakeResponse(429, {"Retry-After": "120"})
+    respond_with(client, monkeypatch, limited, limited, limited)
+
+    result = client.create_post("hello", "token", "member")
+
+    assert result["status"] == 429
+    assert result["retryAfter"] == 120
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = SQLiteScheduledPostStore(tmp_path / "scheduled_posts.db")
+    monkeypatch.setattr(scheduler.data_manager, "_scheduled_posts", store)
+    monkeypatch.setenv("LINKEDIN_ACCESS_TOKEN", "token")
+    monkeypatch.setenv("LINKEDIN_USER_ID", "member")
+    return store
+
+@pytest.mark.parametrize("result", [
+    {"ok": False, "status": 429, "data": "Local LinkedIn rate limit reached for this member.", "retryAfter": 30.0},
+    {"ok": False, "status": 429, "data": {}, "retryAfter": 30.0},
+])
+def test_rate_limited_post_goes_back_to_pending(store, monkeypatch, result):
+    post_id = store.add({"content": "hello", "scheduled_time": utc_now_iso(-60)})
+    monkeypatch.setattr(scheduler.linkedin_client, "create_post", lambda *args: result)
+
+    assert scheduler.publish_scheduled_post(post_id) == 30.0
+
+    post = store.list_all()[0]
+    assert post["status"] == "pending"
+    assert post["scheduled_time"] > utc_now_iso()
+    # Not due again until the retry time
+    assert store.claim(post_id, utc_now_iso()) is None
+
+def test_rejected_post_is_marked_failed(store, monkeypatch):
+    post_id = store.add({"content": "hello", "scheduled_time": utc_now_iso(-60)})
+    monkeypatch.setattr(scheduler.linkedin_client, "create_post",
+                        lambda *args: {"ok": False, "status": 422, "data": "bad"})
+
+    assert scheduler.publish_scheduled_post(post_id) is None
+    assert store.list_all()[0]["status"] == "failed"
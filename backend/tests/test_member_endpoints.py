@@ -0,0 +1,124 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes
+from data_manager import data_manager
+from linkedin_client import linkedin_client
+from tenant_store import TenantCache
+
+# Access token -> OpenID sub known to the userinfo stub
+TOKENS = {"ada-token": "ada", "grace-token": "grace", "nobody-token": "nobody"}
+PROFILE = {"id": "ada", "name": "Ada", "headline": "Engineer", "summary": "Builds engines", "industry": "Technology",
+           "company": "Analytical", "position": "Engineer", "location": "London", "skills": ["Python"],
+           "interests": ["AI"], "experience": [], "education": []}
+
+@pytest.fixture
+def userinfo(monkeypatch):
+    """A local stand-in for LinkedIn's OpenID userinfo endpoint"""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.path)
+            sub = TOKENS.get(self.headers.get("Authorization", "").removeprefix("Bearer "))
+            body = json.dumps({"sub": sub} if sub else {"message": "Invalid access token"}).encode()
+            self.send_response(200 if sub else 401)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(linkedin_client, "base_url", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(linkedin_client, "_sessions", TenantCache(100, 300))
+    yield calls
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(mongo_db, userinfo, monkeypatch):
+    monkeypatch.setattr(data_manager, "_tenants", None)
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+def test_member_endpoints_need_a_linkedin_session(client):
+    response = client.get("/users/ada/profile")
+
+    assert response.status_code == 401
+
+def test_rejected_token_is_unauthorized(client):
+    response = client.get("/users/ada/profile", headers={"Authorization": "Bearer expired"})
+
+    assert response.status_code == 401
+
+def test_session_of_another_member_is_forbidden(client):
+    client.cookies.set("linkedin_access_token", "grace-token")
+
+    assert client.get("/users/ada/profile").status_code == 403
+    assert client.put("/users/ada/profile", json=PROFILE).status_code == 403
+
+def test_unknown_member_is_not_found(client):
+    client.cookies.set("linkedin_access_token", "ada-token")
+
+    assert client.get("/users/ada/profile").status_code == 404
+
+def test_member_can_save_and_read_their_profile(client, userinfo):
+    headers = {"Authorization": "Bearer ada-token"}
+
+    assert client.put("/users/ada/profile", json=PROFILE, headers=headers).status_code == 200
+    response = client.get("/users/ada/profile", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["profile"]["name"] == "Ada"
+    # The verified session is reused instead of asking LinkedIn on every request
+    assert len(userinfo) == 1
+
+def test_generation_for_unknown_member_is_not_found(client):
+    client.cookies.set("linkedin_access_token", "nobody-token")
+    response = client.post("/generate-personalized-content",
+                           json={"topic": "Testing", "content_type": "educational", "member_id": "nobody"})
+
+    assert response.status_code == 404
+
+def test_calendar_for_unknown_member_is_not_found(client):
+    client.cookies.set("linkedin_access_token", "nobody-token")
+    response = client.post("/content-calendar", json={"days": 7, "member_id": "nobody"})
+
+    assert response.status_code == 404
+
+MEMBER_REQUESTS = [
+    ("get", "/analytics?member_id=ada", None),
+    ("get", "/analytics/post/post-1?member_id=ada", None),
+    ("get", "/usage?member_id=ada", None),
+    ("post", "/content-calendar", {"days": 7, "member_id": "ada"}),
+    ("post", "/generate-personalized-content", {"topic": "Testing", "content_type": "educational", "member_id": "ada"}),
+    ("post", "/generate-personalized-content/stream",
+     {"topic": "Testing", "content_type": "educational", "member_id": "ada"}),
+    ("post", "/optimize-post", {"text": "Hello", "member_id": "ada"}),
+    ("post", "/schedule-posts/bulk", {"calendar": [], "member_id": "ada"}),
+]
+
+@pytest.mark.parametrize("method, path, body", MEMBER_REQUESTS)
+def test_member_id_needs_that_members_session(client, method, path, body):
+    send = getattr(client, method)
+    kwargs = {"json": body} if body is not None else {}
+
+    assert send(path, **kwargs).status_code == 401
+    client.cookies.set("linkedin_access_token", "grace-token")
+    assert send(path, **kwargs).status_code == 403
+
+def test_member_reads_their_own_analytics(client):
+    client.put("/users/ada/profile", json=PROFILE, headers={"Authorization": "Bearer ada-token"})
+    client.cookies.set("linkedin_access_token", "ada-token")
+
+    assert client.get("/analytics?member_id=ada").status_code == 200
@@ -0,0 +1,195 @@
+import asyncio
+
+import pytest
+
+from ai_service import ai_service
+from config import Config
+from model_backends import FakeBackend, FakeModelError
+from model_router import DEFAULT_TASK, CircuitBreaker, ModelRouter
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def failing_breaker(clock, **options):
+    """A breaker that has just opened on errors"""
+    breaker = CircuitBreaker(window=10, min_calls=4, error_rate_threshold=0.5, cooldown=30, clock=clock, **options)
+    for _ in range(4):
+        breaker.record(0.1, False)
+    return breaker
+
+def test_breaker_opens_on_error_rate_and_stays_open_during_cooldown():
+    clock = Clock()
+    breaker = failing_breaker(clock)
+
+    assert breaker.state == "open"
+    clock.now = 29
+    assert not breaker.allow()
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker(window=10, min_calls=4, p95_threshold=1.0, clock=Clock())
+    for _ in range(4):
+        breaker.record(2.0, True)
+
+    assert breaker.state == "open"
+    assert breaker.reason.startswith("p95")
+
+def test_good_probe_closes_the_breaker():
+    clock = Clock()
+    breaker = failing_breaker(clock)
+    clock.now = 30
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record(0.2, True)
+
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+def test_failed_probe_reopens_the_breaker():
+    clock = Clock()
+    breaker = failing_breaker(clock)
+    clock.now = 30
+    assert breaker.allow()
+
+    breaker.record(0.2, False)
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+def test_cancelled_probe_lets_the_next_call_probe():
+    clock = Clock()
+    breaker = failing_breaker(clock)
+    clock.now = 30
+    assert breaker.allow()
+
+    breaker.cancel()
+
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+def test_candidates_skip_open_models_and_fall_back_to_all_when_every_breaker_is_open():
+    router = ModelRouter({DEFAULT_TASK: ["fake:a", "fake:b"]}, {}, 1.0)
+    assert [backend.name for backend in router.candidates("task")] == ["fake:a", "fake:b"]
+
+    for _ in range(10):
+        router.record("fake:a", 0.1, False)
+    assert [backend.name for backend in router.candidates("task")] == ["fake:b"]
+
+    for _ in range(10):
+        router.record("fake:b", 0.1, False)
+    assert [backend.name for backend in router.candidates("task")] == ["fake:a", "fake:b"]
+
+@pytest.fixture
+def routed(monkeypatch):
+    """Route every task to a primary and a fallback FakeBackend; returns a function to set them up"""
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", False)
+
+    def route(primary: FakeBackend, fallback: FakeBackend, primary_timeout: float = 5.0):
+        router = ModelRouter({DEFAULT_TASK: [primary.name, fallback.name]}, {primary.name: primary_timeout}, 5.0)
+        router.register(primary)
+        router.register(fallback)
+        monkeypatch.setattr(ai_service, "router", router)
+        return router
+    return route
+
+def generate(prompt: str) -> str:
+    return asyncio.run(ai_service._generate("optimize_post", prompt, bypass_cache=True))
+
+def test_failed_call_falls_back_to_the_next_model(routed):
+    primary, fallback = FakeBackend("fake:primary", error_rate=1.0), FakeBackend("fake:fallback")
+    router = routed(primary, fallback)
+
+    assert generate("hello")
+    assert (primary.calls, fallback.calls) == (1, 1)
+    assert router.breaker("fake:primary").stats()["error_rate"] == 1.0
+
+def test_timed_out_call_falls_back_to_the_next_model(routed):
+    primary, fallback = FakeBackend("fake:primary", timeout_rate=1.0), FakeBackend("fake:fallback")
+    router = routed(primary, fallback, primary_timeout=0.05)
+
+    assert generate("hello")
+    assert fallback.calls == 1
+    assert router.breaker("fake:primary").stats()["calls"] == 1
+
+async def collect(stream):
+    return [text async for text in stream]
+
+def test_stream_falls_back_before_the_first_chunk(routed):
+    primary, fallback = FakeBackend("fake:primary", timeout_rate=1.0), FakeBackend("fake:fallback")
+    routed(primary, fallback, primary_timeout=0.05)
+
+    parts = asyncio.run(collect(ai_service._stream("optimize_post", "hello", bypass_cache=True)))
+
+    assert parts
+    assert fallback.calls == 1
+
+def test_stream_does_not_fall_back_after_the_first_chunk(routed):
+    # Fails half way through its chunks
+    primary = FakeBackend("fake:primary", error_rate=1.0, output_tokens=32, chunk_tokens=4)
+    fallback = FakeBackend("fake:fallback")
+    routed(primary, fallback)
+    parts = []
+
+    async def consume():
+        async for text in ai_service._stream("optimize_post", "hello", bypass_cache=True):
+            parts.append(text)
+
+    with pytest.raises(FakeModelError):
+        asyncio.run(consume())
+    assert parts
+    assert fallback.calls == 0
+
+def test_closed_stream_is_not_counted_against_the_model(routed):
+    primary, fallback = FakeBackend("fake:primary", output_tokens=32, chunk_tokens=4), FakeBackend("fake:fallback")
+    router = routed(primary, fallback)
+
+    async def read_one_chunk():
+        stream = ai_service._stream("optimize_post", "hello", bypass_cache=True)
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(read_one_chunk())
+
+    assert router.breaker("fake:primary").stats() == router.breaker("fake:fallback").stats()
+    assert router.breaker("fake:primary").stats()["calls"] == 0
+
+def test_cancelled_probe_is_not_counted_and_frees_the_probe(routed):
+    primary, fallback = FakeBackend("fake:primary", output_tokens=32, chunk_tokens=4), FakeBackend("fake:fallback")
+    router = routed(primary, fallback)
+    clock = Clock()
+    breaker = failing_breaker(clock)
+    router.breakers["fake:primary"] = breaker
+    clock.now = 30
+
+    async def read_one_chunk():
+        stream = ai_service._stream("optimize_post", "hello", bypass_cache=True)
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(read_one_chunk())
+
+    assert primary.calls == 1
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+def test_cancelled_call_is_not_counted_against_the_model(routed):
+    primary, fallback = FakeBackend("fake:primary", latency="fixed:5"), FakeBackend("fake:fallback")
+    router = routed(primary, fallback)
+
+    async def cancel_midway():
+        task = asyncio.ensure_future(ai_service._generate("optimize_post", "hello", bypass_cache=True))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_midway())
+
+    assert router.breaker("fake:primary").stats()["calls"] == 0
+    assert fallback.calls == 0
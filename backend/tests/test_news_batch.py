@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes
+import services
+from ai_service import ai_service
+
+class CountingCollection:
+    """Delegates to a collection, counting bulk writes"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.bulk_writes = 0
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def bulk_write(self, operations, **kwargs):
+        self.bulk_writes += 1
+        return self.collection.bulk_write(operations, **kwargs)
+
+@pytest.fixture
+def news(monkeypatch, mongo_db):
+    collection = mongo_db["tldr_news"]
+    collection.insert_many([{"subtopic": title, "posted": False} for title in ("Rust", "Chips", "Broken")])
+    counting = CountingCollection(collection)
+    monkeypatch.setattr(services, "get_tldr_collection", lambda: counting)
+
+    async def generate_news_post(title, user_profile, bypass_cache=False, refresh_cache=False):
+        if title == "Broken":
+            raise RuntimeError("model failed")
+        return f"Post about {title}"
+
+    monkeypatch.setattr(ai_service, "generate_news_post", generate_news_post)
+    return counting
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+def test_batch_streams_one_line_per_item_then_a_summary(client, news):
+    response = client.post("/generate-news-posts/batch", json={"titles": ["Rust", "Broken", "Chips", "Rust"]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    items, summary = lines[:-1], lines[-1]["summary"]
+    assert sorted((item["title"], item["status"]) for item in items) == [
+        ("Broken", "error"), ("Chips", "success"), ("Rust", "success")
+    ]
+    assert summary == {"total": 3, "succeeded": 2, "failed": 1, "persisted": 2}
+
+def test_failed_item_does_not_stop_the_others_being_stored_in_one_write(client, news):
+    client.post("/generate-news-posts/batch", json={"titles": ["Rust", "Broken", "Chips"]})
+
+    assert news.bulk_writes == 1
+    stored = {doc["subtopic"]: doc for doc in news.find({})}
+    assert stored["Rust"]["generated_post"] == "Post about Rust" and stored["Rust"]["posted"] is True
+    assert stored["Chips"]["posted"] is True
+    assert stored["Broken"]["posted"] is False and "generated_post" not in stored["Broken"]
+
+def test_batch_needs_titles(client, news):
+    assert client.post("/generate-news-posts/batch", json={}).status_code == 400
@@ -0,0 +1,54 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import database
+import routes
+from ai_service import ai_service
+from config import Config
+from model_backends import FakeBackend
+from model_router import DEFAULT_TASK, ModelRouter
+
+@pytest.fixture
+def client(monkeypatch):
+    router = ModelRouter({DEFAULT_TASK: ["fake"]}, {}, 5.0)
+    router.register(FakeBackend("fake"))
+    monkeypatch.setattr(ai_service, "router", router)
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", False)
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+@pytest.fixture
+def mongo_down(monkeypatch):
+    monkeypatch.setattr(database, "_available", False)
+
+def test_news_post_is_generated_while_mongo_is_down(client, mongo_down):
+    response = client.post("/generate-news-post", json={"title": "Rust in the kernel"})
+
+    assert response.status_code == 200
+    assert response.json()["post"]
+
+def test_streamed_news_post_finishes_while_mongo_is_down(client, mongo_down):
+    response = client.post("/generate-news-post/stream", json={"title": "Rust in the kernel"})
+
+    assert response.status_code == 200
+    assert "event: done" in response.text
+    assert "event: error" not in response.text
+
+def test_topic_writes_are_unavailable_while_mongo_is_down(client, mongo_down):
+    assert client.post("/mark-topic-posted", json={"topic": "Rust"}).status_code == 503
+    assert client.post("/save-generated-post", json={"topic": "Rust", "post": "Text"}).status_code == 503
+    assert client.post("/mark-topic-posted", json={}).status_code == 400
+
+def test_generated_post_lookup_is_empty_while_mongo_is_down(client, mongo_down):
+    response = client.get("/get-generated-post/Rust")
+
+    assert response.json() == {"post": None, "linkedin_post_url": None}
+
+def test_news_post_marks_the_topic_posted(client, mongo_db):
+    mongo_db["tldr_news"].insert_one({"subtopic": "Rust in the kernel", "posted": False})
+
+    assert client.post("/generate-news-post", json={"title": "Rust in the kernel"}).status_code == 200
+
+    assert mongo_db["tldr_news"].find_one({"subtopic": "Rust in the kernel"})["posted"] is True
@@ -0,0 +1,52 @@
+import copy
+import json
+
+import pytest
+
+from profile_store import ProfileStore
+
+@pytest.fixture
+def profile_file(tmp_path):
+    path = tmp_path / "user_profile.json"
+    path.write_text(json.dumps({
+        "user_profile": {"name": "Ada", "skills": ["Python"]},
+        "content_strategies": {"educational": {"frequency": "once a week", "topics": ["Testing"]}},
+    }))
+    return path
+
+def test_snapshot_data_cannot_be_changed_in_place(profile_file):
+    snapshot = ProfileStore(profile_file).snapshot
+
+    with pytest.raises(TypeError):
+        snapshot.data["user_profile"] = {}
+    with pytest.raises(TypeError):
+        snapshot.section("user_profile")["name"] = "Grace"
+    with pytest.raises(TypeError):
+        snapshot.section("user_profile")["skills"].append("Rust")
+    with pytest.raises(TypeError):
+        snapshot.section("missing")["name"] = "Grace"
+    assert snapshot.section("user_profile") == {"name": "Ada", "skills": ["Python"]}
+
+def test_copies_are_writable_and_serialize_as_plain_json(profile_file):
+    profile = ProfileStore(profile_file).snapshot.section("user_profile")
+
+    editable = copy.deepcopy(profile)
+    editable["skills"].append("Rust")
+
+    assert editable["skills"] == ["Python", "Rust"]
+    assert profile["skills"] == ["Python"]
+    assert json.loads(json.dumps(profile)) == {"name": "Ada", "skills": ["Python"]}
+
+def test_reload_reuses_unchanged_sections(profile_file):
+    store = ProfileStore(profile_file)
+    before = store.snapshot
+    data = json.loads(profile_file.read_text())
+    data["user_profile"]["name"] = "Grace"
+    profile_file.write_text(json.dumps(data))
+
+    assert store.reload()
+    after = store.snapshot
+
+    assert after.section("user_profile")["name"] == "Grace"
+    assert after.section("content_strategies") is before.section("content_strategies")
+    assert before.section("user_profile")["name"] == "Ada"
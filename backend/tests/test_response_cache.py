@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from ai_service import ai_service
+from config import Config
+from model_backends import FakeBackend
+from model_router import DEFAULT_TASK, ModelRouter
+from response_cache import ResponseCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(2, 60, clock=Clock())
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+
+    cache.set("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["entries"] == 2
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = ResponseCache(10, 60, clock=clock)
+    cache.set("a", "A")
+
+    clock.now += 59
+    assert cache.get("a") == "A"
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+def test_sqlite_tier_survives_a_restart_and_expires(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "responses.db")
+    ResponseCache(10, 60, path, clock=clock).set("a", "A")
+
+    restarted = ResponseCache(10, 60, path, clock=clock)
+    assert restarted.get("a") == "A"
+    assert restarted.stats()["persistent_hits"] == 1
+
+    clock.now += 60
+    assert ResponseCache(10, 60, path, clock=clock).get("a") is None
+
+def test_keys_depend_on_model_method_system_and_prompt():
+    key = ResponseCache.make_key("model", "method", "prompt", "system")
+
+    assert key == ResponseCache.make_key("model", "method", "prompt", "system")
+    assert key != ResponseCache.make_key("other", "method", "prompt", "system")
+    assert key != ResponseCache.make_key("model", "method", "prompt")
+
+@pytest.fixture
+def cached_model(monkeypatch, mongo_db):
+    backend = FakeBackend("fake:cached")
+    router = ModelRouter({DEFAULT_TASK: [backend.name]}, {}, 5.0)
+    router.register(backend)
+    monkeypatch.setattr(ai_service, "router", router)
+    monkeypatch.setattr(ai_service, "cache", ResponseCache(10, 60, clock=Clock()))
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", True)
+    return backend
+
+def generate(**options):
+    return asyncio.run(ai_service._generate("optimize_post", "prompt", **options))
+
+def test_bypass_skips_the_cache_and_refresh_replaces_the_entry(cached_model):
+    generate()
+    generate()
+    assert cached_model.calls == 1
+
+    generate(bypass_cache=True)
+    assert cached_model.calls == 2
+    assert ai_service.cache.stats()["hits"] == 1
+
+    generate(refresh_cache=True)
+    generate()
+    assert cached_model.calls == 3
+    assert ai_service.cache.stats()["hits"] == 2
@@ -0,0 +1,160 @@
+import threading
+import time
+
+import pytest
+
+import scheduler
+from scheduled_post_store import SQLiteScheduledPostStore, utc_now_iso
+from scheduler import SchedulerEngine
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = SQLiteScheduledPostStore(tmp_path / "scheduled_posts.db")
+    monkeypatch.setattr(scheduler.data_manager, "_scheduled_posts", store)
+    return store
+
+@pytest.fixture
+def leader(monkeypatch):
+    """A running engine that records what it dispatches, in place of the module's engine"""
+    dispatched = []
+    published = threading.Event()
+    def dispatch(post_id):
+        dispatched.append(post_id)
+        published.set()
+    engine = SchedulerEngine(dispatch, workers=1)
+    engine.published, engine.dispatched = published, dispatched
+    monkeypatch.setattr(scheduler, "scheduler_engine", engine)
+    engine.start()
+    yield engine
+    engine.stop()
+
+def run_resync(interval, poll_interval):
+    stop = threading.Event()
+    thread = threading.Thread(target=scheduler.resync_pending, args=(stop, interval, poll_interval), daemon=True)
+    thread.start()
+    return stop, thread
+
+def test_list_pending_due_before(store):
+    soon = store.add({"content": "soon", "scheduled_time": utc_now_iso(60)})
+    store.add({"content": "later", "scheduled_time": utc_now_iso(3600)})
+
+    assert [post["id"] for post in store.list_pending(utc_now_iso(300))] == [soon]
+    assert len(store.list_pending()) == 2
+
+def test_post_added_by_another_worker_is_picked_up_before_the_next_resync(store, leader):
+    stop, thread = run_resync(interval=30, poll_interval=0.05)
+    try:
+        time.sleep(0.1)
+        # Scheduled through another worker: only the store knows about it
+        post_id = store.add({"content": "hello", "scheduled_time": utc_now_iso()})
+        assert leader.published.wait(2)
+        assert leader.dispatched == [post_id]
+    finally:
+        stop.set()
+        thread.join()
+
+def test_poll_only_loads_posts_due_before_the_next_resync(store, leader):
+    stop, thread = run_resync(interval=30, poll_interval=0.05)
+    try:
+        time.sleep(0.1)
+        store.add({"content": "next week", "scheduled_time": utc_now_iso(7 * 86400)})
+        time.sleep(0.2)
+        assert leader.queue_depth() == 0
+    finally:
+        stop.set()
+        thread.join()
+
+def engine_at(now):
+    return SchedulerEngine(lambda post_id: None, clock=lambda: now)
+
+def test_pop_due_returns_due_posts_in_time_order():
+    engine = engine_at(100)
+    engine.add_at("later", 90)
+    engine.add_at("sooner", 50)
+    engine.add_at("future", 150)
+
+    assert engine.pop_due() == ["sooner", "later"]
+    assert engine.queue_depth() == 1
+    assert engine.seconds_until_next() == 50
+
+def test_add_without_replace_keeps_the_queued_time():
+    engine = engine_at(100)
+    engine.add_at("post", 50)
+    engine.add_at("post", 500)
+
+    assert engine.pop_due() == ["post"]
+
+def test_reschedule_moves_a_queued_post():
+    engine = engine_at(100)
+    engine.add_at("post", 50)
+    engine.add_at("post", 500, replace=True)
+
+    assert engine.pop_due() == []
+    assert engine.queue_depth() == 1
+    assert engine.pop_due(now=500) == ["post"]
+    # The stale entry at 50 never comes back
+    assert engine.pop_due(now=1000) == []
+
+def test_removed_post_is_never_dispatched():
+    engine = engine_at(100)
+    engine.add_at("post", 50)
+    engine.add_at("other", 60)
+    engine.remove("post")
+
+    assert engine.queue_depth() == 1
+    assert engine.pop_due() == ["other"]
+
+def test_stale_entries_are_compacted():
+    engine = engine_at(0)
+    for i in range(200):
+        engine.add_at("post", 1000 + i, replace=True)
+
+    engine.seconds_until_next()
+
+    assert engine.queue_depth() == 1
+    assert len(engine._heap) <= 2 * engine.queue_depth() + 64
+
+def test_load_pending_lets_the_store_time_win():
+    engine = engine_at(100)
+    engine.add_at("post", 500)
+    engine.load_pending([{"id": "post", "scheduled_time": "1970-01-01T00:00:50+00:00"}])
+
+    assert engine.pop_due() == ["post"]
+
+def test_reload_does_not_move_a_retried_post_before_its_retry_time():
+    now = [100.0]
+    engine = SchedulerEngine(lambda post_id: 60, clock=lambda: now[0])
+    engine.add_at("post", 50)
+    assert engine.pop_due() == ["post"]
+
+    engine._publish("post")
+    # The store still has the original, past-due time
+    engine.load_pending([{"id": "post", "scheduled_time": "1970-01-01T00:00:50+00:00"}])
+
+    assert engine.pop_due() == []
+    now[0] = 160.0
+    assert engine.pop_due() == ["post"]
+
+def test_missing_credentials_save_the_retry_time(store, monkeypatch):
+    monkeypatch.delenv("LINKEDIN_ACCESS_TOKEN", raising=False)
+    post_id = store.add({"content": "Text", "scheduled_time": utc_now_iso(-5)})
+
+    retry = scheduler.publish_scheduled_post(post_id)
+
+    assert retry == scheduler.MISSING_CREDENTIALS_RETRY_SECONDS
+    assert store.list_pending(utc_now_iso()) == []
+    assert [post["id"] for post in store.list_pending(utc_now_iso(retry))] == [post_id]
+
+def test_interrupted_claims_are_marked_failed(store, monkeypatch):
+    monkeypatch.setattr(scheduler.Config, "SCHEDULER_STALE_CLAIM_SECONDS", 600)
+    stale = store.add({"content": "Stale", "scheduled_time": utc_now_iso(-5)})
+    fresh = store.add({"content": "Fresh", "scheduled_time": utc_now_iso(-5)})
+    store.claim(stale)
+    store.claim(fresh)
+    with store._conn:
+        store._conn.execute("UPDATE scheduled_posts SET claimed_at = ? WHERE id = ?", (utc_now_iso(-900), stale))
+
+    scheduler.fail_stale_claims()
+
+    statuses = {post["id"]: post["status"] for post in store.list_all()}
+    assert statuses == {stale: "failed", fresh: "posting"}
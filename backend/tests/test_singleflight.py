@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+def test_identical_concurrent_calls_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        return await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    assert [str(result) for result in asyncio.run(main())] == ["boom", "boom"]
+    assert flight.stats()["in_flight"] == 0
+
+def test_one_caller_leaving_does_not_cancel_the_call_for_the_others():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        leaving = asyncio.ensure_future(flight.do("key", work))
+        staying = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        return await staying
+
+    assert asyncio.run(main()) == "result"
+
+def test_call_is_cancelled_when_every_caller_leaves():
+    flight = SingleFlight("test")
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def main():
+        caller = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0.08)
+
+    asyncio.run(main())
+    assert finished == []
+
+@pytest.fixture
+def slow_model(monkeypatch, mongo_db):
+    from ai_service import ai_service
+    from config import Config
+    from model_backends import FakeBackend
+    from model_router import DEFAULT_TASK, ModelRouter
+    from usage_tracker import UsageTracker
+
+    backend = FakeBackend("fake:slow", latency="fixed:0.05")
+    router = ModelRouter({DEFAULT_TASK: [backend.name]}, {}, 5.0)
+    router.register(backend)
+    monkeypatch.setattr(ai_service, "router", router)
+    monkeypatch.setattr(ai_service, "usage", UsageTracker(member_daily_budget=1))
+    monkeypatch.setattr(ai_service, "flights", {})
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", False)
+    return ai_service
+
+def test_member_over_budget_cannot_join_another_callers_generation(slow_model):
+    from usage_tracker import BudgetExceededError
+
+    async def main():
+        return await asyncio.gather(
+            slow_model._generate("optimize_post", "same prompt"),
+            slow_model._generate("optimize_post", "same prompt", member_id="ada"),
+            return_exceptions=True,
+        )
+
+    shared, member = asyncio.run(main())
+
+    assert isinstance(shared, str)
+    assert isinstance(member, BudgetExceededError)
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes
+from ai_service import ai_service
+from concurrency import GenerationLimiter
+from config import Config
+from model_backends import FakeBackend
+from model_router import DEFAULT_TASK, ModelRouter
+
+REQUEST = {"topic": "Testing", "content_type": "educational"}
+
+@pytest.fixture
+def client(monkeypatch, mongo_db):
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", False)
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+def use_model(monkeypatch, backend: FakeBackend) -> None:
+    router = ModelRouter({DEFAULT_TASK: [backend.name]}, {}, 5.0)
+    router.register(backend)
+    monkeypatch.setattr(ai_service, "router", router)
+
+def parse_sse(body: str):
+    """(event, data) pairs; every event must be an event line, a data line and a blank line"""
+    events = []
+    assert body.endswith("\n\n")
+    for block in body[:-2].split("\n\n"):
+        event_line, data_line = block.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[7:], json.loads(data_line[6:])))
+    return events
+
+def test_stream_sends_chunks_then_done(client, monkeypatch):
+    use_model(monkeypatch, FakeBackend("fake:ok", output_tokens=32, chunk_tokens=4))
+
+    response = client.post("/generate-personalized-content/stream", json=REQUEST)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    events = parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[-1] == "done" and set(names[:-1]) == {"chunk"}
+    text = "".join(data["text"] for name, data in events if name == "chunk")
+    assert events[-1][1]["post"] == text
+
+def test_failure_partway_through_ends_with_an_error_event(client, monkeypatch):
+    # Fails half way through its chunks, after the response has started
+    use_model(monkeypatch, FakeBackend("fake:broken", error_rate=1.0, output_tokens=32, chunk_tokens=4))
+
+    response = client.post("/generate-personalized-content/stream", json=REQUEST)
+
+    assert response.status_code == 200
+    events = parse_sse(response.text)
+    assert events[0][0] == "chunk"
+    assert events[-1][0] == "error" and events[-1][1]["detail"]
+    assert "done" not in [name for name, _ in events]
+
+def test_failure_before_the_first_event_is_an_http_error(client, monkeypatch):
+    use_model(monkeypatch, FakeBackend("fake:ok"))
+    monkeypatch.setattr(ai_service, "limiter", GenerationLimiter(1, 0, 7))
+    # The only slot is taken, so the stream is refused before it starts
+    monkeypatch.setattr(ai_service.limiter, "_in_flight", 1)
+
+    response = client.post("/generate-personalized-content/stream", json=REQUEST)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
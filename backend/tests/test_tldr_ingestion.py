@@ -0,0 +1,93 @@
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from ai_service import fetch_and_store_tldr_news
+from config import Config
+
+FIXTURE = (Path(__file__).parent / "fixtures" / "tldr_feed.xml").read_bytes()
+NEWER_ITEM = b"""    <item>
+      <title>Chip export rules</title>
+      <link>https://tldr.tech/tech/2026-01-08</link>
+      <pubDate>Thu, 08 Jan 2026 10:00:00 GMT</pubDate>
+    </item>
+"""
+
+class FeedStub:
+    """Serves one feed body with an ETag, answering a matching If-None-Match with 304"""
+
+    def __init__(self, body: bytes, etag: str):
+        self.body, self.etag = body, etag
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(dict(self.headers))
+                if self.headers.get("If-None-Match") == stub.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", stub.etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("ETag", stub.etag)
+                self.send_header("Content-Length", str(len(stub.body)))
+                self.end_headers()
+                self.wfile.write(stub.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/rss"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def feed(monkeypatch):
+    monkeypatch.setattr(Config, "TOPIC_DEDUP_MODE", "off")
+    stub = FeedStub(FIXTURE, '"v1"')
+    yield stub
+    stub.close()
+
+def test_first_fetch_stores_subtopics_and_feed_state(mongo_db, feed):
+    stats = fetch_and_store_tldr_news(feed.url)
+
+    assert stats["not_modified"] is False
+    assert stats["entries"] == 3
+    assert stats["inserted"] == 5
+    assert {doc["feed"] for doc in mongo_db["tldr_news"].find()} == {feed.url}
+    state = mongo_db["feed_state"].find_one({"_id": feed.url})
+    assert state["etag"] == '"v1"'
+    assert state["watermark"].replace(tzinfo=timezone.utc) == datetime(2026, 1, 7, 10, tzinfo=timezone.utc)
+
+def test_unchanged_feed_returns_not_modified(mongo_db, feed):
+    fetch_and_store_tldr_news(feed.url)
+    stats = fetch_and_store_tldr_news(feed.url)
+
+    assert feed.requests[-1].get("If-None-Match") == '"v1"'
+    assert stats["not_modified"] is True
+    assert stats["inserted"] == 0
+    assert mongo_db["tldr_news"].count_documents({}) == 5
+
+def test_changed_feed_only_reads_entries_from_the_watermark(mongo_db, feed):
+    fetch_and_store_tldr_news(feed.url)
+    feed.body = FIXTURE.replace(b"    <item>\n", NEWER_ITEM + b"    <item>\n", 1)
+    feed.etag = '"v2"'
+
+    stats = fetch_and_store_tldr_news(feed.url)
+
+    # The newest stored entry is re-read at the watermark, older ones are skipped
+    assert stats["entries"] == 2
+    assert stats["inserted"] == 1
+    assert mongo_db["tldr_news"].find_one({"subtopic": "Chip export rules"}) is not None
+    state = mongo_db["feed_state"].find_one({"_id": feed.url})
+    assert state["etag"] == '"v2"'
+    assert state["watermark"].replace(tzinfo=timezone.utc) == datetime(2026, 1, 8, 10, tzinfo=timezone.utc)
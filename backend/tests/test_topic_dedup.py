@@ -0,0 +1,30 @@
+from topic_dedup import HashingEmbedder, TopicDeduplicator
+
+def deduplicator(mongo_db, stored):
+    collection = mongo_db["tldr_news"]
+    for subtopic, head in stored:
+        collection.insert_one({"subtopic": subtopic, "duplicate_of": head})
+    deduplicator = TopicDeduplicator(HashingEmbedder(), 0.6)
+    deduplicator.sync(collection)
+    return deduplicator
+
+def test_exact_repeat_maps_to_its_cluster_head(mongo_db):
+    dedup = deduplicator(mongo_db, [
+        ("OpenAI releases GPT-5", None),
+        ("OpenAI released GPT-5 today", "OpenAI releases GPT-5"),
+    ])
+
+    duplicates = dedup.classify(["OpenAI released GPT-5 today", "OpenAI releases GPT-5"])
+
+    assert duplicates == {
+        "OpenAI released GPT-5 today": ("OpenAI releases GPT-5", 1.0),
+        "OpenAI releases GPT-5": ("OpenAI releases GPT-5", 1.0),
+    }
+
+def test_first_new_topic_of_a_batch_is_not_a_duplicate(mongo_db):
+    dedup = deduplicator(mongo_db, [("Chip export rules tighten", None)])
+
+    duplicates = dedup.classify(["Rust lands in the Linux kernel", "Rust lands in the Linux kernel tree"])
+
+    assert list(duplicates) == ["Rust lands in the Linux kernel tree"]
+    assert duplicates["Rust lands in the Linux kernel tree"][0] == "Rust lands in the Linux kernel"
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from topic_pages import decode_cursor, encode_cursor, fetch_page
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient()["test"]["tldr_news"]
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    # Pairs of documents share a timestamp, so the _id tie-break matters
+    collection.insert_many([
+        {"subtopic": f"Topic {i}", "published_at": start + timedelta(hours=i // 2)} for i in range(25)
+    ])
+    return collection
+
+def test_cursor_round_trip():
+    published_at, doc_id = datetime(2026, 1, 1, 9, tzinfo=timezone.utc), ObjectId()
+
+    assert decode_cursor(encode_cursor(published_at, doc_id)) == (published_at, doc_id)
+
+def test_malformed_cursor_is_a_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_pages_cover_every_document_once_newest_first(collection):
+    seen, cursor = [], None
+    while True:
+        docs, cursor = fetch_page(collection, {}, {"subtopic": 1}, 10, cursor)
+        seen.extend(docs)
+        if cursor is None:
+            break
+
+    assert len(seen) == 25
+    assert len({doc["_id"] for doc in seen}) == 25
+    keys = [(doc["published_at"], doc["_id"]) for doc in seen]
+    assert keys == sorted(keys, reverse=True)
+
+def test_rows_inserted_meanwhile_do_not_shift_later_pages(collection):
+    first, cursor = fetch_page(collection, {}, {"subtopic": 1}, 10)
+    collection.insert_one({"subtopic": "Breaking", "published_at": datetime(2027, 1, 1, tzinfo=timezone.utc)})
+
+    second, _ = fetch_page(collection, {}, {"subtopic": 1}, 10, cursor)
+
+    assert not {doc["_id"] for doc in first} & {doc["_id"] for doc in second}
+    assert "Breaking" not in {doc["subtopic"] for doc in second}
+
+def test_last_page_has_no_cursor(collection):
+    docs, cursor = fetch_page(collection, {}, {"subtopic": 1}, 25)
+
+    assert len(docs) == 25
+    assert cursor is None
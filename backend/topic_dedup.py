@@ -0,0 +1,325 @@
+"""
+Near-duplicate detection for TLDR subtopics.
+
+Every stored subtopic is embedded and kept as a row of a NumPy matrix of
+unit vectors, so one matrix-vector product gives its cosine similarity to
+every known topic. A new subtopic whose best match reaches the threshold
+is a duplicate: it is either not stored ("reject") or stored with
+`duplicate_of` set to the first topic of its cluster ("cluster"), which
+hides it from the non-posted listing.
+
+The index follows the tldr_news collection by ObjectId: each sync embeds
+only the documents inserted since the last one, and the matrix is saved
+to an .npz file so a restart does not embed the whole collection again.
+The default embedder hashes words and character trigrams and needs no
+network; "gemini" uses Gemini embeddings instead. Switching embedders
+rebuilds the index.
+
+Rebuild or inspect the index from the backend directory:
+    python -m topic_dedup [--rebuild] [--check "some headline"]
+"""
+import os
+import re
+import sys
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from config import Config
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or over that the their this "
+    "to was were will with new now how why what".split()
+)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+class Embedder(ABC):
+    """Turns texts into L2-normalized float32 vectors of a fixed dimension"""
+    name = ""
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+class HashingEmbedder(Embedder):
+    """Offline embedder: signed feature hashing of words and their character trigrams.
+
+    Trigrams let inflections ("releases", "released") and compounds overlap,
+    and words are weighted above trigrams so shared vocabulary dominates.
+    """
+
+    def __init__(self, dim: int = 1024, trigram_weight: float = 0.35):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> Dict[str, float]:
+        features: Dict[str, float] = {}
+        for word in TOKEN_PATTERN.findall(text.lower()):
+            if word in STOPWORDS:
+                continue
+            features["w:" + word] = features.get("w:" + word, 0.0) + 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                key = "t:" + padded[i:i + 3]
+                features[key] = features.get(key, 0.0) + self.trigram_weight
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text).items():
+                # crc32 rather than hash(), which is salted per process
+                code = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if code & 0x80000000 else -1.0
+                vectors[row, code % self.dim] += sign * weight
+        return normalize_rows(vectors)
+
+class GeminiEmbedder(Embedder):
+    """Gemini text embeddings (needs GEMINI_API_KEY)"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.name = f"gemini-{model}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        import google.generativeai as genai
+        genai.configure(api_key=Config.GEMINI_API_KEY)
+        vectors = []
+        # The embedding endpoint takes at most 100 texts per request
+        for start in range(0, len(texts), 100):
+            result = genai.embed_content(
+                model=self.model, content=texts[start:start + 100], task_type="semantic_similarity"
+            )
+            vectors.extend(result["embedding"])
+        return normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1))
+
+def create_embedder(name: str) -> Embedder:
+    if name == "gemini":
+        return GeminiEmbedder(Config.TOPIC_EMBEDDING_MODEL)
+    if name == "hashing":
+        return HashingEmbedder(Config.TOPIC_EMBEDDING_DIM)
+    raise ValueError(f"Unknown topic embedder: {name}")
+
+class TopicIndex:
+    """Unit vectors of known subtopics with their cluster, persisted to an .npz file"""
+
+    def __init__(self, embedder: Embedder, path: Optional[Path] = None):
+        self.embedder = embedder
+        self.path = Path(path) if path else None
+        self.topics: List[str] = []
+        self.rows: Dict[str, int] = {}
+        # Row of each topic's cluster head (its own row for non-duplicates)
+        self.clusters = np.zeros(0, dtype=np.int32)
+        self.vectors: Optional[np.ndarray] = None
+        self.count = 0
+        self.last_id: Optional[ObjectId] = None
+
+    def load(self) -> bool:
+        """Read the saved index; False when missing, unreadable or built by another embedder"""
+        if self.path is None or not self.path.exists():
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as saved:
+                if str(saved["embedder"]) != self.embedder.name:
+                    print(f"[TopicIndex] Saved index uses {saved['embedder']}, rebuilding for {self.embedder.name}")
+                    return False
+                vectors = saved["vectors"]
+                topics = [str(topic) for topic in saved["topics"]]
+                clusters = saved["clusters"].astype(np.int32)
+                last_id = str(saved["last_id"])
+        except (OSError, KeyError, ValueError) as e:
+            print(f"[TopicIndex] Could not read {self.path}, rebuilding: {e}")
+            return False
+        self.clear()
+        self._append(topics, vectors, clusters)
+        self.last_id = ObjectId(last_id) if last_id else None
+        return True
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(self.path.name + ".tmp.npz")
+        np.savez(
+            temp,
+            embedder=np.array(self.embedder.name),
+            vectors=self._matrix(),
+            topics=np.array(self.topics, dtype=str),
+            clusters=self.clusters[:self.count],
+            last_id=np.array(str(self.last_id) if self.last_id else ""),
+        )
+        os.replace(temp, self.path)
+
+    def clear(self) -> None:
+        self.topics, self.rows, self.count, self.last_id = [], {}, 0, None
+        self.vectors, self.clusters = None, np.zeros(0, dtype=np.int32)
+
+    def _matrix(self) -> np.ndarray:
+        if self.vectors is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self.vectors[:self.count]
+
+    def _append(self, topics: List[str], vectors: np.ndarray, clusters: np.ndarray) -> None:
+        """Add rows, growing the preallocated arrays geometrically"""
+        needed = self.count + len(topics)
+        if self.vectors is None or needed > len(self.vectors):
+            capacity = max(needed, 2 * (len(self.vectors) if self.vectors is not None else 0), 1024)
+            grown = np.zeros((capacity, vectors.shape[1]), dtype=np.float32)
+            grown_clusters = np.zeros(capacity, dtype=np.int32)
+            if self.vectors is not None:
+                grown[:self.count] = self.vectors[:self.count]
+                grown_clusters[:self.count] = self.clusters[:self.count]
+            self.vectors, self.clusters = grown, grown_clusters
+        self.vectors[self.count:needed] = vectors
+        self.clusters[self.count:needed] = clusters
+        for offset, topic in enumerate(topics):
+            self.rows.setdefault(topic, self.count + offset)
+        self.topics.extend(topics)
+        self.count = needed
+
+    def add(self, topics: List[str], vectors: np.ndarray, heads: List[Optional[str]]) -> None:
+        """Add topics; each joins the cluster of its head topic, or starts its own"""
+        batch_rows: Dict[str, int] = {}
+        clusters = []
+        for offset, (topic, head) in enumerate(zip(topics, heads)):
+            row = self.count + offset
+            batch_rows.setdefault(topic, row)
+            if head in self.rows:
+                clusters.append(int(self.clusters[self.rows[head]]))
+            elif head in batch_rows:
+                clusters.append(clusters[batch_rows[head] - self.count])
+            else:
+                clusters.append(row)
+        self._append(topics, vectors, np.array(clusters, dtype=np.int32))
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        """Row and cosine similarity of the most similar known topic"""
+        if self.count == 0:
+            return None, 0.0
+        similarities = self._matrix() @ vector
+        row = int(np.argmax(similarities))
+        return row, float(similarities[row])
+
+    def head(self, row: int) -> str:
+        return self.topics[int(self.clusters[row])]
+
+class TopicDeduplicator:
+    """Finds near-duplicate subtopics against everything stored in tldr_news"""
+
+    def __init__(self, embedder: Embedder, threshold: float, path: Optional[Path] = None):
+        self.threshold = threshold
+        self.index = TopicIndex(embedder, path)
+        self._loaded = False
+        self._lock = threading.Lock()
+        # Vectors computed while classifying, reused when those topics are synced
+        self._pending: Dict[str, np.ndarray] = {}
+
+    def sync(self, collection, rebuild: bool = False) -> int:
+        """Add documents inserted since the last sync; returns how many rows were added"""
+        with self._lock:
+            if rebuild:
+                self.index.clear()
+                self._loaded = True
+            elif not self._loaded:
+                self._loaded = True
+                self.index.load()
+            query = {"_id": {"$gt": self.index.last_id}} if self.index.last_id else {}
+            docs = list(collection.find(query, {"subtopic": 1, "duplicate_of": 1}).sort("_id", 1))
+            if not docs:
+                return 0
+            new = [doc for doc in docs if doc.get("subtopic") and doc["subtopic"] not in self.index.rows]
+            # One row per distinct subtopic
+            new = list({doc["subtopic"]: doc for doc in new}.values())
+            if new:
+                texts = [doc["subtopic"] for doc in new]
+                missing = [text for text in texts if text not in self._pending]
+                if missing:
+                    self._pending.update(zip(missing, self.index.embedder.embed(missing)))
+                vectors = np.stack([self._pending.pop(text) for text in texts])
+                self.index.add(texts, vectors, [doc.get("duplicate_of") for doc in new])
+            self.index.last_id = docs[-1]["_id"]
+            self._pending.clear()
+            self.index.save()
+            return len(new)
+
+    def classify(self, subtopics: List[str]) -> Dict[str, Tuple[str, float]]:
+        """Map each near-duplicate among new subtopics to (cluster head, similarity).
+        Exact repeats of indexed topics map to their cluster head with similarity 1.0;
+        the first of several similar new topics in this batch is not a duplicate."""
+        with self._lock:
+            duplicates = {}
+            fresh = []
+            for topic in dict.fromkeys(subtopics):
+                if topic in self.index.rows:
+                    duplicates[topic] = (self.index.head(self.index.rows[topic]), 1.0)
+                else:
+                    fresh.append(topic)
+            if not fresh:
+                return duplicates
+            vectors = self.index.embedder.embed(fresh)
+            accepted: List[Tuple[str, np.ndarray]] = []
+            for topic, vector in zip(fresh, vectors):
+                self._pending[topic] = vector
+                row, similarity = self.index.nearest(vector)
+                best = (self.index.head(row), similarity) if row is not None else (None, 0.0)
+                for earlier, earlier_vector in accepted:
+                    batch_similarity = float(earlier_vector @ vector)
+                    if batch_similarity > best[1]:
+                        best = (duplicates.get(earlier, (earlier,))[0], batch_similarity)
+                if best[0] is not None and best[1] >= self.threshold:
+                    duplicates[topic] = (best[0], round(best[1], 4))
+                accepted.append((topic, vector))
+            return duplicates
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "embedder": self.index.embedder.name,
+            "threshold": self.threshold,
+            "topics": self.index.count,
+            "clusters": int(np.unique(self.index.clusters[:self.index.count]).size),
+            "last_id": str(self.index.last_id) if self.index.last_id else None,
+        }
+
+_deduplicator = None
+
+def get_deduplicator() -> TopicDeduplicator:
+    """Shared deduplicator for the configured embedder, threshold and index file"""
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = TopicDeduplicator(
+            create_embedder(Config.TOPIC_EMBEDDER), Config.TOPIC_DEDUP_THRESHOLD, Config.TOPIC_INDEX_PATH
+        )
+    return _deduplicator
+
+def main(argv: List[str]) -> None:
+    import database
+    if not database.check_connection():
+        sys.exit("MongoDB is not reachable.")
+    deduplicator = get_deduplicator()
+    try:
+        added = deduplicator.sync(database.get_tldr_collection(), rebuild="--rebuild" in argv)
+    except PyMongoError as e:
+        sys.exit(f"Could not read tldr_news: {e}")
+    print(f"Synced {added} new topics: {deduplicator.stats()}")
+    if "--check" in argv:
+        text = argv[argv.index("--check") + 1]
+        vector = deduplicator.index.embedder.embed([text])[0]
+        row, similarity = deduplicator.index.nearest(vector)
+        if row is not None:
+            print(f"Nearest topic: {deduplicator.index.topics[row]!r} (similarity {similarity:.3f}, "
+                  f"cluster {deduplicator.index.head(row)!r}); duplicate: {similarity >= deduplicator.threshold}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+"""
+Keyset pagination over the TLDR news collection.
+
+Pages are ordered newest first on (published_at, _id), which the
+`published_at_id` and `posted_published_at_id` indexes serve directly. The
+cursor is the sort key of a page's last document, so each page is one
+index range scan however deep the client has paged, and rows inserted
+meanwhile never shift later pages.
+"""
+import base64
+import hashlib
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+def encode_cursor(published_at: datetime, doc_id: ObjectId) -> str:
+    payload = json.dumps([published_at.isoformat(), str(doc_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Sort key from a cursor; raises ValueError for a malformed one"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        published_at, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(published_at), ObjectId(doc_id)
+    except (ValueError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive datetimes (as pymongo returns them) as UTC"""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+def build_query(base: Dict[str, Any], since: Optional[datetime] = None, until: Optional[datetime] = None,
+                prefix: Optional[str] = None, prefix_field: str = "subtopic") -> Dict[str, Any]:
+    """Add a published_at range and an anchored, case-sensitive prefix match (which can use an index)"""
+    query = dict(base)
+    published = {}
+    if since is not None:
+        published["$gte"] = as_utc(since)
+    if until is not None:
+        published["$lt"] = as_utc(until)
+    if published:
+        query["published_at"] = published
+    if prefix:
+        query[prefix_field] = {"$regex": "^" + re.escape(prefix)}
+    return query
+
+def fetch_page(collection, query: Dict[str, Any], projection: Dict[str, int], limit: int,
+               cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of documents newest first, and the cursor of the next page (None on the last)"""
+    if cursor:
+        published_at, doc_id = decode_cursor(cursor)
+        after = {"$or": [
+            {"published_at": {"$lt": published_at}},
+            {"published_at": published_at, "_id": {"$lt": doc_id}},
+        ]}
+        query = {"$and": [query, after]} if query else after
+    fields = dict(projection, published_at=1)
+    docs = list(
+        collection.find(query, fields)
+        .sort([("published_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last["published_at"], last["_id"])
+    return docs, next_cursor
+
+def etag_for(content: Any) -> str:
+    """Strong ETag of a JSON response body"""
+    body = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists this ETag (weak comparison, as RFC 9110 asks for GET)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
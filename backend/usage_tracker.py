@@ -0,0 +1,242 @@
+"""
+Gemini token accounting and daily budgets.
+
+Every model call (and every response-cache hit) is counted per UTC day,
+method and member in memory, and a background thread adds the increments
+to the MongoDB `llm_usage` collection with `$inc`. Each increment also
+updates rollup documents for the whole day and for each method and member
+("*" in the other field), so budget checks and totals read a few
+documents. Budgets are checked before a request is sent, against the
+persisted totals from all workers plus this process's unflushed usage.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import UpdateOne, ASCENDING
+from pymongo.errors import PyMongoError
+
+import database
+
+ALL = "*"
+# Member ID recorded for calls made without one (e.g. news posts)
+NO_MEMBER = "-"
+COUNTERS = ("calls", "cache_hits", "prompt_tokens", "output_tokens", "cached_tokens", "total_tokens")
+
+class BudgetExceededError(Exception):
+    """Raised when a generation would exceed a daily token budget"""
+
+    def __init__(self, scope: str, used: int, budget: int, retry_after: int):
+        super().__init__(f"Daily token budget for {scope} exhausted ({used}/{budget}). Please retry after it resets.")
+        self.scope = scope
+        self.used = used
+        self.budget = budget
+        self.retry_after = retry_after
+
+def utc_day(now: datetime = None) -> str:
+    return (now or datetime.now(timezone.utc)).strftime("%Y-%m-%d")
+
+def seconds_until_midnight_utc() -> int:
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, int((midnight - now).total_seconds()))
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """Rough input token count (about 4 characters per token) for budget checks"""
+    return sum(len(text) for text in texts if text) // 4
+
+def usage_counts(response) -> Dict[str, int]:
+    """Token counts from a Gemini response's usage_metadata (zeros when absent)"""
+    usage = getattr(response, "usage_metadata", None)
+    prompt = getattr(usage, "prompt_token_count", 0) or 0
+    output = getattr(usage, "candidates_token_count", 0) or 0
+    return {
+        "prompt_tokens": prompt,
+        "output_tokens": output,
+        "cached_tokens": getattr(usage, "cached_content_token_count", 0) or 0,
+        "total_tokens": getattr(usage, "total_token_count", 0) or prompt + output,
+    }
+
+class UsageTracker:
+    """Counts token usage per day, method and member and enforces daily budgets"""
+
+    def __init__(self, daily_budget: int = 0, member_daily_budget: int = 0,
+                 method_daily_budgets: Dict[str, int] = None, flush_seconds: float = 10):
+        self.daily_budget = daily_budget
+        self.member_daily_budget = member_daily_budget
+        self.method_daily_budgets = method_daily_budgets or {}
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        # (day, method, member) -> counters not yet written to MongoDB
+        self._pending: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+        # Persisted totals per (day, method, member) rollup key, refreshed after each flush
+        self._persisted: Dict[Tuple[str, str, str], int] = {}
+        self._persisted_members: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._indexes_created = False
+
+    def _collection(self):
+        return database.get_db()["llm_usage"] if database.is_available() else None
+
+    def record(self, method: str, member_id: Optional[str], counts: Dict[str, int], cache_hit: bool = False) -> None:
+        """Add one call's usage to the unflushed counters"""
+        key = (utc_day(), method, member_id or NO_MEMBER)
+        with self._lock:
+            pending = self._pending.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            pending["calls"] += 1
+            if cache_hit:
+                pending["cache_hits"] += 1
+            for name, value in counts.items():
+                pending[name] += value
+
+    def _pending_total(self, day: str, method: str = ALL, member: str = ALL) -> int:
+        return sum(
+            counters["total_tokens"] for (d, m, u), counters in self._pending.items()
+            if d == day and method in (ALL, m) and member in (ALL, u)
+        )
+
+    def _member_total(self, day: str, member: str) -> int:
+        """Persisted total for one member today, cached for one flush interval"""
+        cached = self._persisted_members.get((day, member))
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        total = 0
+        collection = self._collection()
+        if collection is not None:
+            try:
+                doc = collection.find_one({"_id": f"{day}|{ALL}|{member}"}, {"total_tokens": 1})
+                total = (doc or {}).get("total_tokens", 0)
+            except PyMongoError as e:
+                print(f"[Usage] Could not read usage for {member}: {e}")
+                return cached[1] if cached else 0
+        self._persisted_members[(day, member)] = (time.monotonic() + self.flush_seconds, total)
+        return total
+
+    def check_budget(self, method: str, member_id: Optional[str], estimated_tokens: int = 0) -> None:
+        """Raise BudgetExceededError if this call would go over a daily budget"""
+        if not (self.daily_budget or self.member_daily_budget or self.method_daily_budgets):
+            return
+        day = utc_day()
+        checks = []
+        if self.daily_budget:
+            checks.append(("all requests", self.daily_budget, (day, ALL, ALL), ALL, ALL))
+        method_budget = self.method_daily_budgets.get(method)
+        if method_budget:
+            checks.append((method, method_budget, (day, method, ALL), method, ALL))
+        member = member_id or NO_MEMBER
+        member_total = self._member_total(day, member) if self.member_daily_budget and member_id else 0
+        with self._lock:
+            for scope, budget, key, m, u in checks:
+                used = self._persisted.get(key, 0) + self._pending_total(day, m, u)
+                if used + estimated_tokens > budget:
+                    raise BudgetExceededError(scope, used, budget, seconds_until_midnight_utc())
+            if self.member_daily_budget and member_id:
+                used = member_total + self._pending_total(day, ALL, member)
+                if used + estimated_tokens > self.member_daily_budget:
+                    raise BudgetExceededError(
+                        f"member {member_id}", used, self.member_daily_budget, seconds_until_midnight_utc()
+                    )
+
+    def flush(self) -> int:
+        """Write unflushed counters to MongoDB; returns the number of keys written"""
+        collection = self._collection()
+        if collection is None:
+            return 0
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            self._refresh_persisted(collection)
+            return 0
+        increments: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+        for (day, method, member), counters in pending.items():
+            for key in ((day, method, member), (day, method, ALL), (day, ALL, member), (day, ALL, ALL)):
+                totals = increments.setdefault(key, dict.fromkeys(COUNTERS, 0))
+                for name, value in counters.items():
+                    totals[name] += value
+        operations = [
+            UpdateOne(
+                {"_id": f"{day}|{method}|{member}"},
+                {"$inc": totals, "$setOnInsert": {"day": day, "method": method, "member_id": member}},
+                upsert=True
+            )
+            for (day, method, member), totals in increments.items()
+        ]
+        try:
+            if not self._indexes_created:
+                collection.create_index([("day", ASCENDING), ("member_id", ASCENDING)], name="day_member")
+                self._indexes_created = True
+            collection.bulk_write(operations, ordered=False)
+        except PyMongoError as e:
+            # Put the counts back so they are written on a later flush
+            print(f"[Usage] Could not write token usage, will retry: {e}")
+            with self._lock:
+                for key, counters in pending.items():
+                    merged = self._pending.setdefault(key, dict.fromkeys(COUNTERS, 0))
+                    for name, value in counters.items():
+                        merged[name] += value
+            return 0
+        self._persisted_members.clear()
+        self._refresh_persisted(collection)
+        return len(pending)
+
+    def _refresh_persisted(self, collection) -> None:
+        """Reload today's whole-day and per-method totals, written by every worker"""
+        day = utc_day()
+        try:
+            docs = list(collection.find({"day": day, "member_id": ALL}, {"method": 1, "total_tokens": 1}))
+        except PyMongoError as e:
+            print(f"[Usage] Could not read usage totals: {e}")
+            return
+        with self._lock:
+            self._persisted = {(day, doc["method"], ALL): doc.get("total_tokens", 0) for doc in docs}
+
+    def run(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+        self.flush()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="usage-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread after a final flush"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def report(self, days: int = 7, member_id: str = None, method: str = None) -> Dict[str, Any]:
+        """Persisted usage for the last `days` UTC days, plus this process's unflushed counts"""
+        self.flush()
+        since = utc_day(datetime.now(timezone.utc) - timedelta(days=max(1, days) - 1))
+        query: Dict[str, Any] = {"day": {"$gte": since}, "method": method or ALL, "member_id": member_id or ALL}
+        rows: List[Dict[str, Any]] = []
+        collection = self._collection()
+        if collection is not None:
+            rows = list(collection.find(query, {"_id": 0}).sort("day", ASCENDING))
+        totals = dict.fromkeys(COUNTERS, 0)
+        for row in rows:
+            for name in COUNTERS:
+                totals[name] += row.get(name, 0)
+        with self._lock:
+            unflushed = sum(counters["calls"] for counters in self._pending.values())
+        return {
+            "since": since,
+            "method": method or ALL,
+            "member_id": member_id or ALL,
+            "days": rows,
+            "totals": totals,
+            "budgets": {
+                "daily": self.daily_budget,
+                "member_daily": self.member_daily_budget,
+                "method_daily": self.method_daily_budgets,
+            },
+            "persisted": collection is not None,
+            "unflushed_calls": unflushed,
+        }
@@ -0,0 +1,36 @@
+export async function POST(request: Request) {
+  try {
+    const body = await request.json();
+    const backendUrl = process.env.NEXT_PUBLIC_BACKEND_URL || 'https://linkedin-agent-backend.onrender.com';
+    const res = await fetch(
+      backendUrl + "/generate-personalized-content/stream",
+      {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(body),
+      }
+    );
+
+    if (!res.ok || !res.body) {
+      let backendError = "Failed to generate personalized post";
+      try {
+        const errJson = await res.json();
+        backendError = errJson?.detail || errJson?.error || backendError;
+      } catch {
+        // Keep generic fallback when backend response is not JSON.
+      }
+      return Response.json({ error: backendError }, { status: res.status });
+    }
+
+    // Pass the Server-Sent Events through unbuffered so tokens reach the page as they arrive.
+    return new Response(res.body, {
+      headers: {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+      },
+    });
+  } catch (error) {
+    return Response.json({ error: "Failed to generate personalized post" }, { status: 500 });
+  }
+}
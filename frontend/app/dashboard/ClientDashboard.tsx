@@ -21,6 +21,11 @@ export default function ClientDashboard() {
   const [isNewsPostLoading, setIsNewsPostLoading] = useState(false);
   const [selectedNewsIndex, setSelectedNewsIndex] = useState<number | null>(null);
   const [usedTopics, setUsedTopics] = useState<string[]>([]);
+  // Cursors for the next page of each topic list; null once the list is exhausted
+  const [newsCursor, setNewsCursor] = useState<string | null>(null);
+  const [usedCursor, setUsedCursor] = useState<string | null>(null);
+  const [isMoreNewsLoading, setIsMoreNewsLoading] = useState(false);
+  const [isMoreUsedLoading, setIsMoreUsedLoading] = useState(false);
   const [overlayPost, setOverlayPost] = useState<string>('');
 
   const [isRegenerating, setIsRegenerating] = useState(false);
@@ -67,32 +72,65 @@ export default function ClientDashboard() {
     checkAuth();
   }, []);
 
+  // Fetch one page of topics; the backend pages them and hands back a cursor for the next page
+  const fetchTopicPage = async (path: string, cursor: string | null) => {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const res = await fetch(`${backendUrl}/${path}${query}`);
+    const data = await res.json();
+    return { topics: (data.topics || []) as string[], nextCursor: (data.next_cursor || null) as string | null };
+  };
+
   useEffect(() => {
     if (!isAuthenticated) return;
     const fetchNonPostedTopics = async () => {
       setIsNewsLoading(true);
       try {
-  const res = await fetch(`${backendUrl}/non-posted-topics`);
-        const data = await res.json();
-        setTldrNews(data.topics || []);
+        const page = await fetchTopicPage('non-posted-topics', null);
+        setTldrNews(page.topics);
+        setNewsCursor(page.nextCursor);
       } catch (e) {
         setTldrNews([]);
+        setNewsCursor(null);
       }
       setIsNewsLoading(false);
     };
     const fetchUsedTopics = async () => {
       try {
-  const res = await fetch(`${backendUrl}/used-topics`);
-        const data = await res.json();
-        setUsedTopics(data.topics || []);
+        const page = await fetchTopicPage('used-topics', null);
+        setUsedTopics(page.topics);
+        setUsedCursor(page.nextCursor);
       } catch (e) {
         setUsedTopics([]);
+        setUsedCursor(null);
       }
     };
     fetchNonPostedTopics();
     fetchUsedTopics();
   }, [isAuthenticated]);
 
+  const loadMoreNews = async () => {
+    if (!newsCursor) return;
+    setIsMoreNewsLoading(true);
+    try {
+      const page = await fetchTopicPage('non-posted-topics', newsCursor);
+      // Topics posted meanwhile can shift pages, so skip any already on screen
+      setTldrNews((prev) => [...prev, ...page.topics.filter((t) => !prev.includes(t))]);
+      setNewsCursor(page.nextCursor);
+    } catch {}
+    setIsMoreNewsLoading(false);
+  };
+
+  const loadMoreUsed = async () => {
+    if (!usedCursor) return;
+    setIsMoreUsedLoading(true);
+    try {
+      const page = await fetchTopicPage('used-topics', usedCursor);
+      setUsedTopics((prev) => [...prev, ...page.topics.filter((t) => !prev.includes(t))]);
+      setUsedCursor(page.nextCursor);
+    } catch {}
+    setIsMoreUsedLoading(false);
+  };
+
   const markTopicAsPosted = async (topic: string) => {
     try {
   await fetch(`${backendUrl}/mark-topic-posted`, {
@@ -294,16 +332,30 @@ export default function ClientDashboard() {
 
       <div className="max-w-7xl mx-auto px-6 py-8 grid grid-cols-1 md:grid-cols-2 gap-8">
         {/* Non-Posted Topics Section */}
-        <TopicList
-          topics={tldrNews}
-          isLoading={isNewsLoading}
-          selectedNewsIndex={selectedNewsIndex}
-          isNewsPostLoading={isNewsPostLoading}
-          newsPosts={newsPosts}
-          onGenerate={generateNewsPost}
-        />
+        <div>
+          <TopicList
+            topics={tldrNews}
+            isLoading={isNewsLoading}
+            selectedNewsIndex={selectedNewsIndex}
+            isNewsPostLoading={isNewsPostLoading}
+            newsPosts={newsPosts}
+            onGenerate={generateNewsPost}
+          />
+          {newsCursor && !isNewsLoading && (
+            <button onClick={loadMoreNews} disabled={isMoreNewsLoading} className="btn-secondary">
+              {isMoreNewsLoading ? 'Loading...' : 'Load more topics'}
+            </button>
+          )}
+        </div>
         {/* Used Topics Section */}
-        <UsedTopicList topics={usedTopics} />
+        <div>
+          <UsedTopicList topics={usedTopics} />
+          {usedCursor && (
+            <button onClick={loadMoreUsed} disabled={isMoreUsedLoading} className="btn-secondary">
+              {isMoreUsedLoading ? 'Loading...' : 'Load more topics'}
+            </button>
+          )}
+        </div>
       </div>
       <PostOverlay
         post={overlayPost}
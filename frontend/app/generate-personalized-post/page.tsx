@@ -13,23 +13,49 @@ export default function GeneratePersonalizedPostPage() {
   const [isPosting, setIsPosting] = useState(false);
   const [postStatus, setPostStatus] = useState<string | null>(null);
 
-  const handleSubmit = async (e: React.FormEvent) => {
-    e.preventDefault();
+  const generatePost = async () => {
     setLoading(true);
     setResult(null);
     setError(null);
     setPostStatus(null);
     try {
-      const res = await fetch('/api/generate-personalized-post', {
+      const res = await fetch('/api/generate-personalized-post/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ topic, content_type: contentType }),
       });
-      const data = await res.json();
-      if (res.ok && data.post) {
-        setResult(data.post);
-      } else {
-        setError(data.detail || 'Failed to generate post.');
+      if (!res.ok || !res.body) {
+        const data = await res.json().catch(() => ({}));
+        setError(data.error || data.detail || 'Failed to generate post.');
+        setLoading(false);
+        return;
+      }
+      // Render chunks as they arrive; the final "done" event carries the assembled post.
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let text = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop() || '';
+        for (const raw of events) {
+          const eventLine = raw.split('\n').find(line => line.startsWith('event: '));
+          const dataLine = raw.split('\n').find(line => line.startsWith('data: '));
+          if (!eventLine || !dataLine) continue;
+          const event = eventLine.slice('event: '.length);
+          const data = JSON.parse(dataLine.slice('data: '.length));
+          if (event === 'chunk') {
+            text += data.text;
+            setResult(text);
+          } else if (event === 'done') {
+            setResult(data.post);
+          } else if (event === 'error') {
+            setError(data.detail || 'Failed to generate post.');
+          }
+        }
       }
     } catch (err) {
       setError('Error connecting to backend.');
@@ -37,6 +63,11 @@ export default function GeneratePersonalizedPostPage() {
     setLoading(false);
   };
 
+  const handleSubmit = async (e: React.FormEvent) => {
+    e.preventDefault();
+    await generatePost();
+  };
+
   const handlePostToLinkedIn = async () => {
     if (!result) return;
     setIsPosting(true);
@@ -114,28 +145,8 @@ export default function GeneratePersonalizedPostPage() {
               </button>
               <button
                 className="btn-secondary w-full md:w-auto"
-                onClick={async () => {
-                  setLoading(true);
-                  setResult(null);
-                  setError(null);
-                  setPostStatus(null);
-                  try {
-                    const res = await fetch('/api/generate-personalized-post', {
-                      method: 'POST',
-                      headers: { 'Content-Type': 'application/json' },
-                      body: JSON.stringify({ topic, content_type: contentType }),
-                    });
-                    const data = await res.json();
-                    if (res.ok && data.post) {
-                      setResult(data.post);
-                    } else {
-                      setError(data.detail || 'Failed to generate post.');
-                    }
-                  } catch (err) {
-                    setError('Error connecting to backend.');
-                  }
-                  setLoading(false);
-                }}
+                onClick={generatePost}
+                disabled={loading}
               >
                 Regenerate Post
               </button>